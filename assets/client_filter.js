@@ -0,0 +1,745 @@
+/*
+ * Chế độ lọc phía trình duyệt (client mode).
+ *
+ * Server gửi một lần Store 'client-data' (callbacks/client_data.py): các cột mã
+ * hóa gọn và hình mẫu của từng biểu đồ (layout + kiểu trace, không có dữ liệu).
+ * Các callback clientside dưới đây lọc, đếm và điền lại mảng dữ liệu của hình
+ * mẫu, nên kéo thanh trượt BMI / ngày đăng ký không gửi request nào về server.
+ */
+(function () {
+    var TYPES = {int8: Int8Array, int16: Int16Array, int32: Int32Array, float32: Float32Array};
+    var DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'];
+    var AGE_NUM = {'Dưới 18': 15, '18-30': 24, '31-45': 38, '46-60': 53, 'Trên 60': 70};
+    var BOX_COLOR = '#8b5cf6';
+    // Như data/time_index.py: cột thời gian theo thứ tự chuỗi của timeline, độ chi tiết theo độ dài cửa sổ
+    var TIME_COLUMNS = ['createdAt', 'lastLoginAt'];
+    var DAILY_MAX_DAYS = 120, WEEKLY_MAX_DAYS = 731;
+    var PERIODS = {D: 'ngày', W: 'tuần', M: 'tháng'};
+
+    function decodeArray(spec) {
+        var raw = atob(spec.data);
+        var bytes = new Uint8Array(raw.length);
+        for (var i = 0; i < raw.length; i++) {
+            bytes[i] = raw.charCodeAt(i);
+        }
+        return new TYPES[spec.dtype](bytes.buffer);
+    }
+
+    // Cột đã giải mã của phiên bản dữ liệu hiện tại
+    var decoded = null;
+
+    function columns(data) {
+        if (decoded && decoded.version === data.version && decoded.n === data.n) {
+            return decoded;
+        }
+        var out = {version: data.version, n: data.n, labels: {}};
+        Object.keys(data.columns).forEach(function (name) {
+            var spec = data.columns[name];
+            out[name] = decodeArray(spec);
+            if (spec.labels) {
+                out.labels[name] = spec.labels;
+            }
+        });
+        if (out.BMI) {
+            // float32 -> số thập phân ban đầu (BMI chỉ có vài chữ số có nghĩa)
+            var bmi = new Float64Array(out.BMI.length);
+            for (var i = 0; i < bmi.length; i++) {
+                bmi[i] = isFinite(out.BMI[i]) ? +out.BMI[i].toPrecision(7) : NaN;
+            }
+            out.BMI = bmi;
+        }
+        decoded = out;
+        return out;
+    }
+
+    function asList(value) {
+        if (value === null || value === undefined) return [];
+        return Array.isArray(value) ? value : [value];
+    }
+
+    function allowedCodes(cols, name, values) {
+        var labels = cols.labels[name];
+        var allowed = new Uint8Array(labels.length);
+        values.forEach(function (value) {
+            var code = labels.indexOf(String(value));
+            if (code >= 0) allowed[code] = 1;
+        });
+        return allowed;
+    }
+
+    // Khoảng ngày đăng ký dưới dạng độ lệch so với ngày đầu của dữ liệu; null khi bao hết mọi hồ sơ
+    function dayWindow(data, createdRange) {
+        var bounds = data.created_range;
+        if (!createdRange || !bounds || (createdRange[0] <= bounds[0] && createdRange[1] >= bounds[1])) return null;
+        return [Math.max(createdRange[0] - data.day_range[0], 0), createdRange[1] - data.day_range[0]];
+    }
+
+    // Vị trí các dòng khớp bộ lọc (cùng quy tắc với ProfileDataset.select), nhớ vài trạng thái lọc gần nhất
+    // (timeline cần cả dòng chưa lọc theo ngày)
+    var selected = [];
+
+    function selectRows(cols, loc, dis, gen, age, bmiRange, days) {
+        var key = JSON.stringify([cols.version, cols.n, loc, dis, gen, age, bmiRange, days]);
+        for (var s = 0; s < selected.length; s++) {
+            if (selected[s].key === key) return selected[s].rows;
+        }
+
+        var tests = [];
+        [['location', loc], ['commonDiseases', dis], ['gender', gen], ['age_group', age]].forEach(function (f) {
+            var values = asList(f[1]);
+            if (values.length && cols[f[0]]) {
+                tests.push([cols[f[0]], allowedCodes(cols, f[0], values)]);
+            }
+        });
+        // Như server: khoảng BMI luôn áp dụng, hồ sơ không có BMI bị loại
+        var bmi = bmiRange && cols.BMI ? cols.BMI : null;
+        var lo = bmi ? bmiRange[0] : 0, hi = bmi ? bmiRange[1] : 0;
+        var created = days && cols.createdAt ? cols.createdAt : null;
+
+        var rows = new Int32Array(cols.n), count = 0;
+        outer:
+        for (var i = 0; i < cols.n; i++) {
+            for (var t = 0; t < tests.length; t++) {
+                var code = tests[t][0][i];
+                if (code < 0 || !tests[t][1][code]) continue outer;
+            }
+            if (bmi !== null && !(bmi[i] >= lo && bmi[i] <= hi)) continue;
+            if (created !== null && !(created[i] >= days[0] && created[i] <= days[1])) continue;
+            rows[count++] = i;
+        }
+        selected.unshift({key: key, rows: rows.subarray(0, count)});
+        selected.length = Math.min(selected.length, 4);
+        return selected[0].rows;
+    }
+
+    // Số hồ sơ của từng lựa chọn trong mỗi dropdown theo các bộ lọc còn lại, trong một lượt:
+    // dòng qua mọi bộ lọc được đếm cho mọi dropdown, dòng chỉ trượt đúng một bộ lọc danh mục
+    // được đếm cho dropdown của bộ lọc đó
+    function facetCounts(cols, filters, bmiRange, days) {
+        var codes = [], tests = [], counts = [];
+        filters.forEach(function (f) {
+            var name = f[0], values = asList(f[1]);
+            codes.push(cols[name] || null);
+            tests.push(values.length && cols[name] ? allowedCodes(cols, name, values) : null);
+            counts.push(new Float64Array(cols[name] ? cols.labels[name].length : 0));
+        });
+        var bmi = bmiRange && cols.BMI ? cols.BMI : null;
+        var lo = bmi ? bmiRange[0] : 0, hi = bmi ? bmiRange[1] : 0;
+        var created = days && cols.createdAt ? cols.createdAt : null;
+        var k = filters.length;
+        for (var i = 0; i < cols.n; i++) {
+            if (bmi !== null && !(bmi[i] >= lo && bmi[i] <= hi)) continue;
+            if (created !== null && !(created[i] >= days[0] && created[i] <= days[1])) continue;
+            var failed = -1, misses = 0;
+            for (var t = 0; t < k && misses < 2; t++) {
+                if (tests[t] === null) continue;
+                var code = codes[t][i];
+                if (code < 0 || !tests[t][code]) {
+                    failed = t;
+                    misses++;
+                }
+            }
+            if (misses > 1) continue;
+            for (t = 0; t < k; t++) {
+                if (codes[t] === null || (misses && t !== failed)) continue;
+                var c = codes[t][i];
+                if (c >= 0) counts[t][c]++;
+            }
+        }
+        return counts;
+    }
+
+    // ---- Đếm ----
+
+    function countBy(cols, name, rows) {
+        var codes = cols[name], counts = new Float64Array(cols.labels[name].length);
+        for (var i = 0; i < rows.length; i++) {
+            var c = codes[rows[i]];
+            if (c >= 0) counts[c]++;
+        }
+        return counts;
+    }
+
+    function countBy2(cols, a, b, rows) {
+        var ca = cols[a], cb = cols[b], nb = cols.labels[b].length;
+        var counts = new Float64Array(cols.labels[a].length * nb);
+        for (var i = 0; i < rows.length; i++) {
+            var x = ca[rows[i]], y = cb[rows[i]];
+            if (x >= 0 && y >= 0) counts[x * nb + y]++;
+        }
+        return {counts: counts, nb: nb};
+    }
+
+    // Nhãn có hồ sơ, nhiều nhất trước (như value_counts)
+    function ranked(cols, name, counts) {
+        var codes = [];
+        for (var c = 0; c < counts.length; c++) {
+            if (counts[c] > 0) codes.push(c);
+        }
+        codes.sort(function (x, y) { return counts[y] - counts[x] || x - y; });
+        return codes;
+    }
+
+    function copy(value) {
+        return JSON.parse(JSON.stringify(value));
+    }
+
+    function emptyFigure(proto) {
+        return {data: [], layout: copy(proto.layout)};
+    }
+
+    function colorway(proto) {
+        var template = proto.layout.template;
+        return (template && template.layout && template.layout.colorway) || ['#636efa'];
+    }
+
+    // Trace mẫu theo tên (màu cố định theo nhãn khi lọc); nhãn mới dùng colorway
+    function traceFor(proto, name, type, index) {
+        var found = null;
+        proto.data.forEach(function (trace) {
+            if (found === null && trace.name === name && (!type || trace.type === type)) found = trace;
+        });
+        if (found !== null) return copy(found);
+        var base = null;
+        proto.data.forEach(function (trace) {
+            if (base === null && (!type || trace.type === type)) base = trace;
+        });
+        var trace = copy(base || {type: type});
+        var old = trace.name;
+        trace.name = name;
+        trace.legendgroup = name;
+        if (trace.hovertemplate && old) trace.hovertemplate = trace.hovertemplate.split(old).join(name);
+        trace.marker = trace.marker || {};
+        var colors = colorway(proto);
+        trace.marker.color = colors[index % colors.length];
+        return trace;
+    }
+
+    // ---- Biểu đồ (cùng tên với các hàm create_* trong components/charts.py) ----
+
+    function pieBy(name) {
+        return function (chart, cols, rows) {
+            var proto = chart.prototype;
+            if (!rows.length || !cols[name] || !proto.data.length) return emptyFigure(proto);
+            var counts = countBy(cols, name, rows);
+            var codes = ranked(cols, name, counts);
+            var fig = copy(proto), trace = fig.data[0], old = proto.data[0];
+            var labels = codes.map(function (c) { return cols.labels[name][c]; });
+            trace.labels = labels;
+            trace.values = codes.map(function (c) { return counts[c]; });
+            if (old.marker && old.marker.colors) {
+                var byLabel = {};
+                old.labels.forEach(function (label, i) { byLabel[label] = old.marker.colors[i]; });
+                trace.marker.colors = labels.map(function (label) { return byLabel[label]; });
+            }
+            if (old.hovertemplate && old.hovertemplate.indexOf('customdata') >= 0) {
+                trace.customdata = labels.map(function (label) { return [label]; });
+            }
+            return fig;
+        };
+    }
+
+    function registrationHeatmap(chart, cols, rows) {
+        var proto = chart.prototype;
+        var wd = cols.created_weekday, hr = cols.created_hour;
+        if (!wd || !hr) return emptyFigure(proto);
+        var grid = new Float64Array(7 * 24), days = new Uint8Array(7), hours = new Uint8Array(24);
+        for (var i = 0; i < rows.length; i++) {
+            var d = wd[rows[i]], h = hr[rows[i]];
+            if (d >= 0 && h >= 0) {
+                grid[d * 24 + h]++;
+                days[d] = 1;
+                hours[h] = 1;
+            }
+        }
+        var x = [];
+        for (var hour = 0; hour < 24; hour++) {
+            if (hours[hour]) x.push(hour);
+        }
+        var fig = copy(proto);
+        fig.data[0].x = x;
+        fig.data[0].y = DAYS;
+        // Ngày không có hồ sơ: cả hàng trống (như reindex theo thứ trong tuần)
+        fig.data[0].z = DAYS.map(function (_, day) {
+            return x.map(function (hour) { return days[day] ? grid[day * 24 + hour] : null; });
+        });
+        return fig;
+    }
+
+    function dayLabel(day) {
+        return new Date(day * 86400000).toISOString().slice(0, 10);
+    }
+
+    // Ngày đầu của từng kỳ (ngày / tuần từ thứ Hai / tháng) giao với [lo, hi], như period_starts
+    function periodStarts(lo, hi, freq) {
+        var starts = [], day;
+        if (freq === 'M') {
+            var d = new Date(lo * 86400000), y = d.getUTCFullYear(), m = d.getUTCMonth();
+            for (day = Date.UTC(y, m, 1) / 86400000; day <= hi; day = Date.UTC(y, ++m, 1) / 86400000) {
+                starts.push(day);
+            }
+            return starts;
+        }
+        var step = freq === 'W' ? 7 : 1;
+        // 1970-01-01 là thứ Năm: thứ Hai gần nhất trước đó
+        for (day = freq === 'W' ? lo - (((lo + 3) % 7) + 7) % 7 : lo; day <= hi; day += step) starts.push(day);
+        return starts;
+    }
+
+    // Số đăng ký / đăng nhập theo kỳ trong cửa sổ ngày đăng ký, đếm trên các dòng chưa lọc theo ngày
+    function timelineChart(chart, cols, rows, data, state) {
+        var proto = chart.prototype;
+        if (!proto.data.length || !data.day_range) return emptyFigure(proto);
+        var day0 = data.day_range[0];
+        var lo = state.days ? state.days[0] + day0 : data.day_range[0];
+        var hi = state.days ? state.days[1] + day0 : data.day_range[1];
+        var span = hi - lo + 1, freq = span <= DAILY_MAX_DAYS ? 'D' : span <= WEEKLY_MAX_DAYS ? 'W' : 'M';
+        var starts = periodStarts(lo, hi, freq), all = state.undated;
+        var fig = copy(proto);
+        var series = TIME_COLUMNS.filter(function (col) { return cols[col]; });
+        series.forEach(function (col, k) {
+            var days = cols[col], daily = new Float64Array(span);
+            for (var i = 0; i < all.length; i++) {
+                var d = days[all[i]];
+                if (d >= 0 && d + day0 >= lo && d + day0 <= hi) daily[d + day0 - lo]++;
+            }
+            var y = [];
+            starts.forEach(function (start, p) {
+                var end = Math.min(p + 1 < starts.length ? starts[p + 1] : hi + 1, hi + 1), n = 0;
+                for (var day = Math.max(start, lo); day < end; day++) n += daily[day - lo];
+                y.push(n);
+            });
+            fig.data[k].x = starts.map(dayLabel);
+            fig.data[k].y = y;
+        });
+        fig.layout.xaxis.title.text = 'Thời gian (theo ' + PERIODS[freq] + ')';
+        return fig;
+    }
+
+    function bmiValues(cols, rows) {
+        var values = [];
+        for (var i = 0; i < rows.length; i++) {
+            var v = cols.BMI[rows[i]];
+            if (isFinite(v)) values.push(v);
+        }
+        return values;
+    }
+
+    // Lib.increment của Plotly: x + delta, làm tròn sai số dấu phẩy động
+    function increment(x, delta) {
+        var inverse = 1 / Math.abs(delta);
+        var total = inverse > 1 ? (inverse * x + inverse * delta) / inverse : x + delta;
+        var length = String(total).length;
+        if (length > 16 && length >= String(delta).length + String(x).length) {
+            var rounded = +total.toPrecision(12);
+            if (String(rounded).indexOf('e+') === -1) total = rounded;
+        }
+        return total;
+    }
+
+    // Các cột go.Histogram(nbinsx=bins) tự chọn (components.charts.histogram_bins)
+    function histogramBins(values, lo, hi, bins) {
+        var rough = (hi - lo) / bins, size = 1;
+        if (rough > 0) {
+            var base = Math.pow(10, Math.floor(Math.log(rough) / Math.LN10)), ratio = rough / base;
+            size = base * (ratio < 2 ? 2 : ratio < 5 ? 5 : 10);
+        }
+        var start = increment(Math.ceil((lo - (hi - lo) * 1e-4) / size) * size, -size);
+        var nearEdge = function (v) { return (1 + (v - start) * 100 / size) % 100 < 2; };
+        var integers = 0, edge = 0, middle = 0, n = values.length;
+        values.forEach(function (v) {
+            if (v % 1 === 0) integers++;
+            if (nearEdge(v)) edge++;
+            if (nearEdge(v + size / 2)) middle++;
+        });
+        if (integers === n) {
+            if (size < 1) start = lo - 0.5 * size;
+            else {
+                start -= 0.5;
+                if (start + size < lo) start += size;
+            }
+        } else if (middle < n * 0.1 && (edge > n * 0.3 || nearEdge(lo) || nearEdge(hi))) {
+            start += start + size / 2 < lo ? size / 2 : -size / 2;
+        }
+        return {start: start, size: size, count: 1 + Math.floor((hi - start) / size)};
+    }
+
+    // Đếm theo cột trái đóng như Plotly (findBin)
+    function histogram(values, bins) {
+        var lo = Infinity, hi = -Infinity;
+        values.forEach(function (v) {
+            if (v < lo) lo = v;
+            if (v > hi) hi = v;
+        });
+        var b = histogramBins(values, lo, hi, bins), counts = new Array(b.count).fill(0), edges = [];
+        for (var e = 0; e <= b.count; e++) edges.push(b.start + e * b.size);
+        values.forEach(function (v) {
+            var k = Math.floor((v - b.start) / b.size + 1e-9);
+            counts[Math.min(Math.max(k, 0), b.count - 1)]++;
+        });
+        return {counts: counts, edges: edges};
+    }
+
+    function bmiChart(chart, cols, rows, data) {
+        var proto = chart.prototype, values = cols.BMI ? bmiValues(cols, rows) : [];
+        if (!values.length) return emptyFigure(proto);
+        var h = histogram(values, data.bmi_bins);
+        var fig = copy(proto), trace = fig.data[0];
+        trace.x = [];
+        trace.width = [];
+        for (var i = 0; i < h.counts.length; i++) {
+            trace.x.push((h.edges[i] + h.edges[i + 1]) / 2);
+            trace.width.push(h.edges[i + 1] - h.edges[i]);
+        }
+        trace.y = h.counts;
+        return fig;
+    }
+
+    // Làm tròn nửa về số chẵn (np.round)
+    function roundHalfEven(x) {
+        var r = Math.round(x);
+        return (Math.abs(x % 1) === 0.5 && r % 2 !== 0) ? r - 1 : r;
+    }
+
+    function quantile(run, p) {
+        var n = run.length, pos = Math.min(Math.max(p * n - 0.5, 0), n - 1);
+        var lo = Math.floor(pos), hi = Math.ceil(pos), frac = pos - lo;
+        return run[lo] * (1 - frac) + run[hi] * frac;
+    }
+
+    function boxStats(run, maxOutliers) {
+        var q1 = quantile(run, 0.25), median = quantile(run, 0.5), q3 = quantile(run, 0.75);
+        var sum = 0;
+        run.forEach(function (v) { sum += v; });
+        var lo = 0, hi = run.length, low = q1 - 1.5 * (q3 - q1), high = q3 + 1.5 * (q3 - q1);
+        while (lo < run.length && run[lo] < low) lo++;
+        while (hi > 0 && run[hi - 1] > high) hi--;
+        var outliers = run.slice(0, lo).concat(run.slice(hi));
+        if (outliers.length > maxOutliers) {
+            var kept = [];
+            for (var i = 0; i < maxOutliers; i++) {
+                kept.push(outliers[roundHalfEven(i * (outliers.length - 1) / (maxOutliers - 1))]);
+            }
+            outliers = kept;
+        }
+        return {
+            q1: q1, median: median, q3: q3, mean: sum / run.length,
+            lowerfence: Math.min(q1, run[Math.min(lo, run.length - 1)]),
+            upperfence: Math.max(q3, run[Math.max(hi - 1, 0)]),
+            outliers: outliers
+        };
+    }
+
+    function bmiBoxPlot(chart, cols, rows, data) {
+        var proto = chart.prototype;
+        if (!cols.BMI || !cols.gender) return emptyFigure(proto);
+        // Nhóm theo giới tính, thứ tự xuất hiện đầu tiên (như pd.factorize)
+        var order = [], groups = {};
+        for (var i = 0; i < rows.length; i++) {
+            var g = cols.gender[rows[i]], v = cols.BMI[rows[i]];
+            if (g < 0 || !isFinite(v)) continue;
+            if (!groups[g]) {
+                groups[g] = [];
+                order.push(g);
+            }
+            groups[g].push(v);
+        }
+        var fig = emptyFigure(proto);
+        order.forEach(function (g, index) {
+            var name = cols.labels.gender[g];
+            var run = groups[g].sort(function (a, b) { return a - b; });
+            var s = boxStats(run, data.max_outliers);
+            var box = traceFor(proto, name, 'box', index);
+            if (!proto.data.some(function (t) { return t.name === name; })) box.marker.color = BOX_COLOR;
+            box.x = [name];
+            ['q1', 'median', 'q3', 'lowerfence', 'upperfence', 'mean'].forEach(function (k) { box[k] = [s[k]]; });
+            fig.data.push(box);
+            if (s.outliers.length) {
+                var points = traceFor(proto, name, 'scatter', index);
+                points.marker.color = box.marker.color;
+                points.showlegend = false;
+                points.x = s.outliers.map(function () { return name; });
+                points.y = s.outliers;
+                fig.data.push(points);
+            }
+        });
+        return fig;
+    }
+
+    function densityPlot(proto, cols, rows, step) {
+        var age = cols.age_group, bmi = cols.BMI, ages = cols.labels.age_group.length;
+        var lo = Infinity, hi = -Infinity, buckets = new Int32Array(rows.length), valid = new Uint8Array(rows.length);
+        for (var i = 0; i < rows.length; i++) {
+            var a = age[rows[i]], v = bmi[rows[i]];
+            if (a < 0 || !isFinite(v)) continue;
+            valid[i] = 1;
+            buckets[i] = Math.floor(v / step);
+            if (buckets[i] < lo) lo = buckets[i];
+            if (buckets[i] > hi) hi = buckets[i];
+        }
+        var fig = copy(proto), trace = fig.data[0];
+        trace.x = cols.labels.age_group;
+        if (lo > hi) {
+            trace.y = [];
+            trace.z = [];
+            return fig;
+        }
+        var n = hi - lo + 1, counts = new Float64Array(n * ages);
+        for (var j = 0; j < rows.length; j++) {
+            if (valid[j]) counts[(buckets[j] - lo) * ages + age[rows[j]]]++;
+        }
+        trace.y = [];
+        trace.z = [];
+        for (var b = 0; b < n; b++) {
+            trace.y.push((lo + b) * step + step / 2);
+            var row = [];
+            for (var c = 0; c < ages; c++) row.push(counts[b * ages + c] > 0 ? counts[b * ages + c] : null);
+            trace.z.push(row);
+        }
+        return fig;
+    }
+
+    function scatterPlot(chart, cols, rows, data) {
+        if (!rows.length) return {data: [], layout: {template: chart.prototype.layout.template}};
+        if (rows.length > data.max_points) return densityPlot(chart.density, cols, rows, data.bmi_step);
+        // Mỗi bệnh lý một trace, thứ tự xuất hiện đầu tiên
+        var proto = chart.prototype, dis = cols.commonDiseases, order = [], points = {};
+        for (var i = 0; i < rows.length; i++) {
+            var d = dis[rows[i]], a = cols.labels.age_group[cols.age_group[rows[i]]];
+            if (!points[d]) {
+                points[d] = {x: [], y: []};
+                order.push(d);
+            }
+            points[d].x.push(a === undefined ? null : AGE_NUM[a]);
+            points[d].y.push(isFinite(cols.BMI[rows[i]]) ? cols.BMI[rows[i]] : null);
+        }
+        var fig = emptyFigure(proto);
+        order.forEach(function (d, index) {
+            var trace = traceFor(proto, d < 0 ? '' : cols.labels.commonDiseases[d], proto.data[0].type, index);
+            trace.x = points[d].x;
+            trace.y = points[d].y;
+            fig.data.push(trace);
+        });
+        return fig;
+    }
+
+    function ageDiseaseStacked(chart, cols, rows) {
+        var proto = chart.prototype, ages = cols.labels.age_group, diseases = cols.labels.commonDiseases;
+        var grid = countBy2(cols, 'commonDiseases', 'age_group', rows);
+        var fig = emptyFigure(proto), index = 0;
+        for (var d = 0; d < diseases.length; d++) {
+            var x = [], y = [];
+            for (var a = 0; a < ages.length; a++) {
+                var count = grid.counts[d * grid.nb + a];
+                if (count > 0) {
+                    x.push(ages[a]);
+                    y.push(count);
+                }
+            }
+            if (!x.length) continue;
+            var trace = traceFor(proto, diseases[d], 'bar', index++);
+            trace.x = x;
+            trace.y = y;
+            fig.data.push(trace);
+        }
+        // Giữ thứ tự trace của hình mẫu (màu và chú thích không nhảy khi lọc)
+        var rank = {};
+        proto.data.forEach(function (t, i) { rank[t.name] = i; });
+        fig.data.sort(function (p, q) {
+            return (p.name in rank ? rank[p.name] : 1e9) - (q.name in rank ? rank[q.name] : 1e9);
+        });
+        return fig;
+    }
+
+    function diseaseTreemap(chart, cols, rows) {
+        var proto = chart.prototype, locs = cols.labels.location, diseases = cols.labels.commonDiseases;
+        if (!rows.length || !proto.data.length) return emptyFigure(proto);
+        var grid = countBy2(cols, 'location', 'commonDiseases', rows);
+        var fig = copy(proto), trace = fig.data[0];
+        var ids = [], labels = [], parents = [], values = [], totals = new Float64Array(locs.length);
+        for (var l = 0; l < locs.length; l++) {
+            for (var d = 0; d < diseases.length; d++) {
+                var count = grid.counts[l * grid.nb + d];
+                if (count > 0) {
+                    ids.push(locs[l] + '/' + diseases[d]);
+                    labels.push(diseases[d]);
+                    parents.push(locs[l]);
+                    values.push(count);
+                    totals[l] += count;
+                }
+            }
+        }
+        for (var p = 0; p < locs.length; p++) {
+            if (totals[p] > 0) {
+                ids.push(locs[p]);
+                labels.push(locs[p]);
+                parents.push('');
+                values.push(totals[p]);
+            }
+        }
+        trace.ids = ids;
+        trace.labels = labels;
+        trace.parents = parents;
+        trace.values = values;
+        return fig;
+    }
+
+    function topBar(name, withText) {
+        return function (chart, cols, rows) {
+            var proto = chart.prototype;
+            if (!rows.length || !cols[name] || !proto.data.length) return emptyFigure(proto);
+            var counts = countBy(cols, name, rows);
+            var codes = ranked(cols, name, counts).slice(0, 10);
+            var fig = copy(proto), trace = fig.data[0];
+            trace.x = codes.map(function (c) { return counts[c]; });
+            trace.y = codes.map(function (c) { return cols.labels[name][c]; });
+            trace.marker.color = trace.x;
+            if (withText) trace.text = trace.x;
+            return fig;
+        };
+    }
+
+    // Bản đồ tỉnh: thứ tự tỉnh cố định (chart.locations), chỉ điền lại giá trị
+    function provinceMap(chart, cols, rows) {
+        var proto = chart.prototype;
+        if (!proto.data.length || !chart.locations) return emptyFigure(proto);
+        var n = chart.locations.length, locs = cols.labels.location;
+        var slot = locs.map(function (label) { return label in chart.slots ? chart.slots[label] : -1; });
+        var counts = new Float64Array(n), top = chart.locations.map(function () { return ''; });
+        var topCounts = new Float64Array(n), loc = cols.location;
+        for (var i = 0; i < rows.length; i++) {
+            var c = loc[rows[i]];
+            if (c >= 0 && slot[c] >= 0) counts[slot[c]]++;
+        }
+        if (cols.commonDiseases && rows.length) {
+            // Bệnh phổ biến nhất của mỗi tỉnh; hòa thì nhãn đứng trước (như sort của server)
+            var diseases = cols.labels.commonDiseases, grid = countBy2(cols, 'location', 'commonDiseases', rows);
+            var bySlot = new Float64Array(n * grid.nb);
+            for (var l = 0; l < locs.length; l++) {
+                if (slot[l] < 0) continue;
+                for (var d = 0; d < grid.nb; d++) bySlot[slot[l] * grid.nb + d] += grid.counts[l * grid.nb + d];
+            }
+            for (var s = 0; s < n; s++) {
+                for (var k = 0; k < grid.nb; k++) {
+                    var count = bySlot[s * grid.nb + k];
+                    if (count > 0 && (count > topCounts[s] || (count === topCounts[s] && diseases[k] < top[s]))) {
+                        topCounts[s] = count;
+                        top[s] = diseases[k];
+                    }
+                }
+            }
+        }
+        var shares = [], customdata = [];
+        for (var p = 0; p < n; p++) {
+            shares.push(100 * topCounts[p] / Math.max(counts[p], 1));
+            customdata.push([chart.locations[p], counts[p], top[p], Math.round(shares[p] * 1e6) / 1e6]);
+        }
+        var values = [Array.from(counts), shares.map(function (v, q) { return counts[q] > 0 ? v : null; })];
+        var max = Math.max.apply(null, [1].concat(values[0]));
+        var fig = copy(proto);
+        fig.data.forEach(function (trace, t) {
+            trace.customdata = customdata;
+            if (trace.type === 'choropleth') {
+                trace.z = values[t];
+            } else {
+                trace.marker.color = values[t];
+                trace.marker.size = values[0].map(function (v) { return 6 + 24 * Math.sqrt(v / max); });
+            }
+        });
+        return fig;
+    }
+
+    var CHARTS = {
+        create_age_chart: pieBy('age_group'),
+        create_gender_chart: pieBy('gender'),
+        create_registration_heatmap: registrationHeatmap,
+        create_timeline_chart: timelineChart,
+        create_bmi_chart: bmiChart,
+        create_bmi_box_plot: bmiBoxPlot,
+        create_scatter_plot: scatterPlot,
+        create_age_disease_stacked: ageDiseaseStacked,
+        create_disease_treemap: diseaseTreemap,
+        create_allergy_bar_chart: topBar('allergies', false),
+        create_province_chart: topBar('location', true),
+        create_province_map: provinceMap
+    };
+
+    // ---- Thẻ KPI: điền giá trị vào các thẻ mẫu của server ----
+
+    function statsCards(data, cols, rows) {
+        var cards = {};
+        data.stats_cards.props.children.forEach(function (col) {
+            var body = col.props.children.props.children[1];
+            cards[body.props.children[0].props.children] = col;
+        });
+        var stats = [];
+        if (cols.BMI) {
+            var values = bmiValues(cols, rows), sum = 0;
+            values.forEach(function (v) { sum += v; });
+            if (rows.length) stats.push(['BMI Trung bình', (sum / values.length).toFixed(1)]);
+        }
+        stats.push(['Tổng hồ sơ', rows.length.toLocaleString('en-US')]);
+        [['commonDiseases', 'Loại bệnh lý'], ['location', 'Vùng miền']].forEach(function (c) {
+            if (cols[c[0]] && rows.length) stats.push([c[1], String(ranked(cols, c[0], countBy(cols, c[0], rows)).length)]);
+        });
+        var row = copy(data.stats_cards);
+        row.props.children = stats.filter(function (s) { return cards[s[0]]; }).map(function (s) {
+            var col = copy(cards[s[0]]);
+            col.props.children.props.children[1].props.children[1].props.children = s[1];
+            return col;
+        });
+        return row;
+    }
+
+    function render(data, loc, dis, gen, age, bmiRange, createdRange, undated) {
+        var cols = columns(data), days = dayWindow(data, createdRange);
+        var r = {cols: cols, days: days, rows: selectRows(cols, loc, dis, gen, age, bmiRange, days)};
+        // Timeline: cửa sổ theo khoảng ngày, các bộ lọc còn lại như DataSource.timeline
+        if (undated) r.undated = days ? selectRows(cols, loc, dis, gen, age, bmiRange, null) : r.rows;
+        return r;
+    }
+
+    var api = {
+        summary: function (loc, dis, gen, age, bmiRange, createdRange, resetClicks, data) {
+            if (!data) throw window.dash_clientside.PreventUpdate;
+            var r = render(data, loc, dis, gen, age, bmiRange, createdRange);
+            return [r.rows.length.toLocaleString('en-US'), statsCards(data, r.cols, r.rows)];
+        },
+        // Lựa chọn của các dropdown lọc kèm số hồ sơ (như facet_options)
+        facets: function (loc, dis, gen, age, bmiRange, createdRange, data) {
+            if (!data) throw window.dash_clientside.PreventUpdate;
+            var cols = columns(data);
+            var outputs = window.dash_clientside.callback_context.outputs_list;
+            var specs = outputs.map(function (o) { return data.filters[o.id]; });
+            var values = {'loc-filter': loc, 'dis-filter': dis, 'gen-filter': gen, 'age-filter': age};
+            var counts = facetCounts(cols, outputs.map(function (o, t) {
+                return [specs[t][0], values[o.id]];
+            }), bmiRange, dayWindow(data, createdRange));
+            return specs.map(function (spec, t) {
+                var labels = cols.labels[spec[0]] || [];
+                return spec[1].map(function (value) {
+                    var code = labels.indexOf(String(value));
+                    var n = code >= 0 ? counts[t][code] : 0;
+                    return {label: value + ' (' + n.toLocaleString('en-US') + ')', value: value, disabled: n === 0};
+                });
+            });
+        },
+        // Biểu đồ của một tab; outputs_list cho biết callback này vẽ những hình nào
+        tab: function (loc, dis, gen, age, bmiRange, createdRange, activeTab, data) {
+            if (!data) throw window.dash_clientside.PreventUpdate;
+            var outputs = window.dash_clientside.callback_context.outputs_list;
+            var ids = outputs.map(function (o) { return o.id; });
+            var tabId = Object.keys(data.tabs).filter(function (t) { return data.tabs[t].indexOf(ids[0]) >= 0; })[0];
+            // Tab ẩn giữ hình cũ; mở tab sẽ vẽ lại theo bộ lọc hiện tại
+            if (activeTab !== tabId) throw window.dash_clientside.PreventUpdate;
+            var undated = ids.some(function (id) { return data.charts[id].kind === 'create_timeline_chart'; });
+            var r = render(data, loc, dis, gen, age, bmiRange, createdRange, undated);
+            return ids.map(function (id) {
+                var chart = data.charts[id];
+                return CHARTS[chart.kind](chart, r.cols, r.rows, data, r);
+            });
+        }
+    };
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {dashboard: api});
+})();
@@ -0,0 +1,29 @@
+/*
+ * Liên kết tải xuống nhóm hồ sơ đang lọc: href của mỗi liên kết
+ * ({type: 'export-link', format}) mang trạng thái bộ lọc trong query string,
+ * theo đúng cách callbacks/export.py đọc (export_filters).
+ */
+(function () {
+    var api = {
+        href: function (loc, dis, gen, age, bmi, created) {
+            var params = new URLSearchParams();
+            var add = function (name, value) {
+                if (value === null || value === undefined || value === '') return;
+                (Array.isArray(value) ? value : [value]).forEach(function (v) { params.append(name, v); });
+            };
+            add('loc', loc);
+            add('dis', dis);
+            add('gen', gen);
+            add('age', age);
+            if (bmi) params.set('bmi', bmi[0] + ',' + bmi[1]);
+            if (created) params.set('created', created[0] + ',' + created[1]);
+            var query = params.toString();
+            var outputs = window.dash_clientside.callback_context.outputs_list;
+            return outputs.map(function (output) {
+                return 'export.' + output.id.format + (query ? '?' + query : '');
+            });
+        }
+    };
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {exporter: api});
+})();
@@ -0,0 +1,37 @@
+/*
+ * Debounce thanh trượt: khi kéo, drag_value đổi liên tục; chỉ ghi vào value
+ * (đầu vào của các callback lọc) khi tay dừng đủ `delay` ms, nên một lần kéo
+ * chỉ gửi vài request thay vì một request cho mỗi bước.
+ * dates() hiển thị khoảng của thanh trượt ngày đăng ký.
+ */
+(function () {
+    var latest = {};
+
+    var api = {
+        debounce: function (id, value, delay) {
+            if (value === null || value === undefined) throw window.dash_clientside.PreventUpdate;
+            var token = (latest[id] || 0) + 1;
+            latest[id] = token;
+            return new Promise(function (resolve, reject) {
+                setTimeout(function () {
+                    // Có giá trị mới hơn trong lúc chờ: bỏ giá trị này
+                    if (latest[id] !== token) reject(window.dash_clientside.PreventUpdate);
+                    else resolve(value);
+                }, delay);
+            });
+        },
+
+        // Khoảng ngày của thanh trượt ngày đăng ký (số ngày từ 1970-01-01) dạng dd/mm/yyyy
+        dates: function (value) {
+            if (!value) return '';
+            var label = function (day) {
+                var d = new Date(day * 86400000);
+                var pad = function (n) { return (n < 10 ? '0' : '') + n; };
+                return pad(d.getUTCDate()) + '/' + pad(d.getUTCMonth() + 1) + '/' + d.getUTCFullYear();
+            };
+            return label(value[0]) + ' – ' + label(value[1]);
+        }
+    };
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {sliders: api});
+})();
@@ -0,0 +1,110 @@
+"""Công việc dồn lại khi kéo thanh trượt BMI: một loạt trạng thái lọc gửi liên tiếp.
+
+Mô phỏng một lần kéo (mỗi 16 ms một bước, có vài lần dừng tay) và gửi request
+của tab 'Chỉ số Sức khỏe' cho mỗi giá trị mà từng chế độ thanh trượt phát ra,
+trên một pool luồng như server nhiều luồng:
+
+- drag: mọi bước kéo (updatemode='drag');
+- debounce: giá trị khi dừng tay đủ lâu (DASHBOARD_SLIDER_DEBOUNCE_MS);
+- mouseup: chỉ giá trị lúc thả.
+
+Mỗi chế độ chạy hai lần: các request từ cùng một trang (cùng 'page-id', lần chạy
+cũ bị JobTracker dừng khi có request mới) và mỗi request một trang riêng (không
+hủy, như trước đây). In số hình đã dựng, số lần chạy bị hủy và thời gian tới khi
+có hình của trạng thái cuối.
+
+    python -m benchmarks.bench_burst --size 1e6 --debounce-ms 150
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pages.app import create_dash_app
+from pages.dashboard import get_layout
+from callbacks.dashboard_callbacks import register_callbacks
+from callbacks.figure_builder import FigureBuilder
+from data.dataset import ProfileDataset
+from benchmarks.bench_payload import update_requests
+from benchmarks.synthetic import make_profiles
+
+TAB = 'tab-2'
+STEP_MS = 16
+
+
+def drag_trace(start, stop, steps, pauses):
+    """[(ms, [lo, hi])]: the upper handle dragged from start to stop, resting at `pauses` step numbers"""
+    trace, t = [], 0.0
+    for i in range(steps + 1):
+        hi = round((start + (stop - start) * i / steps) * 2) / 2
+        if not trace or trace[-1][1][1] != hi:
+            trace.append((t, [10.0, hi]))
+        t += STEP_MS + (400 if i in pauses else 0)
+    return trace
+
+
+def emitted(trace, mode, debounce_ms):
+    """Values that reach the filter callbacks in each slider mode"""
+    if mode == 'drag':
+        return trace
+    if mode == 'mouseup':
+        return [(trace[-1][0], trace[-1][1])]
+    out = []
+    for (t, value), nxt in zip(trace, trace[1:] + [(float('inf'), None)]):
+        if nxt[0] - t >= debounce_ms:
+            out.append((t + debounce_ms, value))
+    return out
+
+
+def run_burst(app, builder, events, shared_page, workers):
+    dependencies = app.server.test_client().get('/_dash-dependencies').get_json()
+    tab = [d for d in dependencies if f'{TAB}-rendered.data' in d['output']]
+    started = time.perf_counter()
+    done = {}
+    lock = threading.Lock()
+
+    def send(i, value):
+        values = {'bmi-range-filter': value, 'tabs-network': TAB, 'page-id': 'burst' if shared_page else f'page-{i}'}
+        body = next(update_requests(tab, values))
+        response = app.server.test_client().post('/_dash-update-component', json=body)
+        with lock:
+            done[i] = (response.status_code, time.perf_counter() - started)
+
+    before = sum(t['count'] for t in builder.timings().values())
+    with ThreadPoolExecutor(workers) as pool:
+        for i, (at, value) in enumerate(events):
+            delay = started + at / 1000 - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, i, value)
+    built = sum(t['count'] for t in builder.timings().values()) - before
+    status, finished = done[len(events) - 1]
+    assert status == 200, status
+    return built, sum(code == 204 for code, _ in done.values()), finished - events[-1][0] / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=float, default=1e6)
+    parser.add_argument('--debounce-ms', type=int, default=150)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    dataset = ProfileDataset(make_profiles(args.size))
+    trace = drag_trace(18.5, 32, 60, pauses={20, 40})
+
+    print(f"{'mode':<9} {'page':<9} {'requests':>8} {'charts built':>12} {'cancelled':>9} {'last ready':>11}")
+    for mode in ('drag', 'debounce', 'mouseup'):
+        events = emitted(trace, mode, args.debounce_ms)
+        for shared in (True, False):
+            # App mới cho mỗi lần chạy: cache kết quả rỗng
+            app = create_dash_app()
+            app.layout = get_layout(dataset)
+            builder = FigureBuilder()
+            register_callbacks(app, dataset, figure_builder=builder)
+            built, cancelled, latency = run_burst(app, builder, events, shared, args.workers)
+            print(f"{mode:<9} {'same' if shared else 'separate':<9} {len(events):>8} {built:>12} "
+                  f"{cancelled:>9} {latency * 1000:>9.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
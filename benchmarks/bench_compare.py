@@ -0,0 +1,85 @@
+"""So sánh nhóm: mỗi nhóm một lần lọc + đếm vs. một lần tổng hợp chung cho mọi nhóm.
+
+- baseline: mỗi nhóm chạy đường cũ của update_dashboard (df.copy() + isin) rồi đếm
+  bệnh lý / dị ứng và tính BMI trên bảng đã lọc (như mở mỗi nhóm một tab trình duyệt);
+- per cohort: mỗi nhóm lọc qua FilterIndex rồi take + đếm riêng;
+- shared: ProfileDataset.compare: gắn nhãn nhóm cho từng dòng rồi một lần groupby
+  trên các dòng thuộc ít nhất một nhóm.
+
+Kết quả của ba đường được so khớp.
+
+    python -m benchmarks.bench_compare --sizes 1e5 1e6
+"""
+import argparse
+import numpy as np
+from data.cohorts import COMPARE_COLUMNS, cohort_names, membership
+from data.compact import float_values
+from data.dataset import ProfileDataset
+from benchmarks.bench_filter import baseline_filter, timed
+from benchmarks.synthetic import make_profiles
+
+
+def cohort_sets(df):
+    locations = df['location'].value_counts().index
+    diabetes = [df['commonDiseases'].value_counts().index[0]]
+    cohort = dict(loc=None, dis=None, gen=None, age=None, bmi_range=None)
+    return {
+        '2 provinces': [dict(cohort, loc=[locations[0]], dis=diabetes), dict(cohort, loc=[locations[1]], dis=diabetes)],
+        'men vs women 60+': [dict(cohort, gen=['Nam'], age=['Trên 60']), dict(cohort, gen=['Nữ'], age=['Trên 60'])],
+        '4 overlapping': [dict(cohort, gen=['Nam']), dict(cohort, age=['31-45', '46-60']),
+                          dict(cohort, bmi_range=[18.5, 25.0]), dict(cohort, loc=list(locations[:3]))],
+    }
+
+
+def frame_stats(dff):
+    """Count, BMI (mean, min, max) and counts per label of one filtered frame"""
+    bmi = float_values(dff['BMI'])
+    counts = {col: dff[col].value_counts() for col in COMPARE_COLUMNS}
+    return len(dff), (bmi.mean(), bmi.min(), bmi.max()), {col: c[c > 0] for col, c in counts.items()}
+
+
+def baseline(df, cohorts):
+    return [frame_stats(baseline_filter(df, **filters)) for filters in cohorts]
+
+
+def per_cohort(dataset, cohorts):
+    return [frame_stats(dataset.index.apply(dataset.df, **filters)) for filters in cohorts]
+
+
+def same(expected, comparison):
+    for name, (count, bmi, counts) in zip(cohort_names(len(expected)), expected):
+        if comparison.summary.loc[name, 'count'] != count:
+            return False
+        if not np.allclose(comparison.summary.loc[name, ['bmi_mean', 'bmi_min', 'bmi_max']].to_numpy(float), bmi):
+            return False
+        for col, c in counts.items():
+            got = comparison.counts[col][name]
+            if got[got > 0].sort_index().to_dict() != c.sort_index().to_dict():
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e5, 1e6])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'cohorts':<18} {'baseline ms':>12} {'per cohort ms':>14} {'shared ms':>10} "
+          f"{'speedup':>8} {'equal':>6} {'rows aggregated (per cohort / shared)':>38}")
+    for size in args.sizes:
+        df = make_profiles(size)
+        dataset = ProfileDataset(df)
+        for name, cohorts in cohort_sets(df).items():
+            old, expected = timed(lambda: baseline(df, cohorts), args.repeat)
+            indexed, by_cohort = timed(lambda: per_cohort(dataset, cohorts), args.repeat)
+            new, comparison = timed(lambda: dataset.compare(cohorts), args.repeat)
+            equal = same(expected, comparison) and same(by_cohort, comparison)
+            union = np.count_nonzero(membership([dataset.select(**filters) for filters in cohorts], len(df)))
+            scanned = f"{int(comparison.summary['count'].sum()):,} / {union:,}"
+            print(f"{len(df):>10,} {name:<18} {old * 1000:>12.1f} {indexed * 1000:>14.1f} {new * 1000:>10.1f} "
+                  f"{old / new:>7.1f}x {'yes' if equal else 'NO':>6} {scanned:>38}")
+
+
+if __name__ == '__main__':
+    main()
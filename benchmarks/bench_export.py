@@ -0,0 +1,142 @@
+"""Xuất nhóm hồ sơ đang lọc: dựng cả file trong RAM vs. truyền từng khối qua /export.csv.
+
+- buffered: export_frame của mọi dòng khớp rồi to_csv một lần (như một callback
+  dcc.Download trả cả file);
+- streamed: đọc phản hồi của /export.csv từng khối rồi bỏ (như trình duyệt tải về),
+  với --chunk-rows dòng mỗi khối.
+
+Mỗi lần xuất chạy trong một tiến trình riêng; bộ nhớ là peak RSS tăng thêm so với
+lúc bắt đầu xuất (bảng dữ liệu đã nạp không tính). Sau đó đo thời gian callback
+tóm tắt của dashboard khi không có và khi có một lần xuất đang chạy song song.
+
+    python -m benchmarks.bench_export --size 1e6 --chunk-rows 20000
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from callbacks.export import EXPORT_CHUNK_ROWS, csv_chunks, export_frame
+from benchmarks.synthetic import make_profiles
+
+# Bộ lọc của lần xuất: bỏ trống = toàn bộ hồ sơ
+QUERY = ''
+
+
+def reset_peak_rss():
+    """Start a new VmHWM window (Linux: writing 5 to clear_refs); False where unsupported"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def make_app(df):
+    from pages.app import create_dash_app
+    from pages.dashboard import get_layout
+    from callbacks.dashboard_callbacks import register_callbacks
+    from data.dataset import ProfileDataset
+
+    dataset = ProfileDataset(df)
+    app = create_dash_app()
+    app.layout = get_layout(dataset, export_formats=('csv',))
+    register_callbacks(app, dataset)
+    return app
+
+
+def export_once(size, mode, chunk_rows):
+    """Runs in the child process: one export, stats printed as JSON"""
+    from data.data_loader import peak_rss_mb, memory_report
+
+    from flask import Flask
+    from callbacks.export import register_export
+    from data.dataset import ProfileDataset
+
+    df = make_profiles(size)
+    # Chỉ route xuất, với kích thước khối cần đo
+    server = Flask(__name__)
+    register_export(server, ProfileDataset(df), chunk_rows=chunk_rows)
+    client = server.test_client()
+    exact = reset_peak_rss()
+    base = peak_rss_mb() if exact else memory_report().get('rss')
+    start = time.perf_counter()
+    if mode == 'buffered':
+        nbytes = len(b''.join(csv_chunks([export_frame(df)])))
+    else:
+        response = client.get('/export.csv' + QUERY)
+        nbytes = sum(len(data) for data in response.response)
+        response.close()
+    seconds = time.perf_counter() - start
+    print(json.dumps({'rows': len(df), 'mb': nbytes / 2 ** 20, 'seconds': seconds,
+                      'peak_mb': peak_rss_mb() - base, 'exact': exact}))
+
+
+def summary_latency(client, body, repeat, offset):
+    """Seconds per summary callback, each with a new BMI range (no cache hits)"""
+    times = []
+    for i in range(repeat):
+        request = json.loads(json.dumps(body))
+        for item in request['inputs']:
+            if item['id'] == 'bmi-range-filter':
+                item['value'] = [15.0, 30.0 + (offset + i) * 0.5]
+        start = time.perf_counter()
+        response = client.post('/_dash-update-component', json=request)
+        times.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.status_code
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=float, default=1e6)
+    parser.add_argument('--chunk-rows', type=int, default=EXPORT_CHUNK_ROWS)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--export', metavar='MODE', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.export:
+        return export_once(int(args.size), args.export, args.chunk_rows)
+
+    print(f"{'mode':<9} {'rows':>10} {'CSV MB':>8} {'seconds':>8} {'peak +MB':>9}")
+    for mode in ('buffered', 'streamed'):
+        out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_export', '--size', str(args.size),
+                              '--chunk-rows', str(args.chunk_rows), '--export', mode],
+                             capture_output=True, text=True, check=True)
+        stats = json.loads(out.stdout.strip().splitlines()[-1])
+        note = '' if stats['exact'] else ' (RSS, peak not resettable)'
+        print(f"{mode:<9} {stats['rows']:>10,} {stats['mb']:>8.0f} {stats['seconds']:>8.2f} "
+              f"{stats['peak_mb']:>9.0f}{note}")
+
+    from benchmarks.bench_payload import update_requests
+    app = make_app(make_profiles(args.size))
+    client = app.server.test_client()
+    dependencies = client.get('/_dash-dependencies').get_json()
+    summary = [d for d in dependencies if 'count-display' in d['output']]
+    body = next(update_requests(summary, {'reset-filters-btn': 0}))
+
+    idle = summary_latency(client, body, args.repeat, 0)
+    done = threading.Event()
+
+    def export():
+        response = app.server.test_client().get('/export.csv' + QUERY)
+        for _ in response.response:
+            if done.is_set():
+                break
+        response.close()
+
+    worker = threading.Thread(target=export)
+    worker.start()
+    busy = summary_latency(client, body, args.repeat, args.repeat)
+    done.set()
+    worker.join()
+    print(f"\nsummary callback ms (median / max), {args.repeat} requests")
+    print(f"{'idle':<18} {statistics.median(idle) * 1000:>7.1f} / {max(idle) * 1000:.1f}")
+    print(f"{'during export':<18} {statistics.median(busy) * 1000:>7.1f} / {max(busy) * 1000:.1f}")
+
+
+if __name__ == '__main__':
+    main()
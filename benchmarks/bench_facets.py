@@ -0,0 +1,54 @@
+"""Số hồ sơ theo từng lựa chọn của dropdown lọc: groupby cho mỗi dropdown vs. facet_counts.
+
+Đường cũ lọc lại bảng dòng và value_counts một lần cho mỗi dropdown (bỏ bộ
+lọc của chính nó); ProfileDataset.facet_counts đọc khối đếm và chỉ quét các
+dòng ở ô BMI bị cắt. Kết quả hai đường được so khớp từng lựa chọn.
+
+    python -m benchmarks.bench_facets --sizes 1e5 1e6 1e7
+"""
+import argparse
+import time
+from data.cube import FILTER_DIMENSIONS
+from data.dataset import ProfileDataset
+from data.filter_index import as_list
+from benchmarks.bench_filter import baseline_filter, scenarios, timed
+from benchmarks.synthetic import make_profiles
+
+
+def baseline_facets(df, **filters):
+    """Một lần lọc + value_counts cho mỗi dropdown"""
+    result = {}
+    for name, column in FILTER_DIMENSIONS.items():
+        others = {key: as_list(value) if key != 'bmi_range' else value
+                  for key, value in dict(filters, **{name: None}).items()}
+        counts = baseline_filter(df, **others)[column].value_counts()
+        result[name] = counts[counts > 0]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e5, 1e6, 1e7])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'scenario':<14} {'groupby ms':>11} {'facets ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        df = make_profiles(size)
+        start = time.perf_counter()
+        dataset = ProfileDataset(df)
+        build = time.perf_counter() - start
+        print(f"{len(df):>10,} {'(build)':<14} {'':>11} {build * 1000:>10.1f}")
+
+        cases = scenarios(df)
+        cases['bmi cut'] = dict(loc=None, dis=None, gen=['Nam'], age=None, bmi_range=[18.7, 23.2])
+        for name, filters in cases.items():
+            old, expected = timed(lambda: baseline_facets(df, **filters), args.repeat)
+            new, result = timed(lambda: dataset.facet_counts(**filters), args.repeat)
+            for facet in FILTER_DIMENSIONS:
+                assert dict(result[facet]) == dict(expected[facet]), (name, facet)
+            print(f"{len(df):>10,} {name:<14} {old * 1000:>11.1f} {new * 1000:>10.1f} {old / new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
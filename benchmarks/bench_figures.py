@@ -0,0 +1,60 @@
+"""Độ trễ dựng toàn bộ biểu đồ của dashboard: tuần tự vs. thread pool.
+
+Mỗi lượt dựng lại mọi tab cho một trạng thái lọc (không qua cache), in p50/p95
+theo số luồng và thời gian từng biểu đồ để thấy biểu đồ nào giới hạn tốc độ.
+
+    python -m benchmarks.bench_figures --size 1e6 --workers 0 2 4 8
+"""
+import argparse
+import os
+import time
+import numpy as np
+from callbacks.dashboard_callbacks import TAB_CHARTS
+from callbacks.figure_builder import FigureBuilder
+from data.dataset import ProfileDataset
+from benchmarks.bench_filter import scenarios
+from benchmarks.synthetic import make_profiles
+
+
+def render_all(dataset, builder, filters):
+    rows, counts = dataset.query(dataset.select(**filters), **filters)
+    sources = {'rows': rows, 'counts': counts, 'timeline': dataset.timeline(**filters)}
+    tasks = [(component_id, build, sources[source])
+             for charts in TAB_CHARTS.values() for component_id, _, build, source in charts]
+    return builder.build_json(tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=float, default=1e6)
+    parser.add_argument('--workers', nargs='+', type=int, default=[0, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df = make_profiles(args.size)
+    dataset = ProfileDataset(df)
+    states = list(scenarios(df).values())
+    print(f"{len(df):,} rows, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'p50 ms':>9} {'p95 ms':>9}")
+
+    timings = None
+    for workers in args.workers:
+        builder = FigureBuilder(workers)
+        render_all(dataset, builder, states[0])  # warm-up
+        latencies = []
+        for _ in range(args.repeat):
+            for filters in states:
+                start = time.perf_counter()
+                render_all(dataset, builder, filters)
+                latencies.append(time.perf_counter() - start)
+        builder.shutdown()
+        print(f"{workers:>8} {np.percentile(latencies, 50) * 1000:>9.1f} {np.percentile(latencies, 95) * 1000:>9.1f}")
+        timings = timings or builder.timings()
+
+    print(f"\n{'chart':<24} {'mean ms':>9} {'max ms':>9}")
+    for name, t in timings.items():
+        print(f"{name:<24} {t['mean_sec'] * 1000:>9.1f} {t['max_sec'] * 1000:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
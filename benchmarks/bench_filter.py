@@ -0,0 +1,66 @@
+"""So sánh độ trễ lọc: df.copy() + isin nối tiếp vs. FilterIndex.
+
+    python -m benchmarks.bench_filter --sizes 1e5 1e6 1e7
+"""
+import argparse
+import time
+from data.filter_index import FilterIndex
+from benchmarks.synthetic import make_profiles
+
+
+def baseline_filter(df, loc, dis, gen, age, bmi_range):
+    """Đường lọc cũ của update_dashboard"""
+    dff = df.copy()
+    if loc: dff = dff[dff['location'].isin(loc)]
+    if dis: dff = dff[dff['commonDiseases'].isin(dis)]
+    if gen: dff = dff[dff['gender'].isin(gen)]
+    if age: dff = dff[dff['age_group'].isin(age)]
+    if bmi_range: dff = dff[(dff['BMI'] >= bmi_range[0]) & (dff['BMI'] <= bmi_range[1])]
+    return dff
+
+
+def scenarios(df):
+    locations = df['location'].value_counts().index
+    diseases = df['commonDiseases'].value_counts().index
+    full = [float(df['BMI'].min()), float(df['BMI'].max())]
+    return {
+        'default': dict(loc=None, dis=None, gen=None, age=None, bmi_range=full),
+        'one province': dict(loc=[locations[0]], dis=None, gen=None, age=None, bmi_range=full),
+        'bmi only': dict(loc=None, dis=None, gen=None, age=None, bmi_range=[20, 25]),
+        'all filters': dict(loc=list(locations[:3]), dis=list(diseases[:5]), gen=['Nam'],
+                            age=['31-45', '46-60'], bmi_range=[18.5, 30]),
+    }
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e5, 1e6, 1e7])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'scenario':<14} {'baseline ms':>12} {'index ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        df = make_profiles(size)
+        start = time.perf_counter()
+        index = FilterIndex(df)
+        build = time.perf_counter() - start
+        print(f"{len(df):>10,} {'(build)':<14} {'':>12} {build * 1000:>10.1f}")
+
+        for name, filters in scenarios(df).items():
+            old, expected = timed(lambda: baseline_filter(df, **filters), args.repeat)
+            new, result = timed(lambda: index.apply(df, **filters), args.repeat)
+            assert len(result) == len(expected), name
+            print(f"{len(df):>10,} {name:<14} {old * 1000:>12.1f} {new * 1000:>10.1f} {old / new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
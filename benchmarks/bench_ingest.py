@@ -0,0 +1,54 @@
+"""Nạp dữ liệu trực tiếp: ghi thêm từng lô vào CSV, đo tốc độ nối và độ trễ hiển thị.
+
+    python -m benchmarks.bench_ingest --base 1e6 --batch 1000 --batches 50
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from data.data_loader import load_and_clean_data
+from data.dataset import ProfileDataset
+from data.ingest import CsvTailer, LiveIngestor
+from benchmarks.synthetic import make_raw_profiles, to_csv_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--base', type=float, default=1e6)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--batches', type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(workdir, 'profiles.csv')
+        to_csv_rows(make_raw_profiles(args.base)).to_csv(path, index=False)
+        dataset = ProfileDataset(load_and_clean_data(path, use_cache=False))
+        ingestor = LiveIngestor(dataset, CsvTailer(path))
+
+        pending = to_csv_rows(make_raw_profiles(args.batch * args.batches, seed=1))
+        latencies = []
+        for i in range(args.batches):
+            batch = pending.iloc[i * args.batch:(i + 1) * args.batch]
+            written = time.perf_counter()
+            batch.to_csv(path, mode='a', header=False, index=False)
+            ingestor.poll_once()
+            # Dòng mới hiển thị được khi bộ đếm và chỉ mục đã cập nhật
+            dataset.query(dataset.select(loc=None), loc=None)
+            latencies.append(time.perf_counter() - written)
+
+        stats = ingestor.stats()
+        latencies.sort()
+        print(f"base rows        {int(args.base):>12,}")
+        print(f"appended rows    {stats['rows']:>12,} in {stats['batches']} batches")
+        print(f"ingest rate      {stats['rows_per_sec']:>12,.0f} rows/s")
+        print(f"latency p50      {latencies[len(latencies) // 2] * 1000:>12.1f} ms")
+        print(f"latency max      {latencies[-1] * 1000:>12.1f} ms")
+        print(f"dataset rows     {len(dataset):>12,} (version {dataset.version})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
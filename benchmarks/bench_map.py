@@ -0,0 +1,117 @@
+"""Bản đồ tỉnh: byte gửi đi và thời gian dựng + tuần tự hóa mỗi lần đổi bộ lọc.
+
+Ranh giới tỉnh tổng hợp (mỗi tỉnh một vòng nhiều đỉnh quanh tâm của nó,
+như file GeoJSON chi tiết chưa đơn giản hóa). So ba cách cập nhật:
+
+- naive: px.choropleth nhúng cả GeoJSON gốc trong hình, gửi lại mỗi lần lọc;
+- url: create_province_map, hình dạng là URL (/provinces.geojson) trình duyệt tải một lần;
+- patch: chỉ các mảng giá trị đổi so với hình trước (patch_outputs, mặc định của app).
+
+Thời gian vẽ trong trình duyệt không đo được ở đây; với 'url' / 'patch'
+plotly.js dùng lại hình dạng đã tải, chỉ tô lại màu.
+
+    python -m benchmarks.bench_map --size 1e5 --vertices 4000
+"""
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import plotly.express as px
+from plotly.io.json import to_json_plotly
+from callbacks.patching import figure_patch
+from components.charts import count_by, create_province_map
+from data.dataset import ProfileDataset
+from data.geometry import PROVINCE_CENTROIDS, load_provinces
+from benchmarks.bench_filter import timed
+from benchmarks.synthetic import make_profiles
+
+# Các lần đổi bộ lọc liên tiếp đo trên bản đồ
+UPDATES = [
+    ('all', {}),
+    ('gender', {'gen': ['Nam']}),
+    ('age group', {'gen': ['Nam'], 'age': ['31-45']}),
+    ('BMI', {'gen': ['Nam'], 'age': ['31-45'], 'bmi_range': [18.5, 25.0]}),
+    ('women 60+', {'gen': ['Nữ'], 'age': ['Trên 60']}),
+]
+
+
+def synthetic_provinces(vertices, seed=0):
+    """FeatureCollection of one detailed ring per province, named the way public files are ('Tỉnh X')"""
+    rng = np.random.default_rng(seed)
+    theta = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    features = []
+    for label, (lon, lat) in PROVINCE_CENTROIDS.items():
+        # Đường biên gồ ghề: vài sóng lớn + nhiễu nhỏ như bờ biển, sông
+        radius = 0.3 * (1 + 0.15 * np.sin(3 * theta + rng.uniform(0, 6)) + 0.05 * np.sin(17 * theta)
+                        + rng.normal(0, 0.004, vertices))
+        ring = np.column_stack([lon + radius * np.cos(theta), lat + radius * np.sin(theta)]).round(6)
+        ring = np.vstack([ring, ring[:1]])
+        name = label.replace('TP. ', 'Thành phố ') if label.startswith('TP. ') else 'Tỉnh ' + label
+        features.append({'type': 'Feature', 'properties': {'name': name, 'label': label, 'area_km2': 0},
+                         'geometry': {'type': 'Polygon', 'coordinates': [ring.tolist()]}})
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def naive_map(view, geojson):
+    counts = count_by(view, 'location').rename_axis('location').reset_index(name='count')
+    counts['location'] = counts['location'].astype(str)
+    fig = px.choropleth(counts, geojson=geojson, locations='location', featureidkey='properties.label',
+                        color='count', color_continuous_scale='GnBu')
+    fig.update_geos(visible=False, fitbounds='locations')
+    return fig
+
+
+def sizes(payload):
+    data = payload.encode('utf-8')
+    return len(data), len(gzip.compress(data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=float, default=1e5)
+    parser.add_argument('--vertices', type=int, default=4000, help='vertices per province outline')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    geojson = synthetic_provinces(args.vertices)
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'provinces.geojson')
+    with open(path, 'w') as f:
+        json.dump(geojson, f)
+    start = time.perf_counter()
+    geometry = load_provinces(path)
+    elapsed = time.perf_counter() - start
+    kept = sum(len(ring) for f in json.loads(geometry.body)['features'] for ring in f['geometry']['coordinates'])
+    print(f"geometry: {geometry.source_bytes / 1024:,.0f} KB, {args.vertices * len(geojson['features']):,} vertices "
+          f"-> {geometry.nbytes / 1024:,.0f} KB (gzip {len(gzip.compress(geometry.body)) / 1024:,.0f} KB), "
+          f"{kept:,} vertices, simplified in {elapsed * 1000:,.0f} ms (once per file)\n")
+
+    dataset = ProfileDataset(make_profiles(args.size))
+    print(f"{'update':<11} {'naive KB':>9} {'gzip':>7} {'ms':>6} {'url KB':>8} {'gzip':>6} {'ms':>6} "
+          f"{'patch KB':>9} {'gzip':>6} {'ms':>6}")
+    previous = None
+    for name, filters in UPDATES:
+        _, view = dataset.query(dataset.select(**filters), **filters)
+        naive_s, naive = timed(lambda: to_json_plotly(naive_map(view, geojson)), args.repeat)
+        url_s, url = timed(lambda: to_json_plotly(create_province_map(view)), args.repeat)
+        figure = json.loads(url)
+        if previous is None:
+            patch_s, patch = url_s, url
+        else:
+            def patched():
+                return to_json_plotly(figure_patch(previous, json.loads(to_json_plotly(create_province_map(view)))))
+            patch_s, patch = timed(patched, args.repeat)
+        previous = figure
+        (naive_b, naive_z), (url_b, url_z), (patch_b, patch_z) = sizes(naive), sizes(url), sizes(patch)
+        print(f"{name:<11} {naive_b / 1024:>9,.1f} {naive_z / 1024:>7,.1f} {naive_s * 1000:>6.1f} "
+              f"{url_b / 1024:>8,.1f} {url_z / 1024:>6,.1f} {url_s * 1000:>6.1f} "
+              f"{patch_b / 1024:>9,.1f} {patch_z / 1024:>6,.1f} {patch_s * 1000:>6.1f}")
+    os.remove(path)
+    os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
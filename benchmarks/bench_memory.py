@@ -0,0 +1,76 @@
+"""Số byte mỗi dòng của bảng hồ sơ: CSV vừa đọc, bảng sạch trước đây và bảng gọn.
+
+- raw: pd.read_csv của file xuất (chuỗi Python cho mọi cột chữ và thời gian);
+- int64/float64: bảng sạch với danh mục và thời gian đã mã hóa nhưng số để
+  kiểu mặc định (như trước khi có data/compact.py);
+- compact: bảng của load_and_clean_data (uint8/uint16, BMI float32 khi
+  float_values() trả lại đúng mọi giá trị, nếu không giữ float64).
+
+In byte mỗi dòng theo từng cột và tổng, kiểu đã chọn cho mỗi cột số, rồi so
+các biểu đồ dựng từ bảng gọn với bảng int64/float64.
+
+    python -m benchmarks.bench_memory --sizes 1e5 1e6
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import pandas as pd
+from plotly.io.json import to_json_plotly
+from callbacks.dashboard_callbacks import TAB_CHARTS
+from data.compact import COMPACT_DTYPES, column_bytes, compact_dtypes, float_values
+from data.data_loader import load_and_clean_data
+from data.dataset import ProfileDataset
+from benchmarks.synthetic import make_raw_profiles, to_csv_rows
+
+
+def widened(df):
+    """The same table with the numeric columns back at int64 / float64 (BMI as its decimals)"""
+    return df.assign(**{col: float_values(df[col]) if col == 'BMI' else df[col].astype('int64')
+                        for col in COMPACT_DTYPES if col in df.columns})
+
+
+def figures(df):
+    dataset = ProfileDataset(df)
+    rows, counts = dataset.query(None)
+    sources = {'rows': rows, 'counts': counts, 'timeline': dataset.timeline()}
+    return {component_id: to_json_plotly(build(sources[source]))
+            for charts in TAB_CHARTS.values() for component_id, _, build, source in charts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e5, 1e6])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        for size in args.sizes:
+            path = os.path.join(workdir, f'profiles_{int(size)}.csv')
+            to_csv_rows(make_raw_profiles(size)).to_csv(path, index=False)
+            tables = {'raw': pd.read_csv(path)}
+            tables['compact'] = load_and_clean_data(path, use_cache=False)
+            tables['int64/float64'] = widened(tables['compact'])
+            n = len(tables['raw'])
+
+            sizes = {name: column_bytes(df) for name, df in tables.items()}
+            columns = list(dict.fromkeys(col for s in sizes.values() for col in s))
+            print(f"{n:>10,} rows, bytes/row")
+            print(f"{'column':<16} " + ' '.join(f'{name:>14}' for name in tables))
+            for col in columns + ['total']:
+                values = [sum(s.values()) if col == 'total' else s.get(col) for s in sizes.values()]
+                print(f"{col:<16} " + ' '.join(f'{"-" if v is None else f"{v / n:.2f}":>14}' for v in values))
+            total = {name: sum(s.values()) for name, s in sizes.items()}
+            print(f"{'MB':<16} " + ' '.join(f'{v / 2 ** 20:>14,.1f}' for v in total.values()))
+            print(f"{'compact dtypes':<16} {compact_dtypes(tables['compact'])}")
+
+            before, after = figures(tables['int64/float64']), figures(tables['compact'])
+            same = [key for key in before if json.loads(before[key]) == json.loads(after[key])]
+            print(f"{'charts equal':<16} {len(same)}/{len(before)}\n")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Số byte truyền đi cho một lần cập nhật toàn bộ dashboard (tóm tắt + ba tab).
+
+Gọi thẳng endpoint _dash-update-component của app qua Flask test client, có
+và không có 'Accept-Encoding: gzip'.
+
+    python -m benchmarks.bench_payload --size 1e5
+"""
+import argparse
+from pages.app import create_dash_app
+from pages.dashboard import get_layout
+from callbacks.dashboard_callbacks import register_callbacks
+from benchmarks.synthetic import make_profiles
+
+
+def _output_spec(output):
+    if output.startswith('..'):
+        return [dict(zip(('id', 'property'), o.rsplit('.', 1))) for o in output.strip('.').split('...')]
+    return dict(zip(('id', 'property'), output.rsplit('.', 1)))
+
+
+def update_requests(dependencies, values):
+    """Request bodies of every server callback for the given component values"""
+    for dep in dependencies:
+        if dep.get('clientside_function'):
+            # Chạy trong trình duyệt, không có endpoint trên server
+            continue
+        inputs = [dict(id=i['id'], property=i['property'], value=values.get(i['id'])) for i in dep['inputs']]
+        state = [dict(id=s['id'], property=s['property'], value=values.get(s['id'])) for s in dep['state']]
+        yield dict(output=dep['output'], outputs=_output_spec(dep['output']), inputs=inputs, state=state,
+                   changedPropIds=[f"{inputs[0]['id']}.{inputs[0]['property']}"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=float, default=1e5)
+    args = parser.parse_args()
+
+    df = make_profiles(args.size)
+    app = create_dash_app()
+    app.layout = get_layout(df)
+    register_callbacks(app, df)
+    client = app.server.test_client()
+    dependencies = client.get('/_dash-dependencies').get_json()
+
+    for encoding in ('identity', 'gzip'):
+        total = 0
+        for tab in ('tab-1', 'tab-2', 'tab-3'):
+            values = {'gen-filter': ['Nam'], 'bmi-range-filter': [18.5, 30], 'tabs-network': tab,
+                      'reset-filters-btn': 0}
+            for body in update_requests(dependencies, values):
+                response = client.post('/_dash-update-component', json=body,
+                                       headers={'Accept-Encoding': encoding})
+                # Tab đang ẩn / không đổi trả 204 (không có nội dung)
+                total += len(response.data)
+        print(f"{encoding:<9} {total:>10,} bytes")
+
+
+if __name__ == '__main__':
+    main()
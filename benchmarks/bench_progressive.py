@@ -0,0 +1,85 @@
+"""Hiển thị dần: số ước lượng từ mẫu phân tầng vs. số chính xác trên toàn bảng.
+
+Với mỗi bộ lọc: thời gian đếm chính xác (select + đếm theo nhóm tuổi) và thời
+gian ước lượng (estimate trên mẫu), số dòng khớp, ước lượng ± nửa khoảng tin
+cậy 95% và sai số tương đối lớn nhất của các cột nhóm tuổi. Cuối cùng, tỉ lệ
+khoảng tin cậy chứa số chính xác qua nhiều mẫu (seed) khác nhau, kỳ vọng ~0,95.
+
+    python -m benchmarks.bench_progressive --size 1e6 --seeds 40
+"""
+import argparse
+import numpy as np
+from components.charts import count_by
+from data.dataset import ProfileDataset
+from data.sample import StratifiedSample, stratified_total
+from benchmarks.bench_filter import timed
+from benchmarks.synthetic import make_profiles
+
+# Bộ lọc đo: lọc theo địa điểm / bệnh lý chọn nguyên tầng (chính xác), các bộ lọc khác thì ước lượng;
+# 'loc': None là địa điểm nhiều hồ sơ nhất của bảng
+CASES = [
+    ('gender', {'gen': ['Nam']}),
+    ('age group', {'age': ['18-30', '31-45']}),
+    ('BMI off grid', {'bmi_range': [18.3, 27.7]}),
+    ('gender + BMI', {'gen': ['Nữ'], 'bmi_range': [20.1, 24.9]}),
+    ('location', {'loc': None}),
+    ('location + age', {'loc': None, 'age': ['46-60']}),
+]
+
+
+def exact_counts(dataset, filters):
+    positions = dataset.select(**filters)
+    rows, counts = dataset.query(positions, **filters)
+    return len(rows), count_by(counts, 'age_group')
+
+
+def estimated_counts(dataset, filters):
+    view = dataset.estimate(**filters)
+    return view, count_by(view, 'age_group')
+
+
+def coverage(df, dataset, cases, seeds):
+    """Share of (seed, case) pairs whose 95% interval holds the exact count"""
+    exact = {name: dataset.select(**filters) for name, filters in cases}
+    covered = total = 0
+    for seed in range(seeds):
+        sample = StratifiedSample(df, seed=seed)
+        for name, _ in cases:
+            positions = exact[name]
+            selected = np.flatnonzero(np.isin(sample.positions, positions))
+            estimate, error = stratified_total(sample.stratum, sample.sizes, selected)
+            covered += abs(estimate - len(positions)) <= error
+            total += 1
+    return covered / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=float, default=1e6)
+    parser.add_argument('--seeds', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_profiles(args.size)
+    dataset = ProfileDataset(df)
+    top = [df['location'].value_counts().index[0]]
+    cases = [(name, {k: top if k == 'loc' else v for k, v in filters.items()}) for name, filters in CASES]
+    dataset.estimate()  # dựng bảng mẫu một lần (mỗi phiên bản dữ liệu)
+    print(f"{len(df):,} rows, sample {len(dataset.sample.positions):,} rows "
+          f"in {len(dataset.sample.sizes):,} strata\n")
+    print(f"{'filter':<16} {'exact ms':>9} {'est ms':>7} {'exact rows':>11} {'estimate ± 95%':>20} "
+          f"{'in CI':>6} {'age max err':>12}")
+    for name, filters in cases:
+        old, (rows, counts) = timed(lambda: exact_counts(dataset, filters), args.repeat)
+        new, (view, estimate) = timed(lambda: estimated_counts(dataset, filters), args.repeat)
+        estimate = estimate.reindex(counts.index, fill_value=0)
+        worst = (abs(estimate - counts) / counts.clip(lower=1)).max()
+        inside = abs(view.total - rows) <= view.error
+        print(f"{name:<16} {old * 1000:>9.1f} {new * 1000:>7.1f} {rows:>11,} "
+              f"{f'{len(view):,} ± {view.error:,.0f}':>20} {'yes' if inside else 'no':>6} {worst:>11.1%}")
+
+    print(f"\n95% interval coverage over {args.seeds} seeds: {coverage(df, dataset, cases, args.seeds):.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Nạp CSV theo luồng: tốc độ và bộ nhớ đỉnh theo kích thước file và kích thước khối.
+
+Mỗi lần nạp chạy trong một tiến trình riêng để peak RSS không lẫn giữa các lần.
+
+    python -m benchmarks.bench_stream --sizes 1e6 4e6 --chunksize 200000
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from benchmarks.synthetic import make_raw_profiles, to_csv_rows
+
+WRITE_CHUNK = 500_000
+
+
+def write_csv(path, n):
+    """Synthetic export written in chunks (the generator never holds all rows)"""
+    for i, start in enumerate(range(0, n, WRITE_CHUNK)):
+        chunk = to_csv_rows(make_raw_profiles(min(WRITE_CHUNK, n - start), seed=i))
+        chunk.to_csv(path, mode='a' if start else 'w', header=not start, index=False)
+
+
+def load(path, mode, chunksize):
+    """Runs in the child process: load once and print stats as JSON"""
+    from data.data_loader import load_and_clean_data, load_count_cube, peak_rss_mb, \
+        stream_to_columnar, _sidecar_path
+    import time
+
+    start = time.perf_counter()
+    if mode == 'full':
+        rows = len(load_and_clean_data(path, use_cache=False))
+    elif mode == 'columnar':
+        rows = stream_to_columnar(path, _sidecar_path(path), chunksize)['rows']
+    else:
+        rows = len(load_count_cube(path, chunksize=chunksize))
+    seconds = time.perf_counter() - start
+    print(json.dumps({'rows': rows, 'rows_per_sec': rows / seconds, 'peak_rss_mb': peak_rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e6, 4e6])
+    parser.add_argument('--chunksize', type=int, default=200_000)
+    parser.add_argument('--modes', nargs='+', default=['full', 'columnar', 'cube'])
+    parser.add_argument('--load', nargs=2, metavar=('PATH', 'MODE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load:
+        return load(args.load[0], args.load[1], args.chunksize)
+
+    workdir = tempfile.mkdtemp()
+    try:
+        print(f"{'rows':>10} {'CSV MB':>8} {'mode':<9} {'rows/s':>10} {'peak RSS MB':>12}")
+        for size in args.sizes:
+            path = os.path.join(workdir, f'profiles_{int(size)}.csv')
+            write_csv(path, int(size))
+            csv_mb = os.path.getsize(path) / 2 ** 20
+            for mode in args.modes:
+                out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_stream', '--load', path, mode,
+                                      '--chunksize', str(args.chunksize)],
+                                     capture_output=True, text=True, check=True)
+                stats = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{stats['rows']:>10,} {csv_mb:>8.0f} {mode:<9} {stats['rows_per_sec']:>10,.0f} "
+                      f"{stats['peak_rss_mb']:>12.0f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
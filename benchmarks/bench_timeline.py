@@ -0,0 +1,75 @@
+"""Lọc theo ngày đăng ký và timeline: so sánh trên bảng dòng vs. TimeIndex.
+
+Đường cũ so sánh cột createdAt của mọi dòng để lọc một khoảng ngày và
+resample / groupby theo kỳ để dựng timeline; TimeIndex tìm nhị phân trên các
+ngày đã sắp xếp và đọc tổng tích lũy theo ngày (hai phép tra mỗi kỳ). Kết quả
+hai đường được so khớp.
+
+    python -m benchmarks.bench_timeline --sizes 1e5 1e6 1e7
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from data.time_index import TIME_SERIES, TimeIndex, period_starts
+from benchmarks.bench_filter import timed
+from benchmarks.synthetic import make_profiles
+
+# Pandas: tuần bắt đầu thứ Hai, tháng theo ngày đầu tháng (như period_starts)
+RESAMPLE = {'D': 'D', 'W': 'W-MON', 'M': 'MS'}
+
+
+def baseline_range(df, lo, hi):
+    """Vị trí các dòng đăng ký trong [lo, hi]: so sánh trên mọi dòng"""
+    created = df['createdAt']
+    start, stop = pd.Timestamp(np.datetime64(lo, 'D')), pd.Timestamp(np.datetime64(hi + 1, 'D'))
+    return np.flatnonzero(((created >= start) & (created < stop)).to_numpy())
+
+
+def baseline_timeline(df, lo, hi, freq):
+    """Số đăng ký / đăng nhập theo kỳ trong [lo, hi]: lọc rồi resample mỗi cột thời gian"""
+    start, stop = pd.Timestamp(np.datetime64(lo, 'D')), pd.Timestamp(np.datetime64(hi + 1, 'D'))
+    periods = pd.DatetimeIndex(period_starts(lo, hi, freq).astype('datetime64[D]'), name='period')
+    result = {}
+    for col, name in TIME_SERIES.items():
+        stamps = df[col][(df[col] >= start) & (df[col] < stop)]
+        counts = pd.Series(1, index=stamps.to_numpy()).resample(RESAMPLE[freq], label='left', closed='left').sum()
+        counts.index = counts.index.normalize()
+        result[name] = counts.reindex(periods, fill_value=0).to_numpy()
+    return pd.DataFrame(result, index=periods)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e5, 1e6, 1e7])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'case':<20} {'rows ms':>9} {'index ms':>9} {'speedup':>8}")
+    for size in args.sizes:
+        df = make_profiles(size)
+        start = time.perf_counter()
+        index = TimeIndex(df)
+        build = time.perf_counter() - start
+        print(f"{len(df):>10,} {'(build)':<20} {'':>9} {build * 1000:>9.1f}")
+
+        first, last = index.created_range
+        cases = [('range 30 days', (first + 100, first + 129), None),
+                 ('range 1 year', (first + 30, first + 394), None),
+                 ('timeline daily', (last - 59, last), 'D'),
+                 ('timeline weekly', (last - 364, last), 'W'),
+                 ('timeline monthly', index.day_range, 'M')]
+        for name, (lo, hi), freq in cases:
+            if freq is None:
+                old, expected = timed(lambda: baseline_range(df, lo, hi), args.repeat)
+                new, result = timed(lambda: index.positions(lo, hi), args.repeat)
+                assert np.array_equal(result, expected), name
+            else:
+                old, expected = timed(lambda: baseline_timeline(df, lo, hi, freq), args.repeat)
+                new, result = timed(lambda: index.timeline(lo, hi, freq=freq), args.repeat)
+                assert (result.to_numpy() == expected.to_numpy()).all(), name
+            print(f"{len(df):>10,} {name:<20} {old * 1000:>9.1f} {new * 1000:>9.2f} {old / new:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
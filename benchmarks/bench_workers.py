@@ -0,0 +1,66 @@
+"""Bộ nhớ theo số worker: mỗi worker là một tiến trình gọi create_app() như gunicorn -w N.
+
+So sánh bộ dữ liệu ánh xạ dùng chung (ProfileDataset.open) với bản riêng
+trong RAM của từng worker. Số liệu đọc khi tất cả worker cùng đang chạy:
+RSS, phần riêng (anon) và PSS (trang dùng chung chia đều giữa các tiến trình).
+
+    python -m benchmarks.bench_workers --size 1e6 --workers 1 2 4
+"""
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+from benchmarks.synthetic import make_raw_profiles, to_csv_rows
+
+
+def _worker(path, shared, ready, done):
+    from data.data_loader import load_and_clean_data, memory_report
+    from pages.factory import create_app
+    config = {'data_file': path, 'metrics': False}
+    source = None if shared else load_and_clean_data(path, use_cache=False)
+    create_app(config, source=source)
+    ready.put(memory_report())
+    done.wait()
+
+
+def measure(path, workers, shared):
+    ctx = mp.get_context('spawn')
+    ready, done = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=_worker, args=(path, shared, ready, done)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    reports = [ready.get() for _ in procs]
+    done.set()
+    for p in procs:
+        p.join()
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=float, default=1e6)
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(workdir, 'profiles.csv')
+        to_csv_rows(make_raw_profiles(args.size)).to_csv(path, index=False)
+        # Dựng sẵn các file ánh xạ để chỉ đo trạng thái đang phục vụ
+        measure(path, 1, shared=True)
+
+        print(f"{'mode':<8} {'workers':>7} {'RSS/worker':>11} {'private/worker':>15} {'PSS total':>10}")
+        for shared in (True, False):
+            for n in args.workers:
+                reports = measure(path, n, shared)
+                rss = sum(r.get('rss', 0) for r in reports) / n
+                anon = sum(r.get('anon', 0) for r in reports) / n
+                pss = sum(r.get('pss', 0) for r in reports)
+                print(f"{'shared' if shared else 'private':<8} {n:>7} {rss:>9.1f}MB {anon:>13.1f}MB {pss:>8.1f}MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Kiểm tra histogram / box plot tính trên server khớp cách Plotly tự tính từ dữ liệu thô.
+
+Box plot so với tham chiếu độc lập: np.percentile(method='hazen') là phương
+pháp 'linear' của Plotly, râu là điểm cuối cùng nằm trong 1.5 IQR. Histogram
+so với các tính chất cột của go.Histogram(nbinsx=20) (bề rộng 1/2/5 x 10^k,
+không quá 20 cột phủ min..max, mọi hồ sơ được đếm) và khối đếm phải cho
+đúng các cột của dữ liệu thô; giá trị cố định lấy từ hình Plotly nằm trong
+tests/test_bmi_stats.py. In kích thước JSON của hình để thấy payload không
+tăng theo số hồ sơ.
+
+    python -m benchmarks.check_bmi_stats --sizes 1e3 1e5 1e6
+"""
+import argparse
+import numpy as np
+import plotly.io as pio
+from components.charts import BMI_BINS, bmi_histogram, box_stats, create_bmi_chart, create_bmi_box_plot
+from data.compact import float_values
+from data.dataset import ProfileDataset
+from benchmarks.synthetic import make_profiles
+
+
+def reference_box(values):
+    values = np.sort(values[np.isfinite(values)])
+    q1, median, q3 = np.percentile(values, [25, 50, 75], method='hazen')
+    inside = values[(values >= q1 - 1.5 * (q3 - q1)) & (values <= q3 + 1.5 * (q3 - q1))]
+    lowerfence, upperfence = min(q1, inside.min()), max(q3, inside.max())
+    n_outliers = int(((values < lowerfence) | (values > upperfence)).sum())
+    return q1, median, q3, lowerfence, upperfence, n_outliers
+
+
+def check_bins(counts, edges, bmi):
+    bmi = bmi[np.isfinite(bmi)]
+    size = edges[1] - edges[0]
+    mantissa = size / 10.0 ** np.floor(np.log10(size))
+    assert np.isclose(mantissa, [1, 2, 5]).any(), f'bin width {size} is not 1/2/5 x 10^k'
+    assert np.allclose(np.diff(edges), size), 'bins of unequal width'
+    assert edges[0] <= bmi.min() < edges[1] and edges[-2] <= bmi.max() < edges[-1], 'bins do not cover min..max'
+    assert len(counts) <= BMI_BINS + 1 and (bmi.max() - bmi.min()) / size <= BMI_BINS
+    assert counts.sum() == len(bmi), 'rows left out of the histogram'
+
+
+def check(dff, view):
+    counts, edges = bmi_histogram(dff)
+    bmi = float_values(dff['BMI'])
+    check_bins(counts, edges, bmi)
+    cube_counts, cube_edges = bmi_histogram(view)
+    assert np.array_equal(cube_edges, edges) and np.array_equal(cube_counts, counts), 'count cube bins differ'
+
+    stats = box_stats(dff, max_outliers=len(dff))
+    for gender, row in stats.iterrows():
+        expected = reference_box(bmi[(dff['gender'] == gender).to_numpy()])
+        got = (row['q1'], row['median'], row['q3'], row['lowerfence'], row['upperfence'], len(row['outliers']))
+        assert np.allclose(got, expected), f'{gender}: {got} != {expected}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e3, 1e5, 1e6])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'filter':<12} {'histogram B':>12} {'box plot B':>11}")
+    for size in args.sizes:
+        dataset = ProfileDataset(make_profiles(size))
+        for name, filters in (('all', {}), ('bmi 20-27', {'bmi_range': [20, 27]}),
+                              ('31-45 nam', {'age': ['31-45'], 'gen': ['Nam']})):
+            dff, view = dataset.query(dataset.select(**filters), **filters)
+            check(dff, view)
+            hist = len(pio.to_json(create_bmi_chart(dff)))
+            box = len(pio.to_json(create_bmi_box_plot(dff)))
+            print(f"{len(dataset.df):>10,} {name:<12} {hist:>12,} {box:>11,}")
+    print("OK: bins, quartiles and fences match")
+
+
+if __name__ == '__main__':
+    main()
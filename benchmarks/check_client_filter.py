@@ -0,0 +1,170 @@
+"""Kiểm tra chế độ client: assets/client_filter.js cho cùng số liệu với server.
+
+Chạy các callback clientside trong Node.js trên payload của client_payload()
+và so từng biểu đồ / thẻ KPI / danh sách lựa chọn của dropdown lọc với kết quả
+server dựng từ cùng bộ lọc (so giá trị theo nhãn, không so màu hay thứ tự trace). In thời gian lọc
++ dựng hình trong JS và kích thước payload gửi một lần.
+
+    python -m benchmarks.check_client_filter --sizes 1e3 1e5
+"""
+import argparse
+import base64
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import numpy as np
+from plotly.io.json import to_json_plotly
+from callbacks.client_data import client_payload
+from callbacks.dashboard_callbacks import TAB_CHARTS, create_stats_cards_layout
+from components.charts import create_stats_cards_data
+from components.filters import facet_options, option_values
+from data.cube import FILTER_DIMENSIONS
+from data.dataset import ProfileDataset
+from benchmarks.synthetic import make_profiles
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', 'client_filter.js')
+
+# Chạy summary + ba tab cho từng bộ lọc, ghi hình ra JSON
+RUNNER = """
+global.window = {dash_clientside: {PreventUpdate: {}}};
+require(process.argv[2]);
+const fs = require('fs');
+const input = JSON.parse(fs.readFileSync(process.argv[3]));
+const api = window.dash_clientside.dashboard;
+const out = input.cases.map(f => {
+    const start = process.hrtime.bigint();
+    const [count, cards] = api.summary(f.loc, f.dis, f.gen, f.age, f.bmi_range, f.created_range, 0, input.payload);
+    const result = {__count: count, __cards: cards};
+    const filters = Object.keys(input.payload.filters);
+    window.dash_clientside.callback_context = {outputs_list: filters.map(id => ({id, property: 'options'}))};
+    api.facets(f.loc, f.dis, f.gen, f.age, f.bmi_range, f.created_range, input.payload).forEach((options, i) => result[filters[i]] = options);
+    for (const [tab, ids] of Object.entries(input.payload.tabs)) {
+        window.dash_clientside.callback_context = {outputs_list: ids.map(id => ({id, property: 'figure'}))};
+        api.tab(f.loc, f.dis, f.gen, f.age, f.bmi_range, f.created_range, tab, input.payload).forEach((fig, i) => result[ids[i]] = fig);
+    }
+    result.__ms = Number(process.hrtime.bigint() - start) / 1e6;
+    return result;
+});
+fs.writeFileSync(process.argv[4], JSON.stringify(out));
+"""
+
+
+def _decode(value):
+    if isinstance(value, dict) and 'bdata' in value:
+        array = np.frombuffer(base64.b64decode(value['bdata']), dtype=value['dtype'])
+        if 'shape' in value:
+            array = array.reshape([int(s) for s in str(value['shape']).split(',')])
+        return _decode(array.tolist())
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, float):
+        return None if math.isnan(value) else round(value, 6)
+    return value
+
+
+def canonical(component_id, figure):
+    """Values per label of a figure, independent of trace order and colors"""
+    traces = [(t.get('type'), t.get('name'), {k: _decode(v) for k, v in t.items()})
+              for t in figure.get('data', [])]
+    if component_id in ('age-graph', 'gender-pie-chart'):
+        return {label: v for _, _, t in traces for label, v in zip(t['labels'], t['values'])}
+    if component_id == 'disease-treemap':
+        return {i: (label, parent, v) for _, _, t in traces
+                for i, label, parent, v in zip(t['ids'], t['labels'], t['parents'], t['values'])}
+    if component_id in ('allergy-bar-chart', 'province-graph'):
+        return {label: v for _, _, t in traces for v, label in zip(t['x'], t['y'])}
+    if component_id == 'province-map':
+        return {name: (t.get('customdata'), t.get('z')) for _, name, t in traces}
+    if component_id == 'age-disease-stacked':
+        return {name: dict(zip(t['x'], t['y'])) for _, name, t in traces}
+    if component_id == 'scatter-plot' and traces and traces[0][0] != 'heatmap':
+        return {name: sorted(zip(t['x'], t['y']), key=str) for _, name, t in traces}
+    keys = ('x', 'y', 'z', 'width', 'q1', 'median', 'q3', 'lowerfence', 'upperfence', 'mean')
+    result = {(kind, name): {k: t[k] for k in keys if k in t} for kind, name, t in traces}
+    if component_id == 'timeline-chart' and traces:
+        # Độ chi tiết (ngày / tuần / tháng) nằm ở tiêu đề trục
+        result['xaxis'] = figure['layout']['xaxis']['title']['text']
+    return result
+
+
+def cases(df, bmi_bounds, created):
+    locations = df['location'].value_counts().index.tolist()
+    lo, hi = created
+    everything = [lo, hi]
+    return [
+        dict(loc=None, dis=None, gen=None, age=None, bmi_range=list(bmi_bounds),
+             created_range=everything),
+        dict(loc=locations[:2], dis=None, gen='Nam', age=None, bmi_range=[18.5, 30], created_range=everything),
+        dict(loc=None, dis=None, gen=None, age=['31-45'], bmi_range=[20, 22], created_range=[lo + 30, lo + 60]),
+        dict(loc=[locations[-1]], dis=None, gen='Nữ', age='Trên 60', bmi_range=[14, 40],
+             created_range=[lo, (lo + hi) // 2]),
+        dict(loc=None, dis=None, gen=None, age=None, bmi_range=[10, 50], created_range=[hi - 400, hi]),
+        dict(loc=['?'], dis=None, gen=None, age=None, bmi_range=[10, 50], created_range=everything),
+    ]
+
+
+def check(size, workdir):
+    dataset = ProfileDataset(make_profiles(size))
+    rows, counts = dataset.query(None)
+    values = {name: option_values(dataset, column) for name, column in FILTER_DIMENSIONS.items()}
+    payload = json.loads(to_json_plotly(client_payload(
+        rows, counts, dataset.version, TAB_CHARTS, create_stats_cards_layout(create_stats_cards_data(counts)),
+        {f'{name}-filter': [column, values[name]] for name, column in FILTER_DIMENSIONS.items()},
+        dataset.timeline())))
+    filters = cases(rows, dataset.bmi_range, dataset.created_range)
+
+    paths = [os.path.join(workdir, name) for name in ('runner.js', 'input.json', 'output.json')]
+    with open(paths[0], 'w') as f:
+        f.write(RUNNER)
+    with open(paths[1], 'w') as f:
+        json.dump({'payload': payload, 'cases': filters}, f)
+    subprocess.run(['node', paths[0], SCRIPT, paths[1], paths[2]], check=True)
+    with open(paths[2]) as f:
+        actual = json.load(f)
+
+    mismatches = 0
+    for f, result in zip(filters, actual):
+        dff, view = dataset.query(dataset.select(**f), **f)
+        sources = {'rows': dff, 'counts': view, 'timeline': dataset.timeline(**f)}
+        expected = {'__count': f"{len(dff):,}",
+                    '__cards': json.loads(to_json_plotly(create_stats_cards_layout(create_stats_cards_data(view))))}
+        facets = dataset.facet_counts(**f)
+        for name in FILTER_DIMENSIONS:
+            expected[f'{name}-filter'] = facet_options(values[name], facets[name])
+        for charts in TAB_CHARTS.values():
+            for component_id, prop, build, source in charts:
+                if prop == 'figure':
+                    figure = json.loads(to_json_plotly(build(sources[source])))
+                    expected[component_id] = canonical(component_id, figure)
+                    result[component_id] = canonical(component_id, result[component_id])
+        bad = [key for key in expected if expected[key] != result[key]]
+        mismatches += len(bad)
+        print(f"{int(size):>10,} {len(dff):>10,} rows {result['__ms']:>8.1f} ms  {', '.join(bad) or 'ok'}")
+    print(f"{'':>10} payload {len(json.dumps(payload)) / 1024:,.0f} KB (columns "
+          f"{len(json.dumps(payload['columns'])) / 1024:,.0f} KB)")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e3, 1e5])
+    args = parser.parse_args()
+    if shutil.which('node') is None:
+        sys.exit('node (Node.js) is required to run the client-side callbacks')
+
+    workdir = tempfile.mkdtemp()
+    try:
+        print(f"{'dataset':>10} {'filtered':>10} {'js time':>13}  mismatches")
+        mismatches = sum(check(size, workdir) for size in args.sizes)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
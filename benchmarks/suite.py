@@ -0,0 +1,183 @@
+"""Bộ benchmark: thời gian, kích thước payload và bộ nhớ đỉnh theo kích thước dữ liệu.
+
+Đo load_and_clean_data, từng hàm create_* trong components/charts.py và toàn
+bộ callback (tóm tắt + ba tab, không cache; tab so sánh nhóm đo riêng). Kết quả ghi ra JSON; với
+--baseline so sánh với lần chạy trước và trả mã lỗi 1 khi chậm hơn ngưỡng.
+
+    python -m benchmarks.suite --sizes 1e3 1e5 1e6 --out bench.json
+    python -m benchmarks.suite --sizes 1e3 1e5 1e6 --baseline bench.json --threshold 1.25
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+from plotly.io.json import to_json_plotly
+from components import charts
+from callbacks.dashboard_callbacks import COMPARE_CHARTS, COMPARE_TAB, TAB_CHARTS, register_callbacks
+from data.data_loader import load_and_clean_data
+from data.dataset import ProfileDataset
+from benchmarks.synthetic import make_raw_profiles, make_profiles, to_csv_rows
+
+# Trạng thái lọc dùng cho phép đo toàn bộ callback
+FILTER_STATE = dict(loc=None, dis=None, gen=['Nam', 'Nữ'], age=['18-30', '31-45'], bmi_range=[18.5, 30],
+                    created_range=None)
+# Các nhóm của phép đo tab so sánh (chồng lên nhau)
+COMPARE_STATE = [dict(gen='Nam'), dict(age=['31-45', '46-60']), dict(bmi_range=[18.5, 25.0])]
+
+
+class CallbackRecorder:
+    """Stands in for the Dash app: keeps the registered callback functions"""
+
+    def __init__(self):
+        self.callbacks = {}
+
+    def callback(self, *args, **kwargs):
+        def register(fn):
+            outputs = args[0] if isinstance(args[0], list) else [args[0]]
+            self.callbacks[outputs[0].component_id] = fn
+            return fn
+        return register
+
+    def clientside_callback(self, *args, **kwargs):
+        # Chạy trong trình duyệt: không có gì để đo
+        pass
+
+
+def chart_builders():
+    """create_* functions of components/charts.py with the data source they are fed in the app"""
+    sources = {build.__name__: source for charts_ in TAB_CHARTS.values()
+               for _, _, build, source in charts_ if hasattr(build, '__name__')}
+    sources.update({build.__name__: 'comparison' for _, _, build in COMPARE_CHARTS})
+    return [(name, fn, sources.get(name, 'rows'))
+            for name, fn in inspect.getmembers(charts, inspect.isfunction)
+            if name.startswith('create_') and fn.__module__ == charts.__name__]
+
+
+def measure(fn, repeat):
+    """Median seconds over `repeat` runs, then peak traced memory of one more run"""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, statistics.median(seconds), peak / 2 ** 20
+
+
+def payload_bytes(result):
+    try:
+        return len(to_json_plotly(result))
+    except (TypeError, ValueError):
+        return None
+
+
+def run_size(size, repeat, workdir):
+    results = []
+
+    def record(name, fn, serialize=True):
+        result, seconds, peak_mb = measure(fn, repeat)
+        results.append({'size': int(size), 'name': name, 'seconds': seconds, 'peak_mb': peak_mb,
+                        'payload_bytes': payload_bytes(result) if serialize else None})
+        return result
+
+    path = os.path.join(workdir, f'profiles_{int(size)}.csv')
+    to_csv_rows(make_raw_profiles(size)).to_csv(path, index=False)
+    record('load_and_clean_data', lambda: load_and_clean_data(path, use_cache=False), serialize=False)
+
+    df = make_profiles(size)
+    dataset = ProfileDataset(df)
+    rows, counts = dataset.query(None)
+    data = {'rows': rows, 'counts': counts, 'timeline': dataset.timeline(),
+            'comparison': dataset.compare(COMPARE_STATE)}
+    for name, fn, source in chart_builders():
+        params = inspect.signature(fn).parameters
+        record(name, (lambda fn=fn, d=data[source]: fn(d)) if len(params) == 1 else
+               (lambda fn=fn, d=data[source]: fn(d, False)))
+
+    # Toàn bộ callback cho một trạng thái lọc, cache tắt (ngân sách 0 byte)
+    app = CallbackRecorder()
+    register_callbacks(app, dataset, cache_bytes=0)
+    filters = [FILTER_STATE[k] for k in ('loc', 'dis', 'gen', 'age', 'bmi_range', 'created_range')]
+
+    def full_callback():
+        outputs = [app.callbacks['count-display'](*filters, 0, dataset.version, None)]
+        for tab_id, tab_charts in TAB_CHARTS.items():
+            outputs.append(app.callbacks[tab_charts[0][0]](*filters, tab_id, dataset.version, None, None))
+        return outputs
+
+    record('update_dashboard', full_callback)
+    record('update_compare', lambda: app.callbacks['cohort-table'](COMPARE_STATE, COMPARE_TAB, dataset.version, None))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print time ratios against a baseline run; returns the regressions"""
+    old = {(r['size'], r['name']): r for r in baseline['results']}
+    regressions = []
+    print(f"\n{'rows':>10} {'benchmark':<30} {'base ms':>9} {'now ms':>9} {'ratio':>6}")
+    for r in results:
+        b = old.get((r['size'], r['name']))
+        if b is None or not b['seconds']:
+            continue
+        ratio = r['seconds'] / b['seconds']
+        flag = ' !' if ratio > threshold else ''
+        print(f"{r['size']:>10,} {r['name']:<30} {b['seconds'] * 1000:>9.2f} {r['seconds'] * 1000:>9.2f} "
+              f"{ratio:>6.2f}{flag}")
+        if ratio > threshold:
+            regressions.append((r['size'], r['name'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e3, 1e4, 1e5, 1e6])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--out', help='write results as JSON')
+    parser.add_argument('--baseline', help='JSON from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio counted as a regression')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    results = []
+    try:
+        print(f"{'rows':>10} {'benchmark':<30} {'ms':>9} {'payload KB':>11} {'peak MB':>8}")
+        for size in args.sizes:
+            for r in run_size(size, args.repeat, workdir):
+                payload = '' if r['payload_bytes'] is None else f"{r['payload_bytes'] / 1024:.1f}"
+                print(f"{r['size']:>10,} {r['name']:<30} {r['seconds'] * 1000:>9.2f} {payload:>11} "
+                      f"{r['peak_mb']:>8.1f}")
+                results.append(r)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                 'pandas': pd.__version__, 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'results': results,
+    }
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above x{args.threshold}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+from data.data_loader import DERIVED_COLUMNS, data_path, clean_profiles
+
+SAMPLE_FILE = 'user_profiles_368_vn34_genderfix - profile.csv'
+# Khoảng thời gian đăng ký giả lập
+CREATED_START = pd.Timestamp('2024-01-01')
+CREATED_DAYS = 730
+# Đăng ký nhiều hơn vào buổi tối và đầu tuần
+HOUR_WEIGHTS = np.array([1, 1, 1, 1, 1, 2, 3, 5, 6, 6, 6, 6, 7, 6, 6, 6, 6, 7, 9, 11, 12, 10, 6, 3], dtype=float)
+WEEKDAY_WEIGHTS = np.array([1.3, 1.2, 1.1, 1.0, 0.9, 0.8, 0.7])
+
+_vocab = None
+
+
+def vocabulary():
+    """Labels of the real export (34 provinces, diseases, allergies, genders), most frequent first"""
+    global _vocab
+    if _vocab is None:
+        base = pd.read_csv(data_path(SAMPLE_FILE))
+        _vocab = {col: base[col].value_counts().index.tolist()
+                  for col in ['gender', 'location', 'commonDiseases', 'allergies']}
+        _vocab['gender_share'] = base['gender'].value_counts(normalize=True).to_numpy()
+    return _vocab
+
+
+def zipf_weights(n, exponent=1.1):
+    """Long-tailed label frequencies: a few common values, many rare ones"""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def _timestamps(rng, n):
+    days = rng.integers(0, CREATED_DAYS, n)
+    # Ngày trong tuần theo trọng số: dời ngày về đầu tuần với xác suất tương ứng
+    weekday = rng.choice(7, n, p=WEEKDAY_WEIGHTS / WEEKDAY_WEIGHTS.sum())
+    days = days - (CREATED_START + pd.to_timedelta(days, unit='D')).weekday.to_numpy() + weekday
+    hours = rng.choice(24, n, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    seconds = rng.integers(0, 3600, n)
+    return CREATED_START.to_datetime64() + (days * 86400 + hours * 3600 + seconds).astype('timedelta64[s]')
+
+
+def make_raw_profiles(n, seed=42):
+    """Profiles with the columns and value types of the CSV export (timestamps as datetime64).
+
+    Categorical columns use the real labels with Zipf-like frequencies; age,
+    height and weight are drawn per gender and BMI is derived from them.
+    """
+    rng = np.random.default_rng(seed)
+    vocab = vocabulary()
+    n = int(n)
+
+    gender = rng.choice(len(vocab['gender']), n, p=vocab['gender_share'])
+    male = np.asarray(vocab['gender'])[gender] == 'Nam'
+    age = rng.gamma(6.0, 6.5, n).clip(10, 90).astype(np.int64)
+    height = np.where(male, rng.normal(168, 7, n), rng.normal(157, 6, n)).round()
+    bmi = rng.lognormal(np.log(22.5), 0.16, n).clip(14, 45)
+    weight = (bmi * (height / 100) ** 2).round()
+
+    df = pd.DataFrame({
+        'age': age,
+        'gender': pd.Categorical.from_codes(gender, categories=vocab['gender']),
+        'height': height.astype(np.int64),
+        'weight': weight.astype(np.int64),
+        'BMI': (weight / (height / 100) ** 2).round(1),
+    })
+    for col in ['location', 'commonDiseases', 'allergies']:
+        labels = vocab[col]
+        codes = rng.choice(len(labels), n, p=zipf_weights(len(labels)))
+        df[col] = pd.Categorical.from_codes(codes, categories=labels)
+
+    created = _timestamps(rng, n)
+    df['createdAt'] = created
+    df['lastLoginAt'] = created + rng.exponential(20 * 86400, n).astype('timedelta64[s]')
+    return df
+
+
+def to_csv_rows(df):
+    """Frame in the text layout of the export (ISO-8601 UTC timestamps), for writing CSV files"""
+    out = df.drop(columns=list(DERIVED_COLUMNS), errors='ignore').copy()
+    for col in ('createdAt', 'lastLoginAt'):
+        if col in out.columns:
+            out[col] = out[col].dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+    return out
+
+
+def make_profiles(n, seed=42):
+    """Cleaned synthetic profiles, as load_and_clean_data would return them"""
+    return clean_profiles(make_raw_profiles(n, seed))
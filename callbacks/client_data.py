@@ -0,0 +1,123 @@
+import base64
+import json
+import numpy as np
+import pandas as pd
+from plotly.io.json import to_json_plotly
+from components.charts import BMI_BINS, MAX_OUTLIERS, MAX_POINTS, create_density_plot, create_province_map, create_scatter_plot
+from data.cube import BMI_STEP
+from data.data_loader import AGE_LABELS
+from data.geometry import map_locations, match_provinces
+from data.time_index import TIME_SERIES, day_numbers
+
+# Cột danh mục gửi cho trình duyệt dưới dạng mã từ điển + nhãn
+CLIENT_CATEGORIES = ('location', 'commonDiseases', 'allergies', 'gender', 'age_group')
+# Cột số nhỏ tính sẵn lúc nạp (thứ / giờ đăng ký, -1 = không có)
+CLIENT_SMALL_INTS = ('created_weekday', 'created_hour')
+# Mảng dữ liệu của trace: bỏ khỏi hình mẫu, trình duyệt tự tính lại
+TRACE_ARRAYS = ('x', 'y', 'z', 'values', 'text', 'ids', 'parents', 'customdata',
+                'q1', 'median', 'q3', 'lowerfence', 'upperfence', 'mean', 'width')
+
+
+def _array(values, dtype):
+    values = np.ascontiguousarray(values, dtype=dtype)
+    return {'dtype': np.dtype(dtype).name, 'data': base64.b64encode(values.tobytes()).decode('ascii')}
+
+
+def _category_codes(series, labels=None):
+    if labels is not None:
+        codes = pd.Categorical(series, categories=labels).codes
+    else:
+        values = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+        codes, labels = values.cat.codes.to_numpy(), values.cat.categories.tolist()
+    dtype = np.int8 if len(labels) < 127 else np.int16 if len(labels) < 32767 else np.int32
+    return labels, _array(codes, dtype)
+
+
+def _day_columns(df):
+    """Time columns as days since their first day (int16 while the span allows, -1 = missing),
+    with that first day and the (first, last) registration day"""
+    days = {col: day_numbers(df[col]) for col in TIME_SERIES if col in df.columns}
+    known = [d[d >= 0] for d in days.values()]
+    known = [d for d in known if len(d)]
+    if not known:
+        return {}, None, None
+    day0, last = int(min(d.min() for d in known)), int(max(d.max() for d in known))
+    dtype = np.int16 if last - day0 < 32767 else np.int32
+    columns = {col: _array(np.where(d >= 0, d - day0, -1), dtype) for col, d in days.items()}
+    created = days.get('createdAt')
+    created = created[created >= 0] if created is not None else []
+    created_range = [int(created.min()), int(created.max())] if len(created) else None
+    return columns, [day0, last], created_range
+
+
+def encode_columns(df):
+    """Compact columns for the browser: dictionary-coded categories (int8/int16 codes,
+    -1 = missing), BMI as float32, the precomputed weekday / hour as int8 and
+    the registration / last login days as int16 offsets from `day_range[0]`.
+
+    Arrays are little-endian base64 so the browser wraps them in typed arrays
+    without parsing; about 15 bytes per row before gzip.
+    """
+    columns = {}
+    for col in CLIENT_CATEGORIES:
+        if col in df.columns:
+            labels, codes = _category_codes(df[col], AGE_LABELS if col == 'age_group' else None)
+            columns[col] = dict(codes, labels=[str(v) for v in labels])
+    if 'BMI' in df.columns:
+        columns['BMI'] = _array(df['BMI'].to_numpy(dtype=float), np.float32)
+    for col in CLIENT_SMALL_INTS:
+        if col in df.columns:
+            columns[col] = _array(df[col].to_numpy(), np.int8)
+    days, day_range, created_range = _day_columns(df)
+    columns.update(days)
+    return {'n': len(df), 'columns': columns, 'day_range': day_range, 'created_range': created_range}
+
+
+def figure_prototype(figure):
+    """A figure's layout and trace styles without its data arrays (the browser refills them)"""
+    figure = json.loads(to_json_plotly(figure))
+    for trace in figure.get('data', []):
+        for key in TRACE_ARRAYS:
+            trace.pop(key, None)
+        if trace.get('type') != 'pie':
+            # Nhãn của pie giữ lại: ánh xạ nhãn -> màu cố định
+            trace.pop('labels', None)
+        marker = trace.get('marker')
+        if isinstance(marker, dict) and not isinstance(marker.get('color'), str):
+            marker.pop('color', None)
+    return figure
+
+
+def client_payload(rows, counts, version, tab_charts, stats_cards, filters=None, timeline=None):
+    """Everything the client-side callbacks need, sent once per data version.
+
+    Each chart output gets the name of its create_* function (the browser
+    has a port of each) and a prototype figure of the whole dataset, whose
+    layout and per-label trace colors are reused while filtering. `filters`
+    maps each filter dropdown to its column and ordered option values;
+    `timeline` is the unfiltered DataSource.timeline() frame.
+    """
+    payload = encode_columns(rows)
+    payload.update(version=version, max_points=MAX_POINTS, max_outliers=MAX_OUTLIERS, bmi_step=BMI_STEP,
+                   bmi_bins=BMI_BINS, stats_cards=json.loads(to_json_plotly(stats_cards)), charts={}, tabs={},
+                   filters=filters or {})
+    sources = {'rows': rows, 'counts': counts, 'timeline': timeline}
+    for tab_id, charts in tab_charts.items():
+        payload['tabs'][tab_id] = []
+        for component_id, prop, build, source in charts:
+            if prop != 'figure':
+                continue
+            payload['tabs'][tab_id].append(component_id)
+            chart = {'kind': build.__name__}
+            if build is create_scatter_plot:
+                # Hai dạng: từng điểm (ít hồ sơ) hoặc lưới mật độ
+                chart['prototype'] = figure_prototype(build(rows.head(MAX_POINTS)))
+                chart['density'] = figure_prototype(create_density_plot(rows))
+            else:
+                chart['prototype'] = figure_prototype(build(sources[source]))
+            if build is create_province_map and 'location' in payload['columns']:
+                # Thứ tự tỉnh của bản đồ và tỉnh của từng nhãn địa điểm (trình duyệt không so tên)
+                chart['locations'] = map_locations()
+                chart['slots'] = match_provinces(payload['columns']['location']['labels'], chart['locations'])
+            payload['charts'][component_id] = chart
+    return payload
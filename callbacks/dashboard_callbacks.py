@@ -1,66 +1,538 @@
-from dash import Input, Output, State, html
+import json
+import math
+import time
+from dash import ALL, ClientsideFunction, Input, Output, State, ctx, html, no_update
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
+from plotly.io.json import to_json_plotly
 from components.charts import (
     create_age_chart, create_bmi_chart, create_disease_chart,
-    create_province_chart, create_scatter_plot, create_timeline_chart,
+    create_province_chart, create_province_map, create_scatter_plot, create_timeline_chart,
     create_stats_cards_data, create_bmi_box_plot, create_disease_treemap,
     create_allergy_bar_chart, create_age_disease_stacked,
-    create_registration_heatmap, create_gender_chart
+    create_registration_heatmap, create_gender_chart, create_cohort_bmi_chart,
+    create_cohort_disease_chart, create_cohort_allergy_chart, COHORT_COLORS
 )
+from components.filters import BMI_SLIDER_STEP, cohort_description, facet_options, option_values
+from data.cohorts import MAX_COHORTS
+from data.cube import FILTER_DIMENSIONS
+from data.filter_index import as_list
+from data.dataset import ProfileDataset
+from data.sources import DataSource
+from data.result_cache import ResultCache, DEFAULT_CACHE_BYTES
+from callbacks.client_data import client_payload
+from callbacks.export import register_export
+from callbacks.figure_builder import FigureBuilder
+from callbacks.jobs import JobTracker
+from callbacks.map_geometry import register_geometry
+from callbacks.metrics import DISABLED, ROWS_BUCKETS
+from callbacks.patching import patch_outputs
+
+FILTER_INPUTS = [Input('loc-filter', 'value'),
+                 Input('dis-filter', 'value'),
+                 Input('gen-filter', 'value'),
+                 Input('age-filter', 'value'),
+                 Input('bmi-range-filter', 'value'),
+                 Input('created-range-filter', 'value')]
+FILTER_STATES = [State(i.component_id, i.component_property) for i in FILTER_INPUTS]
+# Mã của lần tải trang (pages.dashboard.page_layout): lần chạy mới chỉ thay lần cũ của cùng trang
+PAGE_STATE = State('page-id', 'data')
+# Thanh trượt khoảng: khi bật debounce, giá trị chỉ cập nhật lúc dừng kéo
+RANGE_SLIDERS = ('bmi-range-filter', 'created-range-filter')
+
+# Chu kỳ trình duyệt hỏi kết quả của callback chạy nền (ms)
+BACKGROUND_POLL_MS = 250
+
+# Danh sách lựa chọn của các dropdown lọc, kèm số hồ sơ của từng lựa chọn
+FACET_OUTPUTS = [Output(f'{name}-filter', 'options') for name in FILTER_DIMENSIONS]
+
+# Biểu đồ theo từng tab của 'tabs-network': (id, thuộc tính, hàm dựng, nguồn dữ liệu)
+# nguồn 'counts' = khối đếm (hoặc dòng khi BMI lệch ô / lọc theo ngày), 'rows' = bảng dòng đã lọc,
+# 'timeline' = số đăng ký / đăng nhập theo kỳ (DataSource.timeline)
+TAB_CHARTS = {
+    'tab-1': [
+        ('age-graph', 'figure', create_age_chart, 'counts'),
+        ('gender-pie-chart', 'figure', create_gender_chart, 'counts'),
+        ('registration-heatmap', 'figure', create_registration_heatmap, 'counts'),
+        ('timeline-chart', 'figure', create_timeline_chart, 'timeline'),
+    ],
+    'tab-2': [
+        ('bmi-graph', 'figure', create_bmi_chart, 'rows'),
+        ('bmi-box-plot', 'figure', create_bmi_box_plot, 'rows'),
+        ('scatter-plot', 'figure', create_scatter_plot, 'rows'),
+        ('scatter-legend', 'children', lambda _: [], 'rows'),
+        ('age-disease-stacked', 'figure', create_age_disease_stacked, 'counts'),
+    ],
+    'tab-3': [
+        ('disease-treemap', 'figure', create_disease_treemap, 'counts'),
+        ('allergy-bar-chart', 'figure', create_allergy_bar_chart, 'counts'),
+        ('province-graph', 'figure', create_province_chart, 'counts'),
+        ('province-map', 'figure', create_province_map, 'counts'),
+    ],
+}
+
+# Tab so sánh nhóm: bảng các nhóm và biểu đồ các nhóm cạnh nhau, cùng dựng từ một lần
+# DataSource.compare(): (id, thuộc tính, hàm dựng)
+COMPARE_TAB = 'tab-4'
+COMPARE_CHARTS = [
+    ('cohort-bmi-chart', 'figure', create_cohort_bmi_chart),
+    ('cohort-disease-chart', 'figure', create_cohort_disease_chart),
+    ('cohort-allergy-chart', 'figure', create_cohort_allergy_chart),
+]
+
+
+def filter_key(loc, dis, gen, age, bmi_range, created_range=None, bmi_bounds=None, created_bounds=None,
+               step=BMI_SLIDER_STEP):
+    """Normalized key of a filter state, used for caching and tab staleness.
+
+    Multi-select values are sorted; the BMI range is snapped to the slider
+    grid (anchored at the data minimum) and a bound at the data edge counts
+    as open, so every reachable slider position gets its own key. The same
+    holds for the registration-day range (whole days).
+    """
+    bmi = None
+    if bmi_range:
+        lo, hi = bmi_range
+        origin = bmi_bounds[0] if bmi_bounds else 0.0
+        bmi = [None if bmi_bounds and lo <= bmi_bounds[0] else round((lo - origin) / step),
+               None if bmi_bounds and hi >= bmi_bounds[1] else round((hi - origin) / step)]
+        if bmi == [None, None]:
+            bmi = None
+    created = None
+    if created_range and created_bounds:
+        lo, hi = int(created_range[0]), int(created_range[1])
+        created = [None if lo <= created_bounds[0] else lo, None if hi >= created_bounds[1] else hi]
+        if created == [None, None]:
+            created = None
+    return json.dumps([sorted(as_list(loc)), sorted(as_list(dis)), sorted(as_list(gen)),
+                       sorted(as_list(age)), bmi, created])
+
+
+def filter_shape(key):
+    """Which filters a filter_key() has set, e.g. 'loc+bmi' (a low-cardinality metrics label)"""
+    active = [name for name, value in zip(('loc', 'dis', 'gen', 'age', 'bmi', 'date'), json.loads(key)) if value]
+    return '+'.join(active) or 'none'
+
+
+def _positions_nbytes(positions):
+    return 0 if positions is None else positions.nbytes
+
+
+def _stats_reader(stats, prefix, names, suffix=''):
+    """Metrics reader of some `stats()` values, as '<prefix><name><suffix>'"""
+    def read():
+        values = stats()
+        return {(f'{prefix}{name}{suffix}', ()): values[name] for name in names}
+    return read
+
+
+def register_callbacks(app, df, cache_bytes=DEFAULT_CACHE_BYTES, figure_builder=None, metrics=DISABLED,
+                       patch_updates=False, client_max_rows=0, background_manager=None, slider_debounce_ms=0,
+                       progressive=False):
+    # CSV/pandas, khối đếm hoặc MongoDB: callback chỉ làm việc qua DataSource
+    dataset = df if isinstance(df, DataSource) else ProfileDataset(df)
+    # Dựng hình tuần tự, hoặc song song khi truyền FigureBuilder(workers=N)
+    figure_builder = figure_builder or FigureBuilder(metrics=metrics)
+
+    # Kết quả lọc và hình đã tuần tự hóa theo trạng thái bộ lọc, xóa khi nạp lại dữ liệu
+    cache = ResultCache(cache_bytes)
+    if hasattr(dataset, 'on_change'):
+        dataset.on_change(lambda _: cache.invalidate())
+
+    # Lần chạy callback nặng bị bỏ dở khi cùng trang đã gửi trạng thái lọc mới hơn
+    jobs = JobTracker()
+
+    # Đo đạc: /metrics (Prometheus) trên Flask server của app
+    if metrics.enabled:
+        # Gauge: giá trị lên xuống được; counter (_total): tổng chỉ tăng (tỉ lệ trúng: rate() trong PromQL)
+        metrics.add_gauges(_stats_reader(cache.stats, 'dashboard_cache_', ('entries', 'bytes', 'max_bytes')))
+        metrics.add_counters(_stats_reader(cache.stats, 'dashboard_cache_', ('hits', 'misses', 'evictions'), '_total'))
+        metrics.add_gauges(_stats_reader(jobs.stats, 'dashboard_jobs_', ('running',)))
+        metrics.add_counters(_stats_reader(jobs.stats, 'dashboard_jobs_', ('started', 'cancelled'), '_total'))
+        if getattr(app, 'server', None) is not None:
+            metrics.register_route(app.server)
+
+    # Tải xuống nhóm hồ sơ đang lọc: /export.csv|parquet truyền từng khối, không dựng cả file trong RAM
+    if getattr(app, 'server', None) is not None:
+        register_export(app.server, dataset, metrics=metrics)
+        # Hình dạng tỉnh cho bản đồ: tải một lần, trình duyệt giữ lại; lọc chỉ gửi giá trị
+        register_geometry(app.server)
+
+    def state_key(loc=None, dis=None, gen=None, age=None, bmi_range=None, created_range=None):
+        return filter_key(loc, dis, gen, age, bmi_range, created_range, dataset.bmi_range, dataset.created_range)
+
+    def select(key, filters):
+        if not metrics.enabled:
+            return dataset.select(**filters)
+        with metrics.timer('dashboard_filter_seconds', filters=filter_shape(key)):
+            return dataset.select(**filters)
+
+    def filter_data(key, loc, dis, gen, age, bmi_range, created_range):
+        """Filtered rows and the source for count charts"""
+        filters = dict(loc=loc, dis=dis, gen=gen, age=age, bmi_range=bmi_range, created_range=created_range)
+        selection = cache.get_or_compute(('rows', dataset.version, key),
+                                         lambda: select(key, filters),
+                                         _positions_nbytes)
+        rows, counts = dataset.query(selection, **filters)
+        metrics.observe('dashboard_filtered_rows', len(rows), buckets=ROWS_BUCKETS)
+        return rows, counts
+
+    def cached_outputs(name, key, build_json):
+        """Outputs of a callback for a filter state, kept as serialized JSON"""
+        payload = cache.get_or_compute((name, dataset.version, key), build_json, len)
+        return json.loads(payload)
+
+    def is_cached(name, key):
+        return (name, dataset.version, key) in cache
+
+    def previous_outputs(name, rendered_key):
+        """Outputs the browser shows now (from a '<version>|<key>' render key), if still cached"""
+        if not patch_updates or not rendered_key:
+            return None
+        version, _, key = rendered_key.partition('|')
+        # peek: đọc lại hình trình duyệt đang hiện không tính là lượt tra cứu (hits/misses giữ nguyên)
+        payload = cache.peek((name, int(version), key))
+        return None if payload is None else json.loads(payload)
+
+    @app.callback(
+        [Output('data-version', 'data'),
+         Output('live-record-count', 'children')],
+        Input('live-refresh', 'n_intervals'),
+        State('data-version', 'data')
+    )
+    def poll_data_version(n_intervals, client_version):
+        """Báo cho trình duyệt khi có dữ liệu mới nối vào (Live)"""
+        if client_version == dataset.version:
+            raise PreventUpdate
+        return dataset.version, f"| {len(dataset):,} Hồ sơ hệ thống"
+
+    # Ngày đang chọn của thanh trượt thời gian (số ngày -> dd/mm/yyyy), tính ngay trong trình duyệt
+    app.clientside_callback(
+        "function (value) { return window.dash_clientside.sliders.dates(value); }",
+        Output('created-range-display', 'children'),
+        Input('created-range-filter', 'value')
+    )
+
+    # Liên kết tải xuống mang trạng thái bộ lọc hiện tại (assets/export_link.js)
+    app.clientside_callback(
+        ClientsideFunction('exporter', 'href'),
+        Output({'type': 'export-link', 'format': ALL}, 'href'),
+        FILTER_INPUTS
+    )
+
+    if slider_debounce_ms:
+        # Kéo thanh trượt: chỉ cập nhật bộ lọc khi dừng tay slider_debounce_ms (assets/slider_debounce.js)
+        for slider in RANGE_SLIDERS:
+            app.clientside_callback(
+                f"function (value) {{ return window.dash_clientside.sliders.debounce("
+                f"'{slider}', value, {int(slider_debounce_ms)}); }}",
+                Output(slider, 'value'),
+                Input(slider, 'drag_value'),
+                prevent_initial_call=True
+            )
+
+    # So sánh nhóm: tính trên server ở mọi chế độ (cả chế độ client)
+    register_compare_callbacks(app, dataset, state_key, cached_outputs, metrics)
+
+    # Chế độ client: bộ dữ liệu đủ nhỏ (xét lúc khởi động) gửi một lần, lọc và đếm trong trình duyệt
+    if client_max_rows and getattr(dataset, 'df', None) is not None and len(dataset) <= client_max_rows:
+        register_client_callbacks(app, dataset, cached_outputs)
+        return cache
+
+    # Chế độ hiển thị dần: trả ngay kết quả ước tính từ mẫu phân tầng, kết quả chính xác theo sau
+    progressive = progressive and dataset.estimate() is not None
+
+    def exact_summary(key, filters, page, latest_only=False):
+        def build():
+            dff, counts = filter_data(key, **filters)
+            job.check()
+            return to_json_plotly([f"{len(dff):,}", create_stats_cards_layout(create_stats_cards_data(counts))])
+
+        with jobs.start('summary', page) as job:
+            if not metrics.enabled:
+                outputs = cached_outputs('summary', key, build)
+            else:
+                with metrics.timer('dashboard_callback_seconds', callback='summary', filters=filter_shape(key)):
+                    outputs = cached_outputs('summary', key, build)
+            if latest_only:
+                # Trình duyệt đã hiện ước tính của bộ lọc mới hơn: bỏ kết quả này
+                job.check()
+            return outputs
+
+    def estimated_summary(key, filters, page):
+        def build():
+            view = dataset.estimate(**filters)
+            count = f"≈{len(view):,} ± {round(view.error):,}" if round(view.error) else f"{len(view):,}"
+            return to_json_plotly([count, create_stats_cards_layout(create_stats_cards_data(view))])
+
+        jobs.supersede('summary', page)
+        return cached_outputs('summary-estimate', key, build)
 
-def register_callbacks(app, df):
     @app.callback(
-        [Output('age-graph', 'figure'),           # 1
-         Output('bmi-graph', 'figure'),           # 2
-         Output('province-graph', 'figure'),      # 3
-         Output('scatter-plot', 'figure'),        # 4
-         Output('scatter-legend', 'children'),    # 5
-         Output('timeline-chart', 'figure'),      # 6
-         Output('count-display', 'children'),     # 7
-         Output('stats-cards', 'children'),       # 8
-         Output('gender-pie-chart', 'figure'),    # 9
-         Output('bmi-box-plot', 'figure'),        # 10
-         Output('disease-treemap', 'figure'),     # 11
-         Output('allergy-bar-chart', 'figure'),   # 12
-         Output('age-disease-stacked', 'figure'), # 13
-         Output('registration-heatmap', 'figure')],# 14
-        [Input('loc-filter', 'value'),
-         Input('dis-filter', 'value'),
-         Input('gen-filter', 'value'),
-         Input('age-filter', 'value'),
-         Input('bmi-range-filter', 'value'),
-         Input('reset-filters-btn', 'n_clicks')]
+        [Output('count-display', 'children'),
+         Output('stats-cards', 'children'),
+         Output('summary-estimated', 'data')],
+        FILTER_INPUTS + [Input('reset-filters-btn', 'n_clicks'),
+                         Input('data-version', 'data')],
+        PAGE_STATE
     )
-    def update_dashboard(loc, dis, gen, age, bmi_range, reset_clicks):
-        dff = df.copy()
-
-        # 1. Logic lọc dữ liệu
-        if loc: dff = dff[dff['location'].isin(loc)]
-        if dis: dff = dff[dff['commonDiseases'].isin(dis)]
-        if gen: dff = dff[dff['gender'].isin(gen)]
-        if age: dff = dff[dff['age_group'].isin(age)]
-        if bmi_range: dff = dff[(dff['BMI'] >= bmi_range[0]) & (dff['BMI'] <= bmi_range[1])]
-
-        # 2. Lấy dữ liệu thẻ thống kê (Stats Cards)
-        stats_data = create_stats_cards_data(dff)
-
-        # 3. Trả về đúng 14 giá trị theo đúng thứ tự Output đã khai báo
-        return (
-            create_age_chart(dff),             # 1. age-graph
-            create_bmi_chart(dff),             # 2. bmi-graph
-            create_province_chart(dff),        # 3. province-graph
-            create_scatter_plot(dff),          # 4. scatter-plot
-            [],                                # 5. scatter-legend
-            create_timeline_chart(dff),        # 6. timeline-chart
-            f"{len(dff):,}",                   # 7. count-display (Nhận con số đơn thuần)
-            create_stats_cards_layout(stats_data), # 8. stats-cards
-            create_gender_chart(dff),          # 9. gender-pie-chart (GỌI HÀM TỪ CHARTS)
-            create_bmi_box_plot(dff),          # 10. bmi-box-plot
-            create_disease_treemap(dff),       # 11. disease-treemap
-            create_allergy_bar_chart(dff),     # 12. allergy-bar-chart
-            create_age_disease_stacked(dff),   # 13. age-disease-stacked
-            create_registration_heatmap(dff)   # 14. registration-heatmap
+    def update_summary(loc, dis, gen, age, bmi_range, created_range, reset_clicks, data_version, page):
+        key = state_key(loc, dis, gen, age, bmi_range, created_range)
+        filters = dict(loc=loc, dis=dis, gen=gen, age=age, bmi_range=bmi_range, created_range=created_range)
+        if progressive and not is_cached('summary', key):
+            return estimated_summary(key, filters, page) + [f'{dataset.version}|{key}']
+        return exact_summary(key, filters, page) + [no_update]
+
+    if progressive:
+        @app.callback(
+            [Output('count-display', 'children', allow_duplicate=True),
+             Output('stats-cards', 'children', allow_duplicate=True)],
+            Input('summary-estimated', 'data'),
+            FILTER_STATES + [PAGE_STATE],
+            prevent_initial_call=True
         )
+        def refine_summary(estimated_key, loc, dis, gen, age, bmi_range, created_range, page):
+            """Số chính xác thay cho số ước tính (nếu bộ lọc chưa đổi trong lúc đó)"""
+            key = state_key(loc, dis, gen, age, bmi_range, created_range)
+            if estimated_key != f'{dataset.version}|{key}':
+                raise PreventUpdate
+            filters = dict(loc=loc, dis=dis, gen=gen, age=age, bmi_range=bmi_range, created_range=created_range)
+            return exact_summary(key, filters, page, latest_only=True)
+
+    def filter_values():
+        # Giá trị của các dropdown chỉ đổi theo phiên bản dữ liệu
+        return cache.get_or_compute(('filter-values', dataset.version),
+                                    lambda: {name: option_values(dataset, column)
+                                             for name, column in FILTER_DIMENSIONS.items()},
+                                    lambda values: len(json.dumps(values)))
+
+    @app.callback(
+        FACET_OUTPUTS,
+        FILTER_INPUTS + [Input('data-version', 'data')]
+    )
+    def update_filter_options(loc, dis, gen, age, bmi_range, created_range, data_version):
+        """Số hồ sơ của từng lựa chọn trong dropdown, theo các bộ lọc còn lại"""
+        key = state_key(loc, dis, gen, age, bmi_range, created_range)
+
+        def build():
+            counts = dataset.facet_counts(loc=loc, dis=dis, gen=gen, age=age, bmi_range=bmi_range,
+                                          created_range=created_range)
+            values = filter_values()
+            return json.dumps([facet_options(values[name], counts[name]) for name in FILTER_DIMENSIONS])
+
+        if not metrics.enabled:
+            return cached_outputs('facets', key, build)
+        with metrics.timer('dashboard_callback_seconds', callback='facets', filters=filter_shape(key)):
+            return cached_outputs('facets', key, build)
+
+    for tab_id, charts in TAB_CHARTS.items():
+        register_tab_callback(app, tab_id, charts, dataset, state_key, filter_data, cached_outputs,
+                              figure_builder, metrics, previous_outputs, jobs, background_manager,
+                              is_cached if progressive else None)
+
+    return cache
+
+
+def register_compare_callbacks(app, dataset, state_key, cached_outputs, metrics=DISABLED):
+    """Tab so sánh nhóm.
+
+    Nút thêm nhóm lưu trạng thái bộ lọc hiện tại vào Store 'cohorts' (tối đa
+    MAX_COHORTS, nhóm cũ nhất bị bỏ); tab vẽ mọi nhóm cạnh nhau từ một lần
+    DataSource.compare(), chỉ khi đang mở và các nhóm hoặc dữ liệu đã đổi.
+    """
+    @app.callback(
+        Output('cohorts', 'data'),
+        [Input('add-cohort-btn', 'n_clicks'),
+         Input('clear-cohorts-btn', 'n_clicks')],
+        FILTER_STATES + [State('cohorts', 'data')],
+        prevent_initial_call=True
+    )
+    def update_cohorts(add_clicks, clear_clicks, loc, dis, gen, age, bmi_range, created_range, cohorts):
+        if ctx.triggered_id == 'clear-cohorts-btn':
+            return []
+        filters = dict(loc=loc, dis=dis, gen=gen, age=age, bmi_range=bmi_range, created_range=created_range)
+        cohorts = cohorts or []
+        key = state_key(**filters)
+        if any(state_key(**cohort) == key for cohort in cohorts):
+            raise PreventUpdate
+        return (cohorts + [filters])[-MAX_COHORTS:]
+
+    @app.callback(
+        [Output('cohort-table', 'children')]
+        + [Output(component_id, prop) for component_id, prop, _ in COMPARE_CHARTS]
+        + [Output(f'{COMPARE_TAB}-rendered', 'data')],
+        [Input('cohorts', 'data'),
+         Input('tabs-network', 'active_tab'),
+         Input('data-version', 'data')],
+        State(f'{COMPARE_TAB}-rendered', 'data')
+    )
+    def update_compare(cohorts, active_tab, data_version, rendered_key):
+        cohorts = cohorts or []
+        key = json.dumps([state_key(**cohort) for cohort in cohorts])
+        rendered = f'{dataset.version}|{key}'
+        if active_tab != COMPARE_TAB or rendered_key == rendered:
+            raise PreventUpdate
+
+        def build():
+            comparison = dataset.compare(cohorts)
+            descriptions = [cohort_description(cohort, dataset.bmi_range, dataset.created_range)
+                            for cohort in cohorts]
+            return to_json_plotly([create_cohort_table_layout(comparison, descriptions)]
+                                  + [build_chart(comparison) for _, _, build_chart in COMPARE_CHARTS])
+
+        if not metrics.enabled:
+            return cached_outputs('compare', key, build) + [rendered]
+        with metrics.timer('dashboard_callback_seconds', callback='compare', filters=f'{len(cohorts)}_cohorts'):
+            return cached_outputs('compare', key, build) + [rendered]
+
+
+def register_client_callbacks(app, dataset, cached_outputs):
+    """Filtering and counting in the browser (assets/client_filter.js).
+
+    The dataset is shipped once per data version as compact columns plus
+    prototype figures (callbacks/client_data.py); after that filter changes,
+    slider drags included, are answered without a request to the server.
+    """
+    @app.callback(Output('client-data', 'data'), Input('data-version', 'data'))
+    def ship_client_data(data_version):
+        if data_version is None:
+            raise PreventUpdate
+
+        def build():
+            rows, counts = dataset.query(None)
+            stats_cards = create_stats_cards_layout(create_stats_cards_data(counts))
+            filters = {f'{name}-filter': [column, option_values(dataset, column)]
+                       for name, column in FILTER_DIMENSIONS.items()}
+            return to_json_plotly(client_payload(rows, counts, dataset.version, TAB_CHARTS, stats_cards, filters,
+                                                 timeline=dataset.timeline()))
+
+        return cached_outputs('client', '', build)
+
+    app.clientside_callback(
+        ClientsideFunction('dashboard', 'summary'),
+        [Output('count-display', 'children'),
+         Output('stats-cards', 'children')],
+        FILTER_INPUTS + [Input('reset-filters-btn', 'n_clicks'),
+                         Input('client-data', 'data')]
+    )
+    app.clientside_callback(
+        ClientsideFunction('dashboard', 'facets'),
+        FACET_OUTPUTS,
+        FILTER_INPUTS + [Input('client-data', 'data')]
+    )
+    for charts in TAB_CHARTS.values():
+        app.clientside_callback(
+            ClientsideFunction('dashboard', 'tab'),
+            [Output(component_id, prop) for component_id, prop, _, _ in charts if prop == 'figure'],
+            FILTER_INPUTS + [Input('tabs-network', 'active_tab'),
+                             Input('client-data', 'data')]
+        )
+
+
+def register_tab_callback(app, tab_id, charts, dataset, state_key, filter_data, cached_outputs,
+                          figure_builder, metrics=DISABLED, previous_outputs=None, jobs=None,
+                          background_manager=None, is_cached=None):
+    """Chỉ dựng biểu đồ của tab đang mở.
+
+    Tab ẩn bị bỏ qua (giữ hình cũ, coi như stale); khi mở lại chỉ dựng lại nếu
+    bộ lọc hoặc phiên bản dữ liệu đã đổi so với lần vẽ trước, lưu trong Store
+    '<tab>-rendered'. Nếu hình trước đó còn trong cache và chỉ khác mảng dữ
+    liệu, chỉ gửi Patch các mảng đã đổi. Lần chạy bị thay thế bởi bộ lọc mới
+    hơn dừng giữa các hình (JobTracker); với background_manager callback chạy
+    thành job nền và Dash dừng job cũ khi có request mới.
+
+    Với is_cached (chế độ hiển thị dần), trạng thái lọc chưa có trong cache
+    được vẽ trước từ ước tính của DataSource.estimate(); Store
+    '<tab>-estimated' kích hoạt lần vẽ chính xác thay thế ngay sau đó.
+    """
+    props = [prop for _, prop, _, _ in charts]
+    sources_used = {source for _, _, _, source in charts}
+    jobs = jobs or JobTracker()
+    background = {'background': True, 'manager': background_manager,
+                  'interval': BACKGROUND_POLL_MS} if background_manager is not None else {}
+    chart_outputs = [Output(component_id, prop) for component_id, prop, _, _ in charts]
+
+    def send(outputs, name, rendered_key):
+        previous = previous_outputs(name, rendered_key) if previous_outputs else None
+        return patch_outputs(previous, outputs, props)
+
+    def render(key, filters, name, rendered_key, page, latest_only=False):
+        """Exact figures of a filter state, patched against what the browser shows (`name`, `rendered_key`)"""
+        timings = {}
+
+        def build():
+            dff, counts = filter_data(key, **filters)
+            sources = {'rows': dff, 'counts': counts}
+            if 'timeline' in sources_used:
+                sources['timeline'] = dataset.timeline(**filters)
+            return figure_builder.build_json([(component_id, build_chart, sources[source])
+                                              for component_id, _, build_chart, source in charts],
+                                             timings if metrics.log_requests else None, job)
+
+        with jobs.start(tab_id, page) as job:
+            start = time.perf_counter()
+            outputs = send(cached_outputs(tab_id, key, build), name, rendered_key)
+            if latest_only:
+                # Trình duyệt đã hiện ước tính của bộ lọc mới hơn: bỏ kết quả này
+                job.check()
+        if metrics.enabled:
+            elapsed = time.perf_counter() - start
+            metrics.observe('dashboard_callback_seconds', elapsed, callback=tab_id, filters=filter_shape(key))
+            metrics.log('%s filters=%s total_ms=%.1f cached=%s charts_ms=%s', tab_id, key, elapsed * 1000,
+                        not timings, {chart: round(t * 1000, 1) for chart, t in timings.items()})
+        return outputs
+
+    def estimate(key, filters, page):
+        """Figures drawn from the sample estimate (every source is the same SampleView)"""
+        def build():
+            view = dataset.estimate(**filters)
+            sources = {'rows': view, 'counts': view}
+            if 'timeline' in sources_used:
+                sources['timeline'] = dataset.estimate_timeline(**filters)
+            return figure_builder.build_json([(component_id, build_chart, sources[source])
+                                              for component_id, _, build_chart, source in charts])
+
+        jobs.supersede(tab_id, page)
+        return cached_outputs(f'{tab_id}-estimate', key, build)
+
+    @app.callback(
+        chart_outputs + [Output(f'{tab_id}-rendered', 'data'),
+                         Output(f'{tab_id}-estimated', 'data')],
+        FILTER_INPUTS + [Input('tabs-network', 'active_tab'),
+                         Input('data-version', 'data')],
+        [State(f'{tab_id}-rendered', 'data'), PAGE_STATE],
+        **background
+    )
+    def update_tab(loc, dis, gen, age, bmi_range, created_range, active_tab, data_version, rendered_key, page):
+        key = state_key(loc, dis, gen, age, bmi_range, created_range)
+        rendered = f'{dataset.version}|{key}'
+        if active_tab != tab_id or rendered_key == rendered:
+            raise PreventUpdate
+        filters = dict(loc=loc, dis=dis, gen=gen, age=age, bmi_range=bmi_range, created_range=created_range)
+        if is_cached is not None and not is_cached(tab_id, key):
+            # Hình ước tính gửi nguyên (trình duyệt có thể đang hiện hình khác '<tab>-rendered')
+            return estimate(key, filters, page) + [no_update, rendered]
+        return render(key, filters, tab_id, rendered_key, page) + [rendered, no_update]
+
+    if is_cached is not None:
+        @app.callback(
+            [Output(o.component_id, o.component_property, allow_duplicate=True) for o in chart_outputs]
+            + [Output(f'{tab_id}-rendered', 'data', allow_duplicate=True)],
+            Input(f'{tab_id}-estimated', 'data'),
+            FILTER_STATES + [State('tabs-network', 'active_tab'), PAGE_STATE],
+            prevent_initial_call=True,
+            **background
+        )
+        def refine_tab(estimated_key, loc, dis, gen, age, bmi_range, created_range, active_tab, page):
+            """Hình chính xác thay cho hình ước tính (nếu bộ lọc và tab chưa đổi trong lúc đó)"""
+            key = state_key(loc, dis, gen, age, bmi_range, created_range)
+            if active_tab != tab_id or estimated_key != f'{dataset.version}|{key}':
+                raise PreventUpdate
+            filters = dict(loc=loc, dis=dis, gen=gen, age=age, bmi_range=bmi_range, created_range=created_range)
+            return render(key, filters, f'{tab_id}-estimate', estimated_key, page, latest_only=True) + [estimated_key]
+
+    return update_tab
+
 
 def create_stats_cards_layout(stats_data):
     """Render hàng thẻ thống kê KPI"""
@@ -75,4 +547,24 @@ def create_stats_cards_layout(stats_data):
             ], className="flex items-center p-4 bg-white rounded-xl border border-slate-200 shadow-sm"),
             md=3, className="mb-2"
         ) for s in stats_data
-    ])
\ No newline at end of file
+    ])
+
+def create_cohort_table_layout(comparison, descriptions):
+    """Bảng các nhóm so sánh: bộ lọc, số hồ sơ và BMI của mỗi nhóm"""
+    if not descriptions:
+        return html.P("Chọn bộ lọc rồi bấm \"➕ Thêm nhóm\" (tối đa %d nhóm) để so sánh." % MAX_COHORTS,
+                      className="text-sm text-slate-500 text-center mb-0")
+    rows = []
+    for (name, stats), description, color in zip(comparison.summary.iterrows(), descriptions, COHORT_COLORS):
+        bmi = not math.isnan(stats['bmi_mean'])
+        rows.append(html.Tr([
+            html.Td([html.Span("● ", style={'color': color}), name], className="font-bold"),
+            html.Td(description),
+            html.Td(f"{int(stats['count']):,}", className="text-right"),
+            html.Td(f"{stats['bmi_mean']:.1f}" if bmi else "-", className="text-right"),
+            html.Td(f"{stats['bmi_min']:.1f} - {stats['bmi_max']:.1f}" if bmi else "-", className="text-right"),
+        ]))
+    header = html.Thead(html.Tr([html.Th("Nhóm"), html.Th("Bộ lọc"), html.Th("Số hồ sơ", className="text-right"),
+                                 html.Th("BMI TB", className="text-right"),
+                                 html.Th("BMI min - max", className="text-right")]))
+    return dbc.Table([header, html.Tbody(rows)], size="sm", hover=True, className="mb-0 text-sm")
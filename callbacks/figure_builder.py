@@ -0,0 +1,66 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from plotly.io.json import to_json_plotly
+from callbacks.jobs import NO_JOB
+from callbacks.metrics import BYTES_BUCKETS, DISABLED
+
+
+class FigureBuilder:
+    """Runs chart builders and serializes their figures, optionally on a thread pool.
+
+    Builders only read the filtered frame / cube view they are given, so all
+    tasks share the same inputs without copies. NumPy/pandas work and part of
+    the JSON encoding release the GIL; with workers=0 everything runs in the
+    calling thread. Time per chart (build + serialize) is recorded either way,
+    and split into build / serialize time and output bytes in `metrics`.
+    """
+
+    def __init__(self, workers=0, metrics=DISABLED):
+        self.workers = workers
+        self.metrics = metrics
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix='figure') if workers else None
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def _run(self, name, build, data, job=NO_JOB):
+        # Lần chạy đã bị thay thế thì không dựng các hình còn lại
+        job.check()
+        start = time.perf_counter()
+        figure = build(data)
+        built = time.perf_counter()
+        payload = to_json_plotly(figure)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            count, total, worst = self._timings.get(name, (0, 0.0, 0.0))
+            self._timings[name] = (count + 1, total + elapsed, max(worst, elapsed))
+        if self.metrics.enabled:
+            self.metrics.observe('dashboard_chart_build_seconds', built - start, chart=name)
+            self.metrics.observe('dashboard_chart_serialize_seconds', elapsed - (built - start), chart=name)
+            self.metrics.observe('dashboard_output_bytes', len(payload), buckets=BYTES_BUCKETS, output=name)
+        return payload, elapsed
+
+    def build_json(self, tasks, timings=None, job=NO_JOB):
+        """JSON array of the outputs of [(name, build, data), ...], in task order.
+
+        Seconds per task are written to `timings` (a dict) when given. Before
+        each task `job.check()` may raise to abandon the remaining ones.
+        """
+        if self._pool is None or len(tasks) < 2:
+            results = [self._run(*task, job=job) for task in tasks]
+        else:
+            results = [f.result() for f in [self._pool.submit(self._run, *task, job=job) for task in tasks]]
+        if timings is not None:
+            timings.update((task[0], elapsed) for task, (_, elapsed) in zip(tasks, results))
+        return '[' + ','.join(payload for payload, _ in results) + ']'
+
+    def timings(self):
+        """Per-chart count / mean / max seconds, slowest total first"""
+        with self._lock:
+            items = sorted(self._timings.items(), key=lambda item: -item[1][1])
+        return {name: {'count': count, 'mean_sec': total / count, 'max_sec': worst}
+                for name, (count, total, worst) in items}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
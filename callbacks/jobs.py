@@ -0,0 +1,128 @@
+import itertools
+import threading
+from dash.exceptions import PreventUpdate
+
+
+class Superseded(PreventUpdate):
+    """A newer run of the same callback started for the same page"""
+
+
+class Job:
+    """One run of a callback; check() raises Superseded once a newer run has started"""
+
+    def __init__(self, tracker, key, ticket):
+        self.tracker = tracker
+        self.key = key
+        self.ticket = ticket
+
+    def check(self):
+        if self.key is not None and self.tracker.superseded(self):
+            self.tracker.cancel(self)
+            raise Superseded()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.tracker.finish(self)
+        return False
+
+
+class JobTracker:
+    """Latest-wins bookkeeping of expensive callbacks, per page and callback.
+
+    Dash sends a request for every filter change, so dragging the BMI slider
+    or clicking through a dropdown queues several runs of the same callback
+    whose results the browser drops except the last. Each run registers
+    itself with start(); builders call job.check() between steps and stop
+    (PreventUpdate, the browser keeps its figures) when a newer run of the
+    same callback has started on the same page.
+
+    A page is the id of one page load ('page-id' Store, see
+    pages.dashboard.page_layout), passed to the callbacks as State: two
+    browser tabs never cancel each other's runs. Without an id (None) runs
+    are never cancelled.
+    """
+
+    def __init__(self):
+        # (trang, callback) -> vé mới nhất, và số lần chạy còn sống của khóa đó
+        self._latest = {}
+        self._live = {}
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self.started = 0
+        self.cancelled = 0
+        self.running = 0
+
+    def start(self, name, page):
+        key = None if page is None else (page, name)
+        with self._lock:
+            ticket = next(self._counter)
+            self.started += 1
+            self.running += 1
+            if key is not None:
+                self._latest[key] = ticket
+                self._live[key] = self._live.get(key, 0) + 1
+        return Job(self, key, ticket)
+
+    def supersede(self, name, page):
+        """Mark running `name` jobs of this page as superseded without starting one
+        (e.g. the page now shows a newer approximate result); nothing to do when none runs"""
+        key = (page, name)
+        with self._lock:
+            if key in self._live:
+                self._latest[key] = next(self._counter)
+
+    def superseded(self, job):
+        with self._lock:
+            return self._latest.get(job.key, job.ticket) != job.ticket
+
+    def cancel(self, job):
+        with self._lock:
+            self.cancelled += 1
+
+    def finish(self, job):
+        """Forget a page's callback once its last running job ends (a page gone for good leaves nothing)"""
+        with self._lock:
+            self.running -= 1
+            if job.key is None:
+                return
+            remaining = self._live[job.key] - 1
+            if remaining:
+                self._live[job.key] = remaining
+            else:
+                del self._live[job.key]
+                del self._latest[job.key]
+
+    def stats(self):
+        with self._lock:
+            return {'started': self.started, 'cancelled': self.cancelled, 'running': self.running,
+                    'tracked': len(self._latest)}
+
+
+class _NullJob:
+    def check(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_JOB = _NullJob()
+
+
+def background_manager(cache_dir):
+    """Dash DiskcacheManager storing job results under `cache_dir`, or None when the
+    diskcache extra is missing (pip install "dash[diskcache]")"""
+    try:
+        import diskcache
+        import multiprocess  # noqa: F401 (tiến trình chạy job của DiskcacheManager)
+        import psutil  # noqa: F401
+        from dash import DiskcacheManager
+        return DiskcacheManager(diskcache.Cache(cache_dir))
+    except ImportError as e:
+        print(f"⚠️ Background callbacks disabled ({e}); install dash[diskcache]")
+        return None
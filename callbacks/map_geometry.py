@@ -0,0 +1,26 @@
+from flask import Response, request
+from data.geometry import PROVINCES_URL, current_provinces
+
+# Hình dạng tỉnh chỉ đổi khi đổi file: trình duyệt giữ một ngày, sau đó hỏi lại bằng ETag
+GEOMETRY_MAX_AGE = 86400
+
+
+def register_geometry(server):
+    """Serve the simplified province outlines (data.geometry.load_provinces) at
+    /provinces.geojson on the Flask server of the Dash app.
+
+    plotly.js fetches a choropleth's geojson URL once per page and keeps it,
+    and the response is cacheable with an ETag, so the geometry crosses the
+    network once per browser while filtering only sends values.
+    """
+
+    def geometry_view():
+        geometry = current_provinces()
+        if geometry is None:
+            return 'No province outlines loaded', 404
+        headers = {'Cache-Control': f'public, max-age={GEOMETRY_MAX_AGE}', 'ETag': f'"{geometry.etag}"'}
+        if request.if_none_match.contains(geometry.etag):
+            return Response(status=304, headers=headers)
+        return Response(geometry.body, mimetype='application/geo+json', headers=headers)
+
+    server.add_url_rule('/' + PROVINCES_URL, 'provinces_geojson', geometry_view)
@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROWS_BUCKETS = (100, 1e3, 1e4, 1e5, 1e6, 1e7)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7)
+
+timing_log = logging.getLogger('dashboard.timing')
+
+HELP = {
+    'dashboard_callback_seconds': 'Wall time per callback',
+    'dashboard_filter_seconds': 'Filter index lookup time',
+    'dashboard_filtered_rows': 'Rows left after filtering',
+    'dashboard_chart_build_seconds': 'Figure builder time per chart',
+    'dashboard_chart_serialize_seconds': 'JSON serialization time per chart',
+    'dashboard_output_bytes': 'Serialized size per output',
+    'dashboard_export_rows': 'Rows streamed per export',
+    'dashboard_export_seconds': 'Wall time per export, until the last byte is sent',
+    'dashboard_export_chunk_bytes': 'Encoded size per streamed export chunk',
+    'dashboard_cache_entries': 'Entries in the result cache',
+    'dashboard_cache_bytes': 'Bytes held by the result cache',
+    'dashboard_cache_max_bytes': 'Byte budget of the result cache',
+    'dashboard_cache_hits_total': 'Result cache lookups answered from the cache',
+    'dashboard_cache_misses_total': 'Result cache lookups that had to compute',
+    'dashboard_cache_evictions_total': 'Result cache entries evicted by the byte budget',
+    'dashboard_jobs_started_total': 'Callback runs started',
+    'dashboard_jobs_cancelled_total': 'Callback runs stopped by a newer run of the same page',
+    'dashboard_jobs_running': 'Callback runs in progress',
+}
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _number(value):
+    # Số nguyên (counter, byte) in đủ chữ số; số thực 6 chữ số có nghĩa
+    return str(int(value)) if float(value).is_integer() else f'{value:.6g}'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class Metrics:
+    """Hot-path histograms and gauges, rendered as Prometheus text for /metrics.
+
+    With enabled=False every call returns immediately (timer() hands out a
+    no-op context), so instrumented code needs no checks of its own. Gauges
+    (values that go up and down, e.g. cache bytes) and counters (running
+    totals named '*_total', e.g. cache hits) are callables read at scrape time.
+    """
+
+    def __init__(self, enabled=True, log_requests=False):
+        self.enabled = enabled
+        self.log_requests = enabled and log_requests
+        self._histograms = {}
+        self._readers = []
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def _timer(self, name, labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timer(self, name, **labels):
+        """Context manager observing the elapsed seconds of its block"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return self._timer(name, labels)
+
+    def add_gauges(self, read):
+        """`read()` -> {(name, labels tuple): value}, evaluated at each scrape"""
+        self._readers.append(('gauge', read))
+
+    def add_counters(self, read):
+        """Like add_gauges, for totals that only grow (names ending in '_total')"""
+        self._readers.append(('counter', read))
+
+    def log(self, message, *args):
+        if self.log_requests:
+            timing_log.info(message, *args)
+
+    def render(self):
+        """Prometheus text exposition of everything recorded so far"""
+        lines = []
+        with self._lock:
+            items = sorted(self._histograms.items())
+            seen = set()
+            for (name, labels), h in items:
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f'# HELP {name} {HELP.get(name, name)}')
+                    lines.append(f'# TYPE {name} histogram')
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels + (("le", f"{bound:g}"),))} {cumulative}')
+                lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {h.count}')
+                lines.append(f'{name}_sum{_labels(labels)} {h.sum:.6g}')
+                lines.append(f'{name}_count{_labels(labels)} {h.count}')
+
+        for kind, read in self._readers:
+            seen = set()
+            for (name, labels), value in sorted(read().items()):
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f'# HELP {name} {HELP.get(name, name)}')
+                    lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def register_route(self, server, path='/metrics'):
+        """Serve render() on the Flask server of the Dash app"""
+        def metrics_view():
+            return self.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+        server.add_url_rule(path, 'metrics', metrics_view)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+DISABLED = Metrics(enabled=False)
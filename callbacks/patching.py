@@ -0,0 +1,58 @@
+from dash import Patch, no_update
+
+
+def _is_array(value):
+    # Mảng dữ liệu: list JSON hoặc mảng nhị phân {'dtype', 'bdata'} của Plotly
+    return isinstance(value, list) or (isinstance(value, dict) and 'bdata' in value)
+
+
+def _split(obj, path=()):
+    """(structure, {path: array}) of a JSON figure fragment: arrays are data, the rest structure"""
+    if _is_array(obj):
+        return None, {path: obj}
+    if not isinstance(obj, dict):
+        return obj, {}
+    structure, arrays = {}, {}
+    for key, value in obj.items():
+        structure[key], sub = _split(value, path + (key,))
+        arrays.update(sub)
+    return structure, arrays
+
+
+def figure_patch(old, new):
+    """Patch turning figure `old` into `new` when only data arrays differ.
+
+    Returns no_update if nothing changed and None when the layout or the
+    trace structure changed (the caller then sends the full figure).
+    """
+    if not isinstance(old, dict) or not isinstance(new, dict) or old.get('layout') != new.get('layout'):
+        return None
+    old_traces, new_traces = old.get('data', []), new.get('data', [])
+    if len(old_traces) != len(new_traces):
+        return None
+
+    patch, changed = Patch(), False
+    for i, (old_trace, new_trace) in enumerate(zip(old_traces, new_traces)):
+        old_structure, old_arrays = _split(old_trace)
+        new_structure, new_arrays = _split(new_trace)
+        if old_structure != new_structure or old_arrays.keys() != new_arrays.keys():
+            return None
+        for path, value in new_arrays.items():
+            if old_arrays[path] != value:
+                target = patch['data'][i]
+                for key in path[:-1]:
+                    target = target[key]
+                target[path[-1]] = value
+                changed = True
+    return patch if changed else no_update
+
+
+def patch_outputs(old_outputs, new_outputs, props):
+    """Per output: a Patch / no_update for figures whose structure is unchanged, else the full value"""
+    if old_outputs is None:
+        return new_outputs
+    result = []
+    for old, new, prop in zip(old_outputs, new_outputs, props):
+        patch = figure_patch(old, new) if prop == 'figure' else None
+        result.append(new if patch is None else patch)
+    return result
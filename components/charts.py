@@ -1,12 +1,259 @@
+import math
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
+from data.compact import float_values
+from data.cube import BMI_STEP
+from data.data_loader import AGE_LABELS
+from data.geometry import PROVINCE_CENTROIDS, PROVINCES_URL, current_provinces, map_locations, match_provinces
+from data.time_index import TimeIndex
+
+# Quá số hồ sơ này, biểu đồ từng điểm chuyển sang lưới mật độ
+MAX_POINTS = 5000
+# Số cột yêu cầu của histogram BMI (nbinsx; Plotly làm tròn bề rộng cột)
+BMI_BINS = 20
+# Số điểm ngoại lai tối đa gửi cho mỗi hộp của box plot
+MAX_OUTLIERS = 200
+# Chuỗi của timeline: (cột của DataSource.timeline, tên, màu)
+TIMELINE_TRACES = (('registrations', 'Đăng ký mới', '#2563eb'),
+                   ('logins', 'Đăng nhập gần nhất', '#f59e0b'))
+TIMELINE_PERIODS = {'D': 'ngày', 'W': 'tuần', 'M': 'tháng'}
+# Màu của các nhóm so sánh (theo thứ tự nhóm)
+COHORT_COLORS = ('#2563eb', '#f59e0b', '#16a34a', '#db2777')
+# Số nhãn phổ biến nhất của mỗi nhóm đưa vào biểu đồ so sánh
+COHORT_TOP_LABELS = 6
+
+
+def code_counts(data, columns):
+    """Counts per label combination of categorical columns, like
+    groupby(observed=True).size(): one bincount over the combined codes, labels
+    attached only to the combinations present"""
+    dtypes = [data[col].dtype for col in columns]
+    sizes = [len(dtype.categories) for dtype in dtypes]
+    key = np.zeros(len(data), dtype=np.int64)
+    valid = np.ones(len(data), dtype=bool)
+    for col, size in zip(columns, sizes):
+        codes = data[col].cat.codes.to_numpy()
+        valid &= codes >= 0
+        key = key * size + codes
+    counts = np.bincount(key[valid], minlength=int(np.prod(sizes)))
+    present = np.flatnonzero(counts)
+    arrays, keys = [], present
+    for dtype, size in zip(reversed(dtypes), reversed(sizes)):
+        keys, codes = np.divmod(keys, size)
+        arrays.append(pd.Categorical.from_codes(codes, dtype=dtype))
+    return pd.Series(counts[present], index=pd.MultiIndex.from_arrays(arrays[::-1], names=list(columns)))
+
+
+def first_seen_counts(column):
+    """value_counts of an unordered categorical as if it were plain text: labels
+    without rows left out, equal counts in order of first appearance (value_counts
+    of a categorical breaks ties in category order instead)"""
+    codes = column.cat.codes.to_numpy()
+    codes = codes[codes >= 0]
+    present = pd.unique(codes)
+    counts = pd.Series(np.bincount(codes, minlength=len(column.cat.categories))[present],
+                       index=pd.CategoricalIndex(pd.Categorical.from_codes(present, dtype=column.dtype),
+                                                 name=column.name), name='count')
+    return counts.sort_values(ascending=False, kind='stable')
+
+
+def count_by(data, *columns):
+    """Counts per label (or label combination) from a row frame or a cube view"""
+    if isinstance(data, pd.DataFrame):
+        if len(columns) == 1:
+            column = data[columns[0]]
+            if isinstance(column.dtype, pd.CategoricalDtype) and not column.cat.ordered:
+                return first_seen_counts(column)
+            counts = column.value_counts()
+            # Cột category: value_counts liệt kê cả nhãn không có hồ sơ
+            return counts[counts > 0]
+        if all(isinstance(data[col].dtype, pd.CategoricalDtype) for col in columns):
+            # Đếm trên mã danh mục, nhãn chỉ gắn khi trả kết quả
+            return code_counts(data, columns)
+        return data.groupby(list(columns), observed=True).size()
+    return data.count_by(*columns)
+
+
+def bmi_summary(data):
+    """(mean, min, max) of BMI from a row frame or a cube view"""
+    if isinstance(data, pd.DataFrame):
+        if 'BMI' not in data.columns or len(data) == 0:
+            return None
+        bmi = pd.Series(float_values(data['BMI']))
+        return bmi.mean(), bmi.min(), bmi.max()
+    return data.bmi_summary()
+
+
+def bmi_density(data, step=BMI_STEP):
+    """Counts per BMI bucket (rows) x age group (columns), binned with NumPy or read from a cube view"""
+    if not isinstance(data, pd.DataFrame):
+        counts = data.count_by('age_group', 'bmi_bucket')
+        if len(counts) == 0:
+            return pd.DataFrame(columns=AGE_LABELS)
+        grid = counts.unstack('age_group', fill_value=0)
+        grid.columns = grid.columns.astype(str)
+        return grid.reindex(columns=AGE_LABELS, fill_value=0).sort_index()
+
+    age = pd.Categorical(data['age_group'], categories=AGE_LABELS).codes.astype(np.int64)
+    bmi = float_values(data['BMI'])
+    valid = (age >= 0) & np.isfinite(bmi)
+    if not valid.any():
+        return pd.DataFrame(columns=AGE_LABELS)
+    bucket = np.floor(bmi[valid] / step).astype(np.int64)
+    lo = bucket.min()
+    n_buckets = int(bucket.max() - lo) + 1
+    # Một lần bincount trên khóa (nhóm tuổi, ô BMI)
+    counts = np.bincount(age[valid] * n_buckets + (bucket - lo), minlength=len(AGE_LABELS) * n_buckets)
+    return pd.DataFrame(counts.reshape(len(AGE_LABELS), n_buckets).T,
+                        index=(lo + np.arange(n_buckets)) * step, columns=AGE_LABELS)
+
+
+def _js_string(x):
+    # String(x) của JavaScript cho số thực (2.0 -> '2')
+    text = repr(float(x))
+    return text[:-2] if text.endswith('.0') else text
+
+
+def _increment(x, delta):
+    """x + delta the way Plotly's Lib.increment rounds it"""
+    inverse = 1 / abs(delta)
+    total = (inverse * x + inverse * delta) / inverse if inverse > 1 else x + delta
+    length = len(_js_string(total))
+    if length > 16 and length >= len(_js_string(delta)) + len(_js_string(x)):
+        rounded = f'{total:.12g}'
+        if 'e+' not in rounded:
+            total = float(rounded)
+    return total
+
+
+def _shift_bins(start, size, values, lo, hi):
+    """Plotly's shift of auto bins: half a unit down for all-integer data, half a bin
+    when many values sit on the bin edges and few on the bin middles"""
+    def near_edge(v):
+        # Trong 1% bề rộng cột quanh một cạnh
+        return np.fmod(1 + (v - start) * 100 / size, 100) < 2
+
+    n = len(values)
+    if np.count_nonzero(np.fmod(values, 1) == 0) == n:
+        if size < 1:
+            return lo - 0.5 * size
+        start -= 0.5
+        return start + size if start + size < lo else start
+    edge, middle = np.count_nonzero(near_edge(values)), np.count_nonzero(near_edge(values + size / 2))
+    if middle < n * 0.1 and (edge > n * 0.3 or near_edge(lo) or near_edge(hi)):
+        half = size / 2
+        start += half if start + half < lo else -half
+    return start
+
+
+def histogram_bins(lo, hi, nbins=BMI_BINS, values=None):
+    """(start, size, count) of the bins go.Histogram(nbinsx=nbins) draws for data in
+    [lo, hi], as Plotly's autoBin picks them: size (hi - lo) / nbins rounded up to
+    2, 5 or 10 x 10^k, first edge on a multiple of the size, then _shift_bins()
+    over `values` (skipped without them, e.g. for a count cube)"""
+    rough = (hi - lo) / nbins
+    size = 1.0
+    if rough > 0:
+        base = 10.0 ** math.floor(math.log(rough) / math.log(10))
+        size = base * next((m for m in (2, 5) if m > rough / base), 10)
+    start = _increment(math.ceil((lo - (hi - lo) * 1e-4) / size) * size, -size)
+    if values is not None:
+        start = _shift_bins(start, size, values, lo, hi)
+    return start, size, 1 + math.floor((hi - start) / size)
+
+
+def bmi_histogram(data, bins=BMI_BINS):
+    """(counts, edges) of BMI in the bins go.Histogram(nbinsx=bins) draws (histogram_bins).
+
+    Rows are binned like Plotly (left-closed bins); a cube or sample view
+    sums its BMI buckets into the bin holding each bucket's middle, exact
+    whenever the bin edges fall on bucket edges (bins of 1 BMI or more).
+    """
+    if isinstance(data, pd.DataFrame):
+        values = float_values(data['BMI'])
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return np.zeros(0, dtype=np.int64), np.zeros(1)
+        lo, hi, weights = values.min(), values.max(), None
+        start, size, count = histogram_bins(lo, hi, bins, values)
+    else:
+        summary, buckets = data.bmi_summary(), count_by(data, 'bmi_bucket')
+        if summary is None or not len(buckets):
+            return np.zeros(0, dtype=np.int64), np.zeros(1)
+        values = buckets.index.to_numpy(dtype=float) + data.bmi_step / 2
+        weights = buckets.to_numpy(dtype=float)
+        start, size, count = histogram_bins(summary[1], summary[2], bins)
+    k = np.clip(np.floor((values - start) / size + 1e-9).astype(np.int64), 0, count - 1)
+    counts = np.bincount(k, weights=weights, minlength=count).astype(np.int64)
+    return counts, start + np.arange(count + 1) * size
+
+
+def _sorted_quantile(values, starts, sizes, p):
+    """Quantile of each sorted run values[start:start+size], Plotly's 'linear' method"""
+    pos = np.clip(p * sizes - 0.5, 0, sizes - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    frac = pos - lo
+    return values[starts + lo] * (1 - frac) + values[starts + hi] * frac
+
+
+def box_stats(data, by='gender', column='BMI', max_outliers=MAX_OUTLIERS):
+    """Per-group quartiles, whisker fences and outliers from a single sort.
+
+    Computed the way Plotly does for a box trace (quartilemethod 'linear',
+    whiskers at the last points within 1.5 IQR). Groups keep their order of
+    first appearance; at most `max_outliers` evenly spaced outliers are kept
+    per group, always including the extremes.
+    """
+    codes, groups = pd.factorize(data[by])
+    values = float_values(data[column])
+    valid = (codes >= 0) & np.isfinite(values)
+    codes, values = codes[valid], values[valid]
+    order = np.lexsort((values, codes))
+    values = values[order]
+
+    sizes = np.bincount(codes, minlength=len(groups))
+    starts = np.cumsum(sizes) - sizes
+    present = sizes > 0
+    groups, starts, sizes = groups[present], starts[present], sizes[present]
+
+    stats = pd.DataFrame({
+        'q1': _sorted_quantile(values, starts, sizes, 0.25),
+        'median': _sorted_quantile(values, starts, sizes, 0.5),
+        'q3': _sorted_quantile(values, starts, sizes, 0.75),
+        'mean': np.add.reduceat(values, starts) / sizes if len(values) else [],
+        'count': sizes,
+    }, index=pd.Index(groups, name=by))
+
+    lowerfence, upperfence, outliers = [], [], []
+    for start, size, q1, q3 in zip(starts, sizes, stats['q1'], stats['q3']):
+        run = values[start:start + size]
+        lo = np.searchsorted(run, q1 - 1.5 * (q3 - q1), side='left')
+        hi = np.searchsorted(run, q3 + 1.5 * (q3 - q1), side='right')
+        lowerfence.append(min(q1, run[min(lo, size - 1)]))
+        upperfence.append(max(q3, run[max(hi - 1, 0)]))
+        out = np.concatenate([run[:lo], run[hi:]])
+        if len(out) > max_outliers:
+            out = out[np.linspace(0, len(out) - 1, max_outliers).round().astype(np.int64)]
+        outliers.append(out)
+    stats['lowerfence'] = lowerfence
+    stats['upperfence'] = upperfence
+    stats['outliers'] = outliers
+    return stats
 
 
-def apply_theme(fig, dark_mode=False):
-    """Apply consistent theme to charts with dark mode support"""
+def rows_required_figure(dark_mode=False):
+    """Placeholder for per-record charts when only aggregates are loaded"""
+    fig = go.Figure()
+    fig.add_annotation(text="Cần dữ liệu chi tiết từng hồ sơ", showarrow=False)
+    return apply_theme(fig, dark_mode)
+
+
+def _theme_template(dark_mode):
     if dark_mode:
         colors = {
             'bg': '#1e293b',
@@ -22,28 +269,42 @@ def apply_theme(fig, dark_mode=False):
             'grid': '#e5e7eb',
         }
 
-    fig.update_layout(
+    return go.layout.Template(layout=dict(
         font_family="Inter",
         paper_bgcolor=colors['paper'],
         plot_bgcolor=colors['bg'],
         font_color=colors['text'],
+        colorway=[
+            "#2563eb", "#3b82f6", "#60a5fa",
+            "#93c5fd", "#bfdbfe", "#6366f1", "#8b5cf6"
+        ],
+        # Thang màu liên tục mặc định giữ như template 'plotly'
+        colorscale=dict(sequential=pio.templates['plotly'].layout.colorscale.sequential),
+        hovermode='closest',
+        xaxis=dict(showgrid=False, linecolor=colors['grid'], title_font=dict(size=14)),
+        yaxis=dict(showgrid=True, gridcolor=colors['grid'], title_font=dict(size=14)),
+    ))
+
+
+# Template gọn đăng ký một lần: hình chỉ mang theo vài trăm byte thay vì cả template 'plotly'
+THEME_TEMPLATES = {False: 'health_light', True: 'health_dark'}
+pio.templates['health_light'] = _theme_template(False)
+pio.templates['health_dark'] = _theme_template(True)
+pio.templates.default = 'health_light'
+
+
+def apply_theme(fig, dark_mode=False):
+    """Apply consistent theme to charts with dark mode support"""
+    fig.update_layout(
+        template=THEME_TEMPLATES[bool(dark_mode)],
         margin=dict(
             t=80,
             b=50,
             l=50,
             r=30
         ),
-        colorway=[
-            "#2563eb", "#3b82f6", "#60a5fa",
-            "#93c5fd", "#bfdbfe", "#6366f1", "#8b5cf6"
-        ],
-        hovermode='closest',
         autosize=True
     )
-
-    fig.update_xaxes(showgrid=False, linecolor=colors['grid'], title_font=dict(size=14))
-    fig.update_yaxes(showgrid=True, gridcolor=colors['grid'], title_font=dict(size=14))
-
     return fig
 
 
@@ -54,7 +315,7 @@ def create_age_chart(df, dark_mode=False):
         fig.add_annotation(text="No data available", showarrow=False)
         return apply_theme(fig, dark_mode)
 
-    age_counts = df['age_group'].value_counts().reset_index()
+    age_counts = count_by(df, 'age_group').reset_index()
     age_counts.columns = ['age_group', 'count']
 
     fig = px.pie(
@@ -93,10 +354,14 @@ def create_bmi_chart(df, dark_mode=False):
 
     fig = go.Figure()
 
-    # Add histogram
-    fig.add_trace(go.Histogram(
-        x=df['BMI'],
-        nbinsx=20,
+    # Add histogram (số đếm tính trên server theo đúng các cột go.Histogram(nbinsx=20) tự chọn)
+    counts, edges = bmi_histogram(df)
+    x, width = (edges[:-1] + edges[1:]) / 2, np.diff(edges)
+
+    fig.add_trace(go.Bar(
+        x=x,
+        y=counts,
+        width=width,
         name='BMI Distribution',
         marker_color='#2563eb',
         opacity=0.7,
@@ -135,7 +400,7 @@ def create_disease_chart(df, dark_mode=False):
     if 'commonDiseases' not in df.columns or len(df) == 0:
         return apply_theme(go.Figure(), dark_mode)
 
-    counts = df['commonDiseases'].value_counts().reset_index().head(10)
+    counts = count_by(df, 'commonDiseases').reset_index().head(10)
     counts.columns = ['disease', 'count']
 
     fig = px.bar(
@@ -173,7 +438,7 @@ def create_province_chart(df, dark_mode=False):
     if 'location' not in df.columns or len(df) == 0:
         return apply_theme(go.Figure(), dark_mode)
 
-    prov = df['location'].value_counts().reset_index().head(10)
+    prov = count_by(df, 'location').reset_index().head(10)
     prov.columns = ['location', 'count']
 
     fig = px.bar(
@@ -207,17 +472,126 @@ def create_province_chart(df, dark_mode=False):
     return apply_theme(fig, dark_mode)
 
 
+def province_figures(data, locations):
+    """Per province of `locations` (in that order): profiles, most common disease
+    (ties: the first label in code point order) and its share of the profiles in %.
+    Data labels are matched to the map's provinces by name (match_provinces)."""
+    n = len(locations)
+    counts, top, top_counts = np.zeros(n, dtype=np.int64), [''] * n, np.zeros(n, dtype=np.int64)
+    if len(data) == 0:
+        return counts, top, np.zeros(n)
+    per_label = count_by(data, 'location')
+    slots = match_provinces([str(label) for label in per_label.index], locations)
+    for label, count in per_label.items():
+        if str(label) in slots:
+            counts[slots[str(label)]] += count
+    if 'commonDiseases' in data.columns:
+        pairs = count_by(data, 'location', 'commonDiseases').reset_index(name='count')
+        pairs['slot'] = pairs['location'].astype(str).map(slots)
+        pairs['disease'] = pairs['commonDiseases'].astype(str)
+        pairs = pairs.dropna(subset=['slot']).groupby(['slot', 'disease'], as_index=False)['count'].sum()
+        best = pairs.sort_values(['slot', 'count', 'disease'], ascending=[True, False, True]) \
+            .drop_duplicates('slot')
+        for slot, disease, count in best[['slot', 'disease', 'count']].itertuples(index=False):
+            top[int(slot)], top_counts[int(slot)] = disease, count
+    shares = 100 * top_counts / np.maximum(counts, 1)
+    return counts, top, shares
+
+
+def create_province_map(df, dark_mode=False):
+    """Profiles and the most common disease per province on a map.
+
+    With province outlines loaded (data.geometry.load_provinces) it is a
+    choropleth whose geometry is a URL the browser fetches once; without, bubbles
+    at the province centroids. Provinces keep the same order whatever the
+    filters, so an update only changes value arrays (a Patch from
+    patch_outputs, or the browser port) and never resends geometry.
+    """
+    if 'location' not in df.columns:
+        return apply_theme(go.Figure(), dark_mode)
+    geometry = current_provinces()
+    locations = map_locations()
+    counts, top, shares = province_figures(df, locations)
+    customdata = [[loc, int(c), t, round(float(s), 6)] for loc, c, t, s in zip(locations, counts, top, shares)]
+    share_values = np.where(counts > 0, shares, np.nan)
+    hover = ('<b>%{customdata[0]}</b><br>Số hồ sơ: %{customdata[1]:,}'
+             '<br>Bệnh phổ biến nhất: %{customdata[2]} (%{customdata[3]:.1f}%)<extra></extra>')
+    # Hai lớp: số hồ sơ và tỷ lệ bệnh phổ biến nhất, đổi bằng nút (không gửi lại dữ liệu)
+    layers = (('Số hồ sơ', counts, 'GnBu'), ('Bệnh phổ biến nhất (%)', share_values, 'OrRd'))
+
+    fig = go.Figure()
+    for i, (name, values, scale) in enumerate(layers):
+        colorbar = dict(title=name, thickness=12, len=0.8)
+        if geometry is not None:
+            fig.add_trace(go.Choropleth(
+                geojson=PROVINCES_URL, featureidkey='id', locations=locations, z=values, name=name,
+                colorscale=scale, zmin=0, colorbar=colorbar, marker_line_width=0.5,
+                customdata=customdata, hovertemplate=hover, visible=i == 0
+            ))
+        else:
+            lon, lat = zip(*(PROVINCE_CENTROIDS[loc] for loc in locations))
+            sizes = 6 + 24 * np.sqrt(counts / max(counts.max(), 1))
+            fig.add_trace(go.Scattergeo(
+                lon=lon, lat=lat, mode='markers', name=name,
+                marker=dict(size=sizes, color=values, colorscale=scale, cmin=0, colorbar=colorbar,
+                            line=dict(width=0.5, color='rgb(8,48,107)')),
+                customdata=customdata, hovertemplate=hover, visible=i == 0
+            ))
+    fig.update_geos(visible=False, fitbounds='locations', projection_type='mercator', bgcolor='rgba(0,0,0,0)')
+    fig.update_layout(
+        height=520, margin=dict(t=40, b=10, l=10, r=10), showlegend=False, uirevision='province-map',
+        updatemenus=[dict(type='buttons', direction='right', x=0, y=1.08, xanchor='left', showactive=True,
+                          buttons=[dict(label=name, method='restyle',
+                                        args=[{'visible': [j == i for j in range(len(layers))]}])
+                                   for i, (name, _, _) in enumerate(layers)])]
+    )
+    return apply_theme(fig, dark_mode)
+
+
+def create_density_plot(df, dark_mode=False):
+    """Age x BMI density grid for cohorts too large to draw point by point"""
+    step = getattr(df, 'bmi_step', BMI_STEP)
+    density = bmi_density(df, step)
+    z = density.to_numpy(dtype=float)
+    z = np.where(z > 0, z, np.nan)
+
+    fig = go.Figure(go.Heatmap(
+        x=density.columns,
+        y=density.index.to_numpy(dtype=float) + step / 2,
+        z=z,
+        colorscale='Blues',
+        colorbar=dict(title='Số hồ sơ'),
+        hovertemplate='Nhóm tuổi: %{x}<br>BMI: %{y}<br>Số hồ sơ: %{z}<extra></extra>'
+    ))
+
+    fig.update_layout(
+        height=400,
+        margin=dict(t=30, b=50, l=50, r=30),
+        xaxis_title="Nhóm tuổi",
+        yaxis_title="Chỉ số BMI"
+    )
+
+    fig.update_xaxes(title_font=dict(size=12))
+    fig.update_yaxes(title_font=dict(size=12))
+
+    return apply_theme(fig, dark_mode)
+
+
 def create_scatter_plot(df, dark_mode=False):
     """Ẩn chú thích bên trong để dành không gian cho biểu đồ"""
     if df.empty: return apply_theme(go.Figure())
+    if not isinstance(df, pd.DataFrame) or len(df) > MAX_POINTS:
+        # Nhiều hồ sơ: gửi lưới mật độ tính sẵn thay vì từng điểm
+        return create_density_plot(df, dark_mode)
 
     age_map = {'Dưới 18': 15, '18-30': 24, '31-45': 38, '46-60': 53, 'Trên 60': 70}
     df_plot = df.copy()
     df_plot['age_num'] = df_plot['age_group'].map(age_map)
+    df_plot['BMI'] = float_values(df_plot['BMI'])
 
     fig = px.scatter(
         df_plot, x='age_num', y='BMI', color='commonDiseases',
-        opacity=0.7,
+        opacity=0.7, render_mode='webgl',
         labels={'age_num': 'Độ tuổi (ước tính)', 'BMI': 'Chỉ số BMI'}
     )
 
@@ -235,16 +609,28 @@ def create_scatter_plot(df, dark_mode=False):
     return apply_theme(fig, dark_mode)
 
 
-def create_timeline_chart(df, dark_mode=False):
-    """Cố định chiều cao Timeline để bằng với Scatter Plot"""
-    if 'age_group' not in df.columns or len(df) == 0:
+def create_timeline_chart(data, dark_mode=False):
+    """Registrations and last logins per day / week / month (DataSource.timeline),
+    or from a row frame with createdAt; same height as the scatter plot"""
+    if isinstance(data, pd.DataFrame) and 'registrations' not in data.columns and 'createdAt' in data.columns:
+        data = TimeIndex(data).timeline()
+    if not isinstance(data, pd.DataFrame) or 'registrations' not in data.columns or len(data) == 0:
         return apply_theme(go.Figure(), dark_mode)
 
-    age_order = ['Dưới 18', '18-30', '31-45', '46-60', 'Trên 60']
-    counts = [len(df[df['age_group'] == age]) for age in age_order]
-
-    fig = go.Figure(data=[go.Bar(x=age_order, y=counts, marker_color='#2563eb')])
-    fig.update_layout(height=400)
+    x = data.index.strftime('%Y-%m-%d')
+    fig = go.Figure()
+    for column, name, color in TIMELINE_TRACES:
+        if column in data.columns:
+            fig.add_trace(go.Scatter(x=x, y=data[column].to_numpy(), name=name, mode='lines',
+                                     line=dict(color=color, width=2)))
+    fig.update_layout(
+        height=400,
+        hovermode='x unified',
+        margin=dict(t=30, b=50, l=50, r=30),
+        xaxis_title=f"Thời gian (theo {TIMELINE_PERIODS.get(data.attrs.get('freq'), 'ngày')})",
+        yaxis_title="Số hồ sơ",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
     return apply_theme(fig, dark_mode)
 
 
@@ -252,13 +638,14 @@ def create_stats_cards_data(df):
     """Generate data for statistics cards"""
     stats = []
 
-    if 'BMI' in df.columns and len(df) > 0:
+    bmi = bmi_summary(df)
+    if bmi is not None:
         stats.append({
             'title': 'BMI Trung bình',
-            'value': f"{df['BMI'].mean():.1f}",
+            'value': f"{bmi[0]:.1f}",
             'icon': '📊',
             'trend': 'stable',
-            'subtitle': f'Min: {df["BMI"].min():.1f} | Max: {df["BMI"].max():.1f}'
+            'subtitle': f'Min: {bmi[1]:.1f} | Max: {bmi[2]:.1f}'
         })
 
     stats.append({
@@ -266,46 +653,69 @@ def create_stats_cards_data(df):
         'value': f"{len(df):,}",
         'icon': '👥',
         'trend': 'up',
-        'subtitle': f'{df["age_group"].nunique()} nhóm tuổi' if 'age_group' in df.columns else ''
+        'subtitle': f'{(count_by(df, "age_group") > 0).sum()} nhóm tuổi' if 'age_group' in df.columns else ''
     })
 
     if 'commonDiseases' in df.columns and len(df) > 0:
+        diseases = count_by(df, 'commonDiseases')
         stats.append({
             'title': 'Loại bệnh lý',
-            'value': f"{df['commonDiseases'].nunique()}",
+            'value': f"{len(diseases)}",
             'icon': '🏥',
             'trend': 'stable',
-            'subtitle': f'Phổ biến: {df["commonDiseases"].value_counts().index[0]}' if len(df) > 0 else ''
+            'subtitle': f'Phổ biến: {diseases.index[0]}' if len(df) > 0 else ''
         })
 
     if 'location' in df.columns and len(df) > 0:
+        locations = count_by(df, 'location')
         stats.append({
             'title': 'Vùng miền',
-            'value': f"{df['location'].nunique()}",
+            'value': f"{len(locations)}",
             'icon': '📍',
             'trend': 'stable',
-            'subtitle': f'Top: {df["location"].value_counts().index[0]}' if len(df) > 0 else ''
+            'subtitle': f'Top: {locations.index[0]}' if len(df) > 0 else ''
         })
 
     return stats
 
 
 def create_bmi_box_plot(df, dark_mode=False):
-    fig = px.box(df, x='gender', y='BMI', color='gender',
-                 points="all", title="Phân bổ BMI theo Giới tính",
-                 color_discrete_map={'Nam': '#2563eb', 'Nữ': '#ec4899'})
+    if not isinstance(df, pd.DataFrame):
+        # Kết quả ước tính (data/sample.SampleView) mang theo các dòng mẫu
+        df = getattr(df, 'rows', None)
+        if df is None:
+            return rows_required_figure(dark_mode)
+    # Tứ phân vị, râu và điểm ngoại lai tính sẵn: payload không phụ thuộc số hồ sơ
+    colors = {'Nam': '#2563eb', 'Nữ': '#ec4899'}
+    fig = go.Figure()
+    for gender, row in box_stats(df).iterrows():
+        color = colors.get(gender, '#8b5cf6')
+        fig.add_trace(go.Box(
+            x=[gender], q1=[row['q1']], median=[row['median']], q3=[row['q3']],
+            lowerfence=[row['lowerfence']], upperfence=[row['upperfence']], mean=[row['mean']],
+            name=gender, legendgroup=gender, marker_color=color, boxpoints=False
+        ))
+        if len(row['outliers']):
+            fig.add_trace(go.Scatter(
+                x=[gender] * len(row['outliers']), y=row['outliers'], mode='markers',
+                name=gender, legendgroup=gender, showlegend=False, marker_color=color,
+                hovertemplate='BMI: %{y}<extra></extra>'
+            ))
+    fig.update_layout(title="Phân bổ BMI theo Giới tính", xaxis_title='gender',
+                      yaxis_title='BMI', legend_title_text='gender')
     return apply_theme(fig, dark_mode)
 
 
 def create_disease_treemap(df, dark_mode=False):
-    fig = px.treemap(df, path=['location', 'commonDiseases'],
+    counts = count_by(df, 'location', 'commonDiseases').reset_index(name='count')
+    fig = px.treemap(counts, path=['location', 'commonDiseases'], values='count',
                      title="Bản đồ Bệnh lý theo Địa phương",
                      color_continuous_scale='RdBu')
     return apply_theme(fig, dark_mode)
 
 
 def create_allergy_bar_chart(df, dark_mode=False):
-    counts = df['allergies'].value_counts().nlargest(10).reset_index()
+    counts = count_by(df, 'allergies').nlargest(10).reset_index()
     counts.columns = ['Allergy', 'Count']
     fig = px.bar(counts, y='Allergy', x='Count', orientation='h',
                  title="Top 10 Loại Dị ứng Phổ biến",
@@ -316,20 +726,27 @@ def create_allergy_bar_chart(df, dark_mode=False):
 
 def create_age_disease_stacked(df, dark_mode=False):
     # Group data
-    temp_df = df.groupby(['age_group', 'commonDiseases']).size().reset_index(name='counts')
+    temp_df = count_by(df, 'age_group', 'commonDiseases').reset_index(name='counts')
     fig = px.bar(temp_df, x="age_group", y="counts", color="commonDiseases",
                  title="Bệnh lý theo Nhóm tuổi", barmode="stack")
     return apply_theme(fig, dark_mode)
 
 
 def create_registration_heatmap(df, dark_mode=False):
-    df['createdAt'] = pd.to_datetime(df['createdAt'])
-    df['day'] = df['createdAt'].dt.day_name()
-    df['hour'] = df['createdAt'].dt.hour
-
-    heatmap_data = df.groupby(['day', 'hour']).size().unstack(fill_value=0)
-    # Sắp xếp thứ tự ngày
     days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    if isinstance(df, pd.DataFrame) and 'created_weekday' in df.columns:
+        # Thứ/giờ đã tính sẵn lúc nạp dữ liệu, không parse lại createdAt
+        valid = df['created_weekday'] >= 0
+        heatmap_data = df[valid].groupby(['created_weekday', 'created_hour']).size().unstack(fill_value=0)
+        heatmap_data.index = [days_order[d] for d in heatmap_data.index]
+    elif isinstance(df, pd.DataFrame):
+        # Không ghi cột mới vào df: khung dữ liệu có thể là bảng gốc dùng chung
+        created = pd.to_datetime(df['createdAt'])
+        heatmap_data = created.groupby([created.dt.day_name().rename('day'),
+                                        created.dt.hour.rename('hour')]).size().unstack(fill_value=0)
+    else:
+        heatmap_data = count_by(df, 'weekday', 'hour').unstack(fill_value=0)
+    # Sắp xếp thứ tự ngày
     heatmap_data = heatmap_data.reindex(days_order)
 
     fig = px.imshow(heatmap_data, labels=dict(x="Giờ trong ngày", y="Thứ", color="Số lượng"),
@@ -339,7 +756,7 @@ def create_registration_heatmap(df, dark_mode=False):
 
 def create_gender_chart(df):
     """Biểu đồ tròn phân bổ giới tính với màu sắc chỉ định"""
-    counts = df['gender'].value_counts().reset_index()
+    counts = count_by(df, 'gender').reset_index()
     counts.columns = ['gender', 'count']
 
     gender_colors = {
@@ -358,4 +775,57 @@ def create_gender_chart(df):
     )
 
     fig.update_traces(textposition='inside', textinfo='percent+label')
-    return apply_theme(fig)
\ No newline at end of file
+    return apply_theme(fig)
+
+def create_cohort_bmi_chart(comparison, dark_mode=False):
+    """Mean BMI of each compared cohort (data/cohorts.CohortComparison), min-max as error bars"""
+    summary = comparison.summary.dropna(subset=['bmi_mean'])
+    fig = go.Figure()
+    if summary.empty:
+        fig.add_annotation(text="Chưa có nhóm để so sánh", showarrow=False)
+        return apply_theme(fig, dark_mode)
+    colors = dict(zip(comparison.names, COHORT_COLORS))
+    fig.add_trace(go.Bar(
+        x=list(summary.index), y=summary['bmi_mean'].round(2),
+        marker_color=[colors[name] for name in summary.index],
+        error_y=dict(type='data', symmetric=False, array=(summary['bmi_max'] - summary['bmi_mean']).round(2),
+                     arrayminus=(summary['bmi_mean'] - summary['bmi_min']).round(2)),
+        customdata=np.stack([summary['count'], summary['bmi_min'], summary['bmi_max']], axis=1),
+        hovertemplate='<b>%{x}</b><br>BMI TB: %{y:.1f} (min %{customdata[1]:.1f}, max %{customdata[2]:.1f})'
+                      '<br>Số hồ sơ: %{customdata[0]:,}<extra></extra>'
+    ))
+    fig.update_layout(height=350, showlegend=False, yaxis_title="BMI trung bình (min - max)",
+                      margin=dict(t=30, b=40, l=50, r=30))
+    return apply_theme(fig, dark_mode)
+
+
+def _cohort_label_chart(comparison, column, dark_mode=False):
+    """Share of each cohort's profiles per label of `column`, bars of the cohorts side by side"""
+    labels = comparison.top(column, COHORT_TOP_LABELS)
+    fig = go.Figure()
+    if not labels:
+        fig.add_annotation(text="Chưa có nhóm để so sánh", showarrow=False)
+        return apply_theme(fig, dark_mode)
+    # Các nhóm có cỡ khác nhau: so theo tỷ lệ trong nhóm, số hồ sơ hiện khi rê chuột
+    shares = comparison.shares(column).loc[labels]
+    counts = comparison.counts[column].loc[labels]
+    for name, color in zip(comparison.names, COHORT_COLORS):
+        fig.add_trace(go.Bar(
+            y=labels, x=(shares[name] * 100).round(2), name=name, orientation='h', marker_color=color,
+            customdata=counts[name].to_numpy(),
+            hovertemplate='<b>%{y}</b><br>%{x:.1f}% (%{customdata:,} hồ sơ)<extra>' + name + '</extra>'
+        ))
+    fig.update_layout(
+        barmode='group', height=400, xaxis_title="% hồ sơ của nhóm", yaxis={'autorange': 'reversed'},
+        margin=dict(t=30, b=40, l=150, r=30),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return apply_theme(fig, dark_mode)
+
+
+def create_cohort_disease_chart(comparison, dark_mode=False):
+    return _cohort_label_chart(comparison, 'commonDiseases', dark_mode)
+
+
+def create_cohort_allergy_chart(comparison, dark_mode=False):
+    return _cohort_label_chart(comparison, 'allergies', dark_mode)
@@ -1,14 +1,100 @@
 from dash import dcc, html
 import dash_bootstrap_components as dbc
+import pandas as pd
 from components.shadcn_ui import Card
+from components.charts import bmi_summary
+from data.data_loader import AGE_LABELS
+from data.filter_index import as_list
+from data.time_index import day_label, day_numbers, period_starts
 
+# Số mốc tháng tối đa trên thanh trượt ngày đăng ký
+DATE_SLIDER_MARKS = 8
 
-def filter_section(df):
-    """Phần bộ lọc - Cập nhật Badge Hồ sơ tìm thấy với thiết kế Indigo"""
+# Bước của thanh trượt BMI (cũng là độ phân giải khóa cache bộ lọc)
+BMI_SLIDER_STEP = 0.5
+
+
+def distinct_values(df, column):
+    """Sorted option values from a row frame or a count cube"""
+    if isinstance(df, pd.DataFrame):
+        return sorted(df[column].dropna().unique())
+    return sorted(df.labels(column))
+
+
+def option_values(df, column):
+    """Option values of a filter dropdown; age groups keep their natural order"""
+    if column == 'age_group':
+        return list(AGE_LABELS)
+    return distinct_values(df, column)
+
+
+def created_bounds(df):
+    """(first, last) registration day (days since 1970-01-01) of a row frame or a data source"""
+    if isinstance(df, pd.DataFrame):
+        if 'createdAt' not in df.columns:
+            return None
+        days = day_numbers(df['createdAt'])
+        days = days[days >= 0]
+        return (int(days.min()), int(days.max())) if len(days) else None
+    return getattr(df, 'created_range', None)
+
+
+def date_marks(lo, hi, limit=DATE_SLIDER_MARKS):
+    """Slider marks ('YYYY-MM') on the first day of evenly spaced months between lo and hi"""
+    starts = period_starts(lo, hi, 'M')[1:]
+    starts = starts[::max(1, -(-len(starts) // limit))]
+    return {int(day): day_label(day)[:7] for day in starts}
+
+
+def facet_options(values, counts=None):
+    """Dropdown options; with `counts` (records per option under the other filters)
+    each label shows its count and options without records are greyed out"""
+    if counts is None:
+        return [{'label': v, 'value': v} for v in values]
+    options = []
+    for v in values:
+        n = int(counts.get(v, 0))
+        options.append({'label': f"{v} ({n:,})", 'value': v, 'disabled': n == 0})
+    return options
+
+
+def cohort_description(filters, bmi_bounds=None, created_bounds=None):
+    """Short text of a saved filter state, e.g. 'Hà Nội · tiểu đường · Nam · BMI 18.5-25';
+    slider ranges covering the whole data (bounds) are left out"""
+    parts = [', '.join(map(str, as_list(filters.get(name)))) for name in ('loc', 'dis', 'gen', 'age')
+             if as_list(filters.get(name))]
+    bmi = filters.get('bmi_range')
+    if bmi and not (bmi_bounds and bmi[0] <= bmi_bounds[0] and bmi[1] >= bmi_bounds[1]):
+        parts.append(f"BMI {bmi[0]:g}-{bmi[1]:g}")
+    created = filters.get('created_range')
+    if created and created_bounds and not (created[0] <= created_bounds[0] and created[1] >= created_bounds[1]):
+        parts.append(f"{day_label(created[0])} → {day_label(created[1])}")
+    return ' · '.join(parts) or 'Tất cả hồ sơ'
+
+
+def export_links(formats):
+    """Download links of the filtered profiles, one per format (href set by a clientside callback)"""
+    return html.Div([
+        html.A(f"⬇️ {fmt.upper()}", id={'type': 'export-link', 'format': fmt}, href=f"export.{fmt}",
+               download=f"profiles.{fmt}", className="text-xs font-bold text-indigo-600 mx-2")
+        for fmt in formats
+    ], className="flex justify-center mt-3")
+
+
+def filter_section(df, slider_update='mouseup', export_formats=()):
+    """Phần bộ lọc - Cập nhật Badge Hồ sơ tìm thấy với thiết kế Indigo
+
+    slider_update: 'mouseup' (lọc khi thả thanh trượt) hoặc 'drag' (lọc liên tục khi kéo)
+    export_formats: định dạng có liên kết tải xuống hồ sơ đang lọc (rỗng = không hiện)
+    """
 
     # Lấy giá trị BMI thấp nhất/cao nhất cho thanh trượt
-    bmi_min = float(df['BMI'].min()) if 'BMI' in df.columns and len(df) > 0 else 10
-    bmi_max = float(df['BMI'].max()) if 'BMI' in df.columns and len(df) > 0 else 50
+    bmi = bmi_summary(df) if 'BMI' in df.columns else None
+    bmi_min = float(bmi[1]) if bmi is not None else 10
+    bmi_max = float(bmi[2]) if bmi is not None else 50
+    # Khoảng ngày đăng ký (số ngày từ 1970-01-01); không có thời gian đăng ký thì khóa thanh trượt
+    created = created_bounds(df)
+    day_min, day_max = created if created is not None else (0, 1)
 
     return Card([
         html.Div([
@@ -18,7 +104,7 @@ def filter_section(df):
             html.Div([
                 html.Label("📍 Tỉnh / Thành phố", className="text-xs font-bold uppercase text-blue-600 mb-2 block"),
                 dcc.Dropdown(id='loc-filter',
-                             options=[{'label': i, 'value': i} for i in sorted(df['location'].unique())],
+                             options=facet_options(option_values(df, 'location')),
                              multi=True, placeholder="Chọn địa điểm...", className="dash-dropdown")
             ], className="mb-5"),
 
@@ -26,35 +112,45 @@ def filter_section(df):
             html.Div([
                 html.Label("🏥 Tiền sử bệnh lý", className="text-xs font-bold uppercase text-blue-600 mb-2 block"),
                 dcc.Dropdown(id='dis-filter',
-                             options=[{'label': i, 'value': i} for i in sorted(df['commonDiseases'].unique())],
+                             options=facet_options(option_values(df, 'commonDiseases')),
                              multi=True, placeholder="Chọn bệnh lý...", className="dash-dropdown")
             ], className="mb-5"),
 
             # 3. Bộ lọc Giới tính
             html.Div([
                 html.Label("⚧ Giới tính", className="text-xs font-bold uppercase text-blue-600 mb-2 block"),
-                dcc.Dropdown(id='gen-filter', options=[{'label': i, 'value': i} for i in sorted(df['gender'].unique())],
+                dcc.Dropdown(id='gen-filter', options=facet_options(option_values(df, 'gender')),
                              placeholder="Giới tính...", className="dash-dropdown")
             ], className="mb-5"),
 
             # 4. Bộ lọc Nhóm tuổi
             html.Div([
                 html.Label("👤 Nhóm độ tuổi", className="text-xs font-bold uppercase text-blue-600 mb-2 block"),
-                dcc.Dropdown(id='age-filter', options=[{'label': i, 'value': i} for i in
-                                                       ['Dưới 18', '18-30', '31-45', '46-60', 'Trên 60']],
+                dcc.Dropdown(id='age-filter', options=facet_options(option_values(df, 'age_group')),
                              placeholder="Độ tuổi...", className="dash-dropdown")
             ], className="mb-5"),
 
             # 5. Bộ lọc Khoảng BMI
             html.Div([
                 html.Label("📏 Khoảng BMI", className="text-xs font-bold uppercase text-blue-600 mb-2 block"),
-                dcc.RangeSlider(id='bmi-range-filter', min=bmi_min, max=bmi_max, step=0.5,
+                dcc.RangeSlider(id='bmi-range-filter', min=bmi_min, max=bmi_max, step=BMI_SLIDER_STEP,
                                 marks={int(i): str(int(i)) for i in range(int(bmi_min), int(bmi_max) + 1, 5)},
-                                value=[bmi_min, bmi_max], tooltip={"placement": "bottom", "always_visible": False},
+                                value=[bmi_min, bmi_max], updatemode=slider_update,
+                                tooltip={"placement": "bottom", "always_visible": False},
                                 className="mb-2"),
                 html.Div(id='bmi-range-display', className="text-xs text-slate-500 text-center mt-2")
             ], className="mb-6"),
 
+            # 6. Bộ lọc Ngày đăng ký
+            html.Div([
+                html.Label("📅 Ngày đăng ký", className="text-xs font-bold uppercase text-blue-600 mb-2 block"),
+                dcc.RangeSlider(id='created-range-filter', min=day_min, max=day_max, step=1,
+                                marks=date_marks(day_min, day_max) if created is not None else {},
+                                value=[day_min, day_max], updatemode=slider_update,
+                                disabled=created is None, className="mb-2"),
+                html.Div(id='created-range-display', className="text-xs text-slate-500 text-center mt-2")
+            ], className="mb-6"),
+
             # 7. Nút Reset
             html.Div([
                 html.Button([html.Span("🔄 ", className="mr-1"), "Reset Filters"],
@@ -78,7 +174,9 @@ def filter_section(df):
                         shadow-lg shadow-indigo-200/50 
                         transition-all hover:scale-105
                     """)
-                ], className="flex justify-center w-full")
+                ], className="flex justify-center w-full"),
+                # Tải xuống các hồ sơ đang lọc
+                export_links(export_formats) if export_formats else None
             ], className="pt-6 border-t border-slate-100")
         ])
     ], title="🎛️ Bảng điều khiển", description="Tùy chỉnh các tham số lọc")
\ No newline at end of file
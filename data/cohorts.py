@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from data.compact import widen_float32
+
+# Số nhóm so sánh tối đa (mỗi nhóm một bit trong nhãn thành viên uint8)
+MAX_COHORTS = 4
+# Các cột so sánh theo nhãn (top bệnh lý / dị ứng của từng nhóm)
+COMPARE_COLUMNS = ('commonDiseases', 'allergies')
+
+
+def cohort_names(n):
+    return [f'Nhóm {i + 1}' for i in range(n)]
+
+
+def membership(selections, n):
+    """Cohort bitmask of every row: bit i is set when the row is in cohort i
+    (a selection of None = every row)"""
+    if len(selections) > 8:
+        raise ValueError('At most 8 cohorts can be compared at once')
+    member = np.zeros(n, dtype=np.uint8)
+    for i, positions in enumerate(selections):
+        if positions is None:
+            member |= np.uint8(1 << i)
+        else:
+            member[positions] |= np.uint8(1 << i)
+    return member
+
+
+class CohortComparison:
+    """Figures of several cohorts side by side.
+
+    `summary` has one row per cohort (count, bmi_mean, bmi_min, bmi_max) and
+    `counts` one frame per compared column: profiles per label (rows) and
+    cohort (columns), labels without profiles left out.
+    """
+
+    def __init__(self, names, summary, counts):
+        self.names = names
+        self.summary = summary
+        self.counts = counts
+
+    def shares(self, column):
+        """Counts of `column` as a share of each cohort's profiles (0-1)"""
+        totals = self.summary['count'].to_numpy(dtype=float)
+        return self.counts[column] / np.where(totals > 0, totals, 1)
+
+    def top(self, column, n):
+        """Union of the `n` most common labels of every cohort, most common overall first"""
+        counts = self.counts.get(column)
+        if counts is None or counts.empty:
+            return []
+        shares = self.shares(column)
+        labels = set()
+        for name in self.names:
+            labels.update(shares[name][shares[name] > 0].nlargest(n).index)
+        return list(shares.loc[list(labels)].mean(axis=1).sort_values(ascending=False, kind='stable').index)
+
+
+def _cells(codes, sizes, bmi):
+    """Occupied cells of the mixed-radix key of `codes`: (codes per column, count,
+    BMI count / sum / min / max). BMI min and max are taken in the stored
+    precision and float32 is widened afterwards (widening keeps the order)."""
+    key = np.zeros(len(bmi), dtype=np.int64)
+    for c, size in zip(codes, sizes):
+        key = key * size + c
+    total = int(np.prod(sizes))
+    count = np.bincount(key, minlength=total)
+    valid = ~np.isnan(bmi)
+    bmi_count = np.bincount(key[valid], minlength=total)
+    bmi_sum = np.bincount(key[valid], weights=bmi[valid], minlength=total)
+    bmi_min = np.full(total, np.inf, dtype=bmi.dtype)
+    bmi_max = np.full(total, -np.inf, dtype=bmi.dtype)
+    np.minimum.at(bmi_min, key[valid], bmi[valid])
+    np.maximum.at(bmi_max, key[valid], bmi[valid])
+
+    occupied = np.flatnonzero(count)
+    keys, cells = occupied, []
+    for size in reversed(sizes):
+        keys, c = np.divmod(keys, size)
+        cells.append(c)
+    cells.reverse()
+    if bmi.dtype == np.float32:
+        bmi_min, bmi_max = widen_float32(bmi_min[occupied]), widen_float32(bmi_max[occupied])
+    else:
+        bmi_min, bmi_max = bmi_min[occupied], bmi_max[occupied]
+    return cells, count[occupied], bmi_count[occupied], bmi_sum[occupied], bmi_min, bmi_max
+
+
+def compare_codes(member, columns, bmi, n_cohorts):
+    """CohortComparison of the rows in at least one cohort.
+
+    member: cohort bitmask of each row (see membership()); columns:
+    {column: (codes, labels)} with -1 for a missing label; bmi: BMI of each
+    row (NaN when missing). The rows go through a single aggregation by
+    (bitmask, labels) into a few thousand cells at most; a row in several
+    cohorts is still aggregated once and each cohort then sums the cells
+    whose bitmask has its bit.
+    """
+    names = cohort_names(n_cohorts)
+    codes = [member.astype(np.int64)] + [c.astype(np.int64) + 1 for c, _ in columns.values()]
+    sizes = [1 << n_cohorts] + [len(labels) + 1 for _, labels in columns.values()]
+    cells, count, bmi_count, bmi_sum, bmi_min, bmi_max = _cells(codes, sizes, bmi)
+    # Ô x nhóm: ô thuộc nhóm i khi bit i của nhãn thành viên được bật
+    inside = ((cells[0][:, None] >> np.arange(n_cohorts)) & 1).astype(bool)
+
+    has_bmi = inside & (bmi_count > 0)[:, None]
+    cohort_bmi = bmi_count @ inside
+    with np.errstate(invalid='ignore', divide='ignore'):
+        summary = pd.DataFrame({
+            'count': (count @ inside).astype(np.int64),
+            'bmi_mean': np.where(cohort_bmi > 0, (bmi_sum @ inside) / cohort_bmi, np.nan),
+            'bmi_min': np.where(cohort_bmi > 0, np.where(has_bmi, bmi_min[:, None], np.inf).min(axis=0, initial=np.inf),
+                                np.nan),
+            'bmi_max': np.where(cohort_bmi > 0, np.where(has_bmi, bmi_max[:, None], -np.inf).max(axis=0, initial=-np.inf),
+                                np.nan),
+        }, index=names)
+
+    counts = {}
+    for (column, (_, labels)), label_codes, size in zip(columns.items(), cells[1:], sizes[1:]):
+        table = np.zeros((size, n_cohorts), dtype=np.int64)
+        for i in range(n_cohorts):
+            table[:, i] = np.bincount(label_codes[inside[:, i]], weights=count[inside[:, i]], minlength=size)
+        # Mã 0 là nhãn trống
+        frame = pd.DataFrame(table[1:], index=pd.Index(labels, name=column), columns=names)
+        counts[column] = frame[frame.to_numpy().any(axis=1)]
+    return CohortComparison(names, summary, counts)
+
+
+def compare_views(views, columns=COMPARE_COLUMNS):
+    """CohortComparison from one aggregate view per cohort (count_by / bmi_summary / len)"""
+    names = cohort_names(len(views))
+    rows = []
+    for view in views:
+        bmi = view.bmi_summary() if len(view) else None
+        rows.append([len(view)] + (list(bmi) if bmi is not None else [np.nan] * 3))
+    summary = pd.DataFrame(rows, index=names, columns=['count', 'bmi_mean', 'bmi_min', 'bmi_max'])
+    counts = {}
+    for column in columns:
+        if views and all(column in view.columns for view in views):
+            frame = pd.concat([view.count_by(column) for view in views], axis=1, keys=names)
+            counts[column] = frame.fillna(0).astype(np.int64).rename_axis(column)
+    return CohortComparison(names, summary, counts)
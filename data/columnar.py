@@ -0,0 +1,218 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from data.compact import widen_array
+
+MANIFEST = 'manifest.json'
+
+
+def _column_spec(name, series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return {'name': name, 'kind': 'category',
+                'categories': series.cat.categories.tolist(),
+                'ordered': bool(series.cat.ordered)}
+    if isinstance(series.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_dtype(series.dtype):
+        tz = getattr(series.dtype, 'tz', None)
+        return {'name': name, 'kind': 'datetime', 'tz': str(tz) if tz else None}
+    return {'name': name, 'kind': 'numeric'}
+
+
+def _column_values(series, spec):
+    if spec['kind'] == 'category':
+        codes = series.cat.codes.to_numpy()
+        return codes.astype(np.int8 if len(spec['categories']) < 127 else np.int16, copy=False)
+    if spec['kind'] == 'datetime':
+        # int64 ns từ epoch (UTC), NaT = giá trị min của int64
+        return series.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    return series.to_numpy()
+
+
+def save_columnar(df, directory, meta=None):
+    """Write a cleaned frame as one .npy file per column plus a JSON manifest.
+
+    Categoricals are stored as codes, timestamps as int64 epoch nanoseconds.
+    The directory is written under a temporary name and renamed when complete.
+    """
+    tmp = directory + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        spec = _column_spec(name, df[name])
+        spec['file'] = f'{i:03d}.npy'
+        np.save(os.path.join(tmp, spec['file']), _column_values(df[name], spec))
+        columns.append(spec)
+
+    manifest = dict(meta or {}, rows=len(df), columns=columns)
+    with open(os.path.join(tmp, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _frame_from_arrays(specs, arrays):
+    """Zero-copy DataFrame over encoded column arrays (codes, epoch ns, numbers)"""
+    data = {}
+    for spec in specs:
+        values = arrays[spec['name']]
+        if spec['kind'] == 'category':
+            dtype = pd.CategoricalDtype(spec['categories'], ordered=spec['ordered'])
+            data[spec['name']] = pd.Categorical.from_codes(values, dtype=dtype)
+        elif spec['kind'] == 'datetime':
+            stamps = values.view('datetime64[ns]')
+            # Múi giờ (nếu có) buộc pandas sao chép; dữ liệu sạch lưu UTC không múi giờ
+            data[spec['name']] = pd.DatetimeIndex(stamps).tz_localize('UTC').tz_convert(spec['tz']) \
+                if spec['tz'] else stamps
+        else:
+            data[spec['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def _load_array(directory, spec, rows, mmap):
+    path = os.path.join(directory, spec['file'])
+    if 'dtype' not in spec:
+        return np.load(path, mmap_mode='r' if mmap else None)
+    # File nhị phân thô (ColumnarWriter): kiểu và số dòng lấy từ manifest
+    if mmap:
+        return np.memmap(path, dtype=spec['dtype'], mode='r', shape=(rows,)) if rows else \
+            np.empty(0, dtype=spec['dtype'])
+    return np.fromfile(path, dtype=spec['dtype'])
+
+
+def load_columnar(directory, mmap=True):
+    """Frame from save_columnar() / ColumnarWriter; column arrays are memory-mapped read-only"""
+    manifest = read_manifest(directory)
+    arrays = {spec['name']: _load_array(directory, spec, manifest['rows'], mmap)
+              for spec in manifest['columns']}
+    return _frame_from_arrays(manifest['columns'], arrays)
+
+
+def _encode_chunk(spec, chunk):
+    """Column values of a later chunk encoded like the first one.
+
+    New category labels are appended to spec['categories'], so codes already
+    written keep their meaning.
+    """
+    name = spec['name']
+    if name not in chunk.columns:
+        if spec['kind'] == 'category':
+            return np.full(len(chunk), -1, dtype=np.int8)
+        if spec['kind'] == 'datetime':
+            return np.full(len(chunk), np.iinfo(np.int64).min, dtype=np.int64)
+        return np.full(len(chunk), np.nan)
+
+    column = chunk[name]
+    if spec['kind'] == 'category':
+        labels = column.astype(object)
+        known = set(spec['categories'])
+        spec['categories'] = spec['categories'] + sorted(
+            {v for v in labels.dropna().unique() if v not in known})
+        codes = pd.Index(spec['categories']).get_indexer(labels)
+        return codes.astype(np.int8 if len(spec['categories']) < 127 else np.int16)
+    if spec['kind'] == 'datetime':
+        return _column_values(pd.Series(pd.to_datetime(column)), spec)
+    return column.to_numpy()
+
+
+class ColumnarWriter:
+    """Builds a columnar store chunk by chunk, for tables larger than memory.
+
+    Each column is appended to a raw binary file, so memory use is bounded
+    by one chunk. When a later chunk needs a wider type (int -> float, more
+    categories than int8 codes hold) that column file is rewritten once.
+    close() writes the manifest and moves the directory into place.
+    """
+
+    def __init__(self, directory, meta=None):
+        self.directory = directory
+        self.meta = meta or {}
+        self.tmp = directory + '.tmp'
+        self.rows = 0
+        self.specs = None
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        os.makedirs(self.tmp)
+
+    def _path(self, spec):
+        return os.path.join(self.tmp, spec['file'])
+
+    def append(self, chunk):
+        if self.specs is None:
+            self.specs = [_column_spec(name, chunk[name]) for name in chunk.columns]
+            for i, spec in enumerate(self.specs):
+                spec['file'] = f'{i:03d}.bin'
+                spec['dtype'] = _column_values(chunk[spec['name']], spec).dtype.str
+                open(self._path(spec), 'wb').close()
+
+        for spec in self.specs:
+            values = _encode_chunk(spec, chunk)
+            dtype = np.result_type(np.dtype(spec['dtype']), values.dtype)
+            if dtype != np.dtype(spec['dtype']):
+                # Nới kiểu cho phần đã ghi (hiếm khi xảy ra); float32 giữ nguyên số thập phân
+                widen_array(np.fromfile(self._path(spec), dtype=spec['dtype']), dtype).tofile(self._path(spec))
+                spec['dtype'] = dtype.str
+            with open(self._path(spec), 'ab') as f:
+                np.ascontiguousarray(widen_array(values, dtype)).tofile(f)
+        self.rows += len(chunk)
+
+    def close(self):
+        manifest = dict(self.meta, rows=self.rows, columns=self.specs or [])
+        with open(os.path.join(self.tmp, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.replace(self.tmp, self.directory)
+
+    def abort(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+class AppendableFrame:
+    """Growable in-memory column store for append-only profile tables.
+
+    Columns are kept encoded in buffers with spare capacity (grown
+    geometrically), so appending a batch writes only the new rows and
+    frame() returns a zero-copy view of the rows so far. New category
+    labels are appended to the column's categories; existing codes never move.
+    """
+
+    def __init__(self, df, growth=1.5):
+        self.growth = growth
+        self.n = len(df)
+        self.specs = [_column_spec(name, df[name]) for name in df.columns]
+        capacity = max(int(self.n * growth), 1024)
+        self.buffers = {}
+        for spec in self.specs:
+            values = _column_values(df[spec['name']], spec)
+            buffer = np.empty(capacity, dtype=values.dtype)
+            buffer[:self.n] = values
+            self.buffers[spec['name']] = buffer
+
+    def append(self, chunk):
+        """Write a cleaned chunk after the last row"""
+        k = len(chunk)
+        for spec in self.specs:
+            name = spec['name']
+            values = _encode_chunk(spec, chunk)
+            buffer = self.buffers[name]
+            dtype = np.result_type(buffer.dtype, values.dtype)
+            if self.n + k > len(buffer) or dtype != buffer.dtype:
+                # Hết chỗ (hoặc phải nới kiểu): cấp phát lại theo cấp số nhân, hiếm khi xảy ra
+                grown = np.empty(max(len(buffer), int((self.n + k) * self.growth)), dtype=dtype)
+                grown[:self.n] = widen_array(buffer[:self.n], dtype)
+                buffer = self.buffers[name] = grown
+            buffer[self.n:self.n + k] = widen_array(values, dtype)
+        self.n += k
+
+    def frame(self):
+        return _frame_from_arrays(self.specs, {name: buffer[:self.n] for name, buffer in self.buffers.items()})
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+# Kiểu gọn của các cột số sau khi làm sạch (cột không vừa thì giữ nguyên kiểu)
+COMPACT_DTYPES = {'age': np.uint8, 'height': np.uint16, 'weight': np.uint16, 'BMI': np.float32}
+# Số chữ số có nghĩa khôi phục từ float32 (như toPrecision(7) của trình duyệt)
+FLOAT32_DIGITS = 7
+
+
+def compact_column(series, dtype):
+    """`series` as `dtype` when every value fits exactly, else unchanged.
+
+    Integer targets need whole, non-negative values without gaps. float32
+    is used only when float_values() gives every value back (measurements
+    with a handful of significant digits, e.g. BMI to one decimal); a column
+    with more precision stays float64, and FilterIndex, which compares BMI
+    bounds in the stored dtype, then compares in float64 too.
+    """
+    dtype = np.dtype(dtype)
+    if not pd.api.types.is_numeric_dtype(series) or series.dtype == dtype:
+        return series
+    values = series.to_numpy()
+    if dtype.kind == 'f':
+        values = values.astype(np.float64)
+        if not np.array_equal(widen_float32(values.astype(dtype)), values, equal_nan=True):
+            return series
+        return series.astype(dtype)
+    if series.isna().any() or not len(values):
+        return series
+    info = np.iinfo(dtype)
+    if values.min() < info.min or values.max() > info.max or not np.array_equal(values, np.round(values)):
+        return series
+    return series.astype(dtype)
+
+
+def compact_frame(df):
+    """Downcast the numeric columns of a cleaned frame in place (see COMPACT_DTYPES)"""
+    for col, dtype in COMPACT_DTYPES.items():
+        if col in df.columns:
+            df[col] = compact_column(df[col], dtype)
+    return df
+
+
+def widen_float32(values):
+    """float32 values as the float64 of their shortest decimal (FLOAT32_DIGITS significant digits),
+    e.g. float32(26.3) -> 26.3 rather than 26.299999237060547"""
+    wide = values.astype(np.float64)
+    finite = np.isfinite(wide) & (wide != 0)
+    exponent = np.zeros(len(wide))
+    exponent[finite] = FLOAT32_DIGITS - 1 - np.floor(np.log10(np.abs(wide[finite])))
+    scale = 10.0 ** exponent
+    return np.where(finite, np.round(wide * scale) / scale, wide)
+
+
+def widen_array(values, dtype):
+    """`values` as the (wider or equal) `dtype`; float32 goes through widen_float32, so
+    a float32 part of a column widened to float64 keeps its decimals (26.3, not 26.299999237060547)"""
+    dtype = np.dtype(dtype)
+    if values.dtype == np.float32 and dtype != np.float32:
+        return widen_float32(values).astype(dtype, copy=False)
+    return values.astype(dtype, copy=False)
+
+
+def float_values(series):
+    """float64 array of a numeric column; float32 columns are widened back to their decimals"""
+    values = series.to_numpy()
+    if values.dtype == np.float32:
+        return widen_float32(values)
+    return series.to_numpy(dtype=float)
+
+
+def compact_dtypes(df):
+    """'age uint8, height uint16, ...': the dtype each COMPACT_DTYPES column is stored in"""
+    return ', '.join(f'{col} {df[col].dtype}' for col in COMPACT_DTYPES if col in df.columns)
+
+
+def column_bytes(df):
+    """Bytes held by each column (deep: Python strings of object columns included)"""
+    return df.memory_usage(deep=True, index=False).to_dict()
+
+
+def bytes_per_row(df):
+    return sum(column_bytes(df).values()) / len(df) if len(df) else 0.0
@@ -0,0 +1,390 @@
+import json
+import os
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+from data.compact import float_values
+from data.filter_index import as_list
+
+# Các chiều của khối đếm (theo thứ tự lưu)
+CUBE_DIMENSIONS = ('location', 'commonDiseases', 'gender', 'age_group',
+                   'allergies', 'bmi_bucket', 'weekday', 'hour')
+# Tham số bộ lọc của update_dashboard -> chiều tương ứng
+FILTER_DIMENSIONS = {'loc': 'location', 'dis': 'commonDiseases',
+                     'gen': 'gender', 'age': 'age_group'}
+# Chiều có thứ tự sẵn (pd.cut): value_counts xếp các nhãn hòa số đếm theo thứ tự nhãn
+ORDERED_DIMENSIONS = ('age_group',)
+MEASURES = ('count', 'bmi_count', 'bmi_sum', 'bmi_min', 'bmi_max', 'first_row')
+BMI_STEP = 0.5
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def cube_labels(df, bmi_step=BMI_STEP):
+    """Label array of every cube dimension available in a cleaned profile frame"""
+    labels = {}
+    for col in ('location', 'commonDiseases', 'gender', 'age_group', 'allergies'):
+        if col in df.columns:
+            labels[col] = df[col]
+    if 'BMI' in df.columns:
+        labels['bmi_bucket'] = np.floor(float_values(df['BMI']) / bmi_step) * bmi_step
+    if 'created_weekday' in df.columns:
+        weekday = df['created_weekday'].to_numpy()
+        labels['weekday'] = np.where(weekday >= 0, np.array(WEEKDAYS, dtype=object)[weekday % 7], None)
+        labels['hour'] = np.where(weekday >= 0, df['created_hour'].to_numpy(), np.nan)
+    elif 'createdAt' in df.columns:
+        created = pd.to_datetime(df['createdAt'])
+        labels['weekday'] = created.dt.day_name()
+        labels['hour'] = created.dt.hour
+    return labels
+
+
+def _aggregate(codes, sizes, measures):
+    """Group cells by their mixed-radix key and reduce the measures"""
+    key = np.zeros(len(measures['count']), dtype=np.int64)
+    for c, size in zip(codes, sizes):
+        key = key * size + c
+
+    grouped = pd.DataFrame(measures).groupby(key, sort=True).agg({
+        'count': 'sum', 'bmi_count': 'sum', 'bmi_sum': 'sum',
+        'bmi_min': 'min', 'bmi_max': 'max', 'first_row': 'min',
+    })
+
+    keys = grouped.index.to_numpy()
+    out = []
+    for size in reversed(sizes):
+        keys, c = np.divmod(keys, size)
+        out.append(c.astype(np.int32))
+    out.reverse()
+    return out, {m: grouped[m].to_numpy() for m in MEASURES}
+
+
+def _row_measures(df, start=0):
+    bmi = float_values(df['BMI']) if 'BMI' in df.columns else np.full(len(df), np.nan)
+    has_bmi = ~np.isnan(bmi)
+    return {
+        'count': np.ones(len(df), dtype=np.int64),
+        'bmi_count': has_bmi.astype(np.int64),
+        'bmi_sum': np.where(has_bmi, bmi, 0.0),
+        'bmi_min': bmi,
+        'bmi_max': bmi,
+        # Số thứ tự dòng đầu tiên của ô: hòa số đếm thì xếp theo lần xuất hiện đầu, như value_counts
+        'first_row': np.arange(start, start + len(df), dtype=np.int64),
+    }
+
+
+def _concat(parts, dims):
+    """Stack several (codes, measures) cell sets over the same dimensions"""
+    if len(parts) == 1:
+        return parts[0]
+    codes = {d: np.concatenate([c[d] for c, _ in parts]) for d in dims}
+    measures = {m: np.concatenate([ms[m] for _, ms in parts]) for m in MEASURES}
+    return codes, measures
+
+
+def _label_key(value):
+    return None if pd.isna(value) else value
+
+
+class CountCube:
+    """Sparse count cube: one entry per occupied combination of dimension codes.
+
+    Each cell stores the row count, BMI count/sum/min/max and the number of
+    its first row, so every count chart and the stats cards can be drawn from
+    a slice without the row table.
+
+    Appended rows (add()) are kept as small delta cell sets and folded into the
+    cached rollups right away; deltas are merged into the base cells once they
+    grow past a quarter of it.
+    """
+
+    def __init__(self, dims, vocab, codes, measures, bmi_step=BMI_STEP):
+        self.dims = list(dims)
+        self.vocab = vocab
+        self.codes = codes
+        self.measures = measures
+        self.bmi_step = bmi_step
+        self._rollups = {}
+        self._deltas = []
+        self._lock = threading.RLock()
+
+        if 'bmi_bucket' in self.dims and len(self.measures['count']):
+            self.bmi_range = (float(np.nanmin(measures['bmi_min'])),
+                              float(np.nanmax(measures['bmi_max'])))
+        else:
+            self.bmi_range = None
+
+    @classmethod
+    def from_frame(cls, df, bmi_step=BMI_STEP):
+        labels = cube_labels(df, bmi_step)
+        dims = [d for d in CUBE_DIMENSIONS if d in labels]
+
+        vocab, codes = {}, []
+        for d in dims:
+            c, uniques = pd.factorize(labels[d], sort=True, use_na_sentinel=False)
+            vocab[d] = np.asarray(uniques, dtype=object)
+            codes.append(c)
+
+        cell_codes, cell_measures = _aggregate(codes, [len(vocab[d]) for d in dims], _row_measures(df))
+        return cls(dims, vocab, dict(zip(dims, cell_codes)), cell_measures, bmi_step)
+
+    def _sizes(self, dims):
+        return [len(self.vocab[d]) for d in dims]
+
+    def add(self, df):
+        """Fold appended (cleaned) rows into the cube without rebuilding it"""
+        with self._lock:
+            start = len(self)
+            labels = cube_labels(df, self.bmi_step)
+            codes = []
+            for d in self.dims:
+                c, uniques = pd.factorize(labels[d], use_na_sentinel=False)
+                lookup = {_label_key(v): i for i, v in enumerate(self.vocab[d])}
+                new = [u for u in uniques if _label_key(u) not in lookup]
+                if new:
+                    # Nhãn mới nối vào cuối từ điển, mã cũ giữ nguyên
+                    for u in new:
+                        lookup[_label_key(u)] = len(lookup)
+                    self.vocab[d] = np.concatenate([self.vocab[d], np.asarray(new, dtype=object)])
+                codes.append(np.array([lookup[_label_key(u)] for u in uniques], dtype=np.int64)[c])
+
+            cell_codes, cell_measures = _aggregate(codes, self._sizes(self.dims), _row_measures(df, start))
+            delta = (dict(zip(self.dims, cell_codes)), cell_measures)
+
+            # Cập nhật tại chỗ các rollup đã tính (nhỏ, theo số nhãn)
+            for dims, cached in list(self._rollups.items()):
+                projected = _aggregate([delta[0][d] for d in dims], self._sizes(dims), delta[1])
+                merged = _concat([cached, (dict(zip(dims, projected[0])), projected[1])], dims)
+                out_codes, out_measures = _aggregate([merged[0][d] for d in dims], self._sizes(dims), merged[1])
+                self._rollups[dims] = (dict(zip(dims, out_codes)), out_measures)
+
+            self._deltas.append(delta)
+            if sum(len(m['count']) for _, m in self._deltas) > self.n_cells_base // 4:
+                self._compact()
+
+            if 'bmi_bucket' in self.dims and np.any(cell_measures['bmi_count']):
+                lo = float(np.nanmin(cell_measures['bmi_min']))
+                hi = float(np.nanmax(cell_measures['bmi_max']))
+                self.bmi_range = (lo, hi) if self.bmi_range is None else \
+                    (min(lo, self.bmi_range[0]), max(hi, self.bmi_range[1]))
+
+    def _compact(self):
+        """Merge delta cells into the base cells"""
+        if not self._deltas:
+            return
+        codes, measures = _concat([(self.codes, self.measures)] + self._deltas, self.dims)
+        out_codes, out_measures = _aggregate([codes[d] for d in self.dims], self._sizes(self.dims), measures)
+        self.codes, self.measures = dict(zip(self.dims, out_codes)), out_measures
+        self._deltas = []
+
+    def __len__(self):
+        return int(self.measures['count'].sum()) + sum(int(m['count'].sum()) for _, m in self._deltas)
+
+    @property
+    def n_cells_base(self):
+        return len(self.measures['count'])
+
+    @property
+    def n_cells(self):
+        self._compact()
+        return len(self.measures['count'])
+
+    @property
+    def columns(self):
+        return self.dims + (['BMI'] if 'bmi_bucket' in self.dims else [])
+
+    def labels(self, dim):
+        """Observed labels of a dimension (without missing values)"""
+        return [v for v in self.vocab[dim] if not pd.isna(v)]
+
+    def bmi_summary(self):
+        return self.slice().bmi_summary()
+
+    def rollup(self, dims):
+        """Cube summed over every dimension not in `dims` (cached per dimension set)"""
+        dims = tuple(d for d in self.dims if d in dims)
+        with self._lock:
+            if dims == tuple(self.dims):
+                self._compact()
+                return self.codes, self.measures
+            if dims not in self._rollups:
+                # Gộp từ rollup nhỏ nhất đã có chứa đủ các chiều, không phải từ toàn bộ ô
+                parents = [(len(m['count']), key) for key, (_, m) in self._rollups.items() if set(dims) <= set(key)]
+                if parents:
+                    codes, measures = self._rollups[min(parents)[1]]
+                else:
+                    codes, measures = _concat([(self.codes, self.measures)] + self._deltas, self.dims)
+                codes, measures = _aggregate([codes[d] for d in dims], self._sizes(dims), measures)
+                self._rollups[dims] = (dict(zip(dims, codes)), measures)
+            return self._rollups[dims]
+
+    def bmi_buckets(self, bmi_range, whole=False):
+        """Codes of the BMI buckets overlapping bmi_range (whole=True: only those lying wholly inside)"""
+        lo, hi = bmi_range
+        edges = self.vocab['bmi_bucket'].astype(float)
+        if whole:
+            keep = (edges >= lo) & (edges + self.bmi_step <= hi)
+        else:
+            keep = (edges + self.bmi_step > lo) & (edges <= hi)
+        return np.flatnonzero(keep).astype(np.int32)
+
+    def bmi_remainder(self, bmi_range):
+        """Parts of bmi_range outside the whole buckets, as (lo, hi, closed) with lo <= BMI < hi (<= if closed)"""
+        lo, hi = bmi_range
+        whole = self.bmi_buckets(bmi_range, whole=True)
+        if not len(whole):
+            return [(lo, hi, True)]
+        edges = self.vocab['bmi_bucket'][whole].astype(float)
+        return [(lo, edges.min(), False), (edges.max() + self.bmi_step, hi, True)]
+
+    def slice(self, loc=None, dis=None, gen=None, age=None, bmi_range=None, whole_buckets=False):
+        """View of the cube restricted to a filter state (same arguments as FilterIndex).
+
+        With whole_buckets=True a BMI range keeps only the buckets wholly inside
+        it, so the view is exact for the rows it covers; bmi_remainder() gives
+        the rest of the range.
+        """
+        selection = {}
+        for arg, values in (('loc', loc), ('dis', dis), ('gen', gen), ('age', age)):
+            dim = FILTER_DIMENSIONS[arg]
+            values = as_list(values)
+            if values and dim in self.dims:
+                lookup = {v: i for i, v in enumerate(self.vocab[dim])}
+                selection[dim] = np.array([lookup[v] for v in values if v in lookup], dtype=np.int32)
+
+        exact = True
+        if bmi_range and self.bmi_range is not None:
+            lo, hi = bmi_range
+            if lo > self.bmi_range[0] or hi < self.bmi_range[1]:
+                # Lọc theo ô BMI: chính xác tới bước bmi_step
+                selection['bmi_bucket'] = self.bmi_buckets(bmi_range, whole=whole_buckets)
+                exact = whole_buckets
+        return CubeView(self, selection, exact)
+
+    def save(self, path, meta=None):
+        """Write to a compressed .npz file, or to a directory of .npy arrays
+        (anything not ending in .npz) that load() can memory-map"""
+        self._compact()
+        meta = dict(meta or {}, dims=self.dims, bmi_step=self.bmi_step,
+                    vocab={d: [None if pd.isna(v) else (v.item() if hasattr(v, 'item') else v)
+                               for v in self.vocab[d]] for d in self.dims})
+        arrays = {f'code_{d}': self.codes[d] for d in self.dims}
+        arrays.update({f'measure_{m}': self.measures[m] for m in MEASURES})
+        if path.endswith('.npz'):
+            np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+            return
+
+        tmp = path + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp, f'{name}.npy'), values)
+        with open(os.path.join(tmp, 'cube.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def read_meta(path):
+        """Metadata of a cube directory written by save(), None if missing"""
+        try:
+            with open(os.path.join(path, 'cube.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        if path.endswith('.npz'):
+            with np.load(path) as data:
+                meta = json.loads(str(data['meta']))
+                arrays = {name: data[name] for name in data.files if name != 'meta'}
+        else:
+            # Thư mục .npy: ánh xạ chỉ đọc, các tiến trình dùng chung một bản
+            meta = cls.read_meta(path)
+            arrays = {name[:-4]: np.load(os.path.join(path, name), mmap_mode='r' if mmap else None)
+                      for name in os.listdir(path) if name.endswith('.npy')}
+        dims = meta['dims']
+        vocab = {d: np.array([np.nan if v is None else v for v in meta['vocab'][d]], dtype=object)
+                 for d in dims}
+        codes = {d: arrays[f'code_{d}'] for d in dims}
+        measures = {m: arrays[f'measure_{m}'] for m in MEASURES if f'measure_{m}' in arrays}
+        if 'first_row' not in measures:
+            # Khối lưu trước khi có first_row: hòa số đếm thì theo thứ tự nhãn
+            measures['first_row'] = np.zeros(len(measures['count']), dtype=np.int64)
+        return cls(dims, vocab, codes, measures, meta['bmi_step'])
+
+
+class CubeView:
+    """A filtered slice of a CountCube. Charts read it through count_by(),
+    so the work depends on the number of categories, not on the number of rows.
+    """
+
+    def __init__(self, cube, selection, exact=True):
+        self.cube = cube
+        self.selection = selection
+        self.exact = exact
+
+    def _cells(self, dims):
+        codes, measures = self.cube.rollup(set(dims) | set(self.selection))
+        mask = np.ones(len(measures['count']), dtype=bool)
+        for dim, allowed in self.selection.items():
+            mask &= np.isin(codes[dim], allowed)
+        return codes, measures, mask
+
+    @property
+    def columns(self):
+        return self.cube.columns
+
+    @property
+    def bmi_step(self):
+        return self.cube.bmi_step
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def __len__(self):
+        _, measures, mask = self._cells(())
+        return int(measures['count'][mask].sum())
+
+    def count_by(self, *columns):
+        """Non-zero counts per label (combination), largest first like value_counts:
+        equal counts keep the order in which the labels first appear in the slice
+        (label order for ORDERED_DIMENSIONS)"""
+        codes, measures, mask = self._cells(columns)
+        if len(columns) == 1:
+            # Một chiều: cộng theo mã bằng bincount, dòng đầu tiên của mỗi nhãn bằng minimum.at
+            vocab = self.cube.vocab[columns[0]]
+            label_codes = codes[columns[0]][mask]
+            sums = np.bincount(label_codes, weights=measures['count'][mask],
+                               minlength=len(vocab)).astype(measures['count'].dtype)
+            first = np.full(len(vocab), np.iinfo(np.int64).max)
+            if columns[0] in ORDERED_DIMENSIONS:
+                first = np.arange(len(vocab))
+            else:
+                np.minimum.at(first, label_codes, measures['first_row'][mask])
+            order = np.lexsort((first, -sums))
+            order = order[(sums[order] > 0) & ~pd.isna(vocab[order])]
+            return pd.Series(sums[order], index=pd.Index(vocab[order], name=columns[0]), name='count')
+
+        cells = pd.DataFrame({c: codes[c][mask] for c in columns})
+        cells['count'] = measures['count'][mask]
+
+        grouped = cells.groupby(list(columns), sort=True).agg({'count': 'sum'})
+        grouped = grouped[grouped['count'] > 0]
+
+        labels = [self.cube.vocab[c][grouped.index.get_level_values(c)] for c in columns]
+        index = pd.MultiIndex.from_arrays(labels, names=list(columns))
+        keep = ~np.any([pd.isna(label) for label in labels], axis=0)
+        return pd.Series(grouped['count'].to_numpy(), index=index, name='count')[keep]
+
+    def bmi_summary(self):
+        """(mean, min, max) of BMI over the slice"""
+        _, measures, mask = self._cells(())
+        n = measures['bmi_count'][mask].sum()
+        if n == 0:
+            return None
+        return (measures['bmi_sum'][mask].sum() / n,
+                np.nanmin(measures['bmi_min'][mask]),
+                np.nanmax(measures['bmi_max'][mask]))
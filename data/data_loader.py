@@ -1,16 +1,178 @@
 import pandas as pd
 import os
+import time
+from data.compact import compact_frame
+from data.cube import CountCube
+from data.columnar import ColumnarWriter, save_columnar, load_columnar, read_manifest
 
-def load_and_clean_data(file_name):
+try:
+    import resource
+except ImportError:  # Windows: không đo được peak RSS
+    resource = None
+
+# Tăng khi thay đổi cách làm sạch / các cột lưu trong bản cache cột
+SCHEMA_VERSION = 5
+
+AGE_BINS = [0, 18, 31, 46, 61, 150]
+AGE_LABELS = ['Dưới 18', '18-30', '31-45', '46-60', 'Trên 60']
+CATEGORY_COLUMNS = ['gender', 'location', 'commonDiseases', 'allergies']
+TIMESTAMP_COLUMNS = ['createdAt', 'lastLoginAt']
+# Cột tính ra khi làm sạch (không có trong dữ liệu gốc, không lưu vào MongoDB / file xuất)
+DERIVED_COLUMNS = ('age_group', 'created_weekday', 'created_hour')
+# Số dòng mỗi lần đọc khi nạp theo luồng (bộ nhớ đỉnh tỉ lệ với giá trị này)
+DEFAULT_CHUNK_ROWS = 200_000
+
+def data_path(file_name):
     base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    path = os.path.join(base_path, 'data', file_name)
-    df = pd.read_csv(path)
+    return os.path.join(base_path, 'data', file_name)
+
+def clean_profiles(df):
+    """Làm sạch khung hồ sơ thô: sửa dấu phẩy BMI, nhóm tuổi, mã hóa danh mục, thời gian, kiểu số gọn"""
+    if not pd.api.types.is_numeric_dtype(df['BMI']):
+        df['BMI'] = df['BMI'].astype(str).str.replace(',', '.').astype(float)
+
+    df['age_group'] = pd.cut(df['age'], bins=AGE_BINS, labels=AGE_LABELS, right=False)
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    # Thời gian quy về UTC và bỏ múi giờ: cột datetime64[ns] thuần, không phải sao chép khi ánh xạ
+    for col in TIMESTAMP_COLUMNS:
+        if col in df.columns:
+            stamps = pd.to_datetime(df[col], utc=True, format='ISO8601', errors='coerce')
+            df[col] = stamps.dt.tz_convert(None).dt.as_unit('ns')
+
+    # Thứ/giờ đăng ký tính sẵn cho biểu đồ nhiệt (-1 = không có thời gian)
+    if 'createdAt' in df.columns:
+        df['created_weekday'] = df['createdAt'].dt.weekday.fillna(-1).astype('int8')
+        df['created_hour'] = df['createdAt'].dt.hour.fillna(-1).astype('int8')
+
+    # Tuổi / chiều cao / cân nặng uint8/uint16, BMI float32 (data/compact.py)
+    return compact_frame(df)
+
+def _sidecar_path(path, kind='columns'):
+    return os.path.splitext(path)[0] + '.' + kind
+
+def source_stamp(path):
+    """Identity of a CSV export + cleaning code; sidecars built from it store this stamp"""
+    stat = os.stat(path)
+    return {'schema_version': SCHEMA_VERSION, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, in MB (None if unknown)"""
+    try:
+        # Linux: VmHWM của chính tiến trình (ru_maxrss còn giữ giá trị của tiến trình cha qua exec)
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def memory_report():
+    """Resident memory of this process in MB: rss = private (anon) + file-backed pages.
+
+    File-backed pages include memory-mapped sidecars, which every worker
+    mapping the same files shares; pss splits those between the processes.
+    Empty dict where /proc is not available.
+    """
+    report = {}
+    fields = {'VmRSS:': 'rss', 'RssAnon:': 'anon', 'RssFile:': 'file', 'Pss:': 'pss'}
+    for name in ('/proc/self/status', '/proc/self/smaps_rollup'):
+        try:
+            with open(name) as f:
+                for line in f:
+                    key = line.split(':', 1)[0] + ':'
+                    if key in fields:
+                        report[fields[key]] = int(line.split()[1]) / 1024
+        except OSError:
+            pass
+    return report
+
+def iter_clean_chunks(file_name, chunksize=DEFAULT_CHUNK_ROWS):
+    """Cleaned frames of at most `chunksize` rows, read one at a time"""
+    for chunk in pd.read_csv(data_path(file_name), chunksize=chunksize):
+        yield clean_profiles(chunk)
+
+def _stream(file_name, sink, chunksize):
+    """Feed cleaned chunks to `sink`; returns rows, rows/s and peak RSS"""
+    start = time.perf_counter()
+    rows = 0
+    for chunk in iter_clean_chunks(file_name, chunksize):
+        sink(chunk)
+        rows += len(chunk)
+    seconds = time.perf_counter() - start
+    return {'rows': rows, 'seconds': seconds, 'rows_per_sec': rows / seconds if seconds else 0.0,
+            'peak_rss_mb': peak_rss_mb()}
+
+def stream_to_columnar(file_name, directory, chunksize=DEFAULT_CHUNK_ROWS, meta=None):
+    """Clean a CSV chunk by chunk into a columnar store; returns ingest stats"""
+    writer = ColumnarWriter(directory, meta)
+    try:
+        stats = _stream(file_name, writer.append, chunksize)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return stats
+
+def load_and_clean_data(file_name, use_cache=True, chunksize=None):
+    """Cleaned profiles from a CSV export.
+
+    After the first clean a columnar copy is written next to the CSV; later
+    starts memory-map it as long as the CSV mtime/size and SCHEMA_VERSION match.
+    With `chunksize` the CSV is cleaned in chunks straight into that copy, so
+    files larger than memory can be served (the sidecar must be writable).
+    """
+    path = data_path(file_name)
+    source = source_stamp(path)
+    sidecar = _sidecar_path(path)
+
+    if use_cache:
+        manifest = read_manifest(sidecar)
+        if manifest is not None and manifest.get('source') == source:
+            return load_columnar(sidecar)
+
+    if chunksize:
+        stream_to_columnar(file_name, sidecar, chunksize, {'source': source})
+        return load_columnar(sidecar)
+
+    df = clean_profiles(pd.read_csv(path))
+
+    if use_cache:
+        try:
+            save_columnar(df, sidecar, {'source': source})
+        except OSError:
+            # Thư mục dữ liệu chỉ đọc: vẫn chạy, lần sau làm sạch lại
+            pass
+
+    return df
+
+
+def load_count_cube(file_name, chunksize=None):
+    """Count cube for aggregate-only deployments.
+
+    A saved cube (.npz) is loaded as is, otherwise the CSV is cleaned and
+    aggregated once; the row table is not kept. With `chunksize` the CSV is
+    aggregated chunk by chunk and never held in memory as a whole.
+    """
+    if file_name.endswith('.npz'):
+        return CountCube.load(data_path(file_name))
+    if not chunksize:
+        return CountCube.from_frame(load_and_clean_data(file_name))
 
-    if df['BMI'].dtype == 'object':
-        df['BMI'] = df['BMI'].str.replace(',', '.').astype(float)
+    cube = None
 
-    bins = [0, 18, 31, 46, 61, 150]
-    labels = ['Dưới 18', '18-30', '31-45', '46-60', 'Trên 60']
-    df['age_group'] = pd.cut(df['age'], bins=bins, labels=labels, right=False)
+    def add(chunk):
+        nonlocal cube
+        if cube is None:
+            cube = CountCube.from_frame(chunk)
+        else:
+            cube.add(chunk)
 
-    return df
\ No newline at end of file
+    _stream(file_name, add, chunksize)
+    return cube
@@ -0,0 +1,344 @@
+import threading
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+from data.columnar import AppendableFrame, load_columnar, read_manifest
+from data.data_loader import data_path, load_and_clean_data, source_stamp, _sidecar_path
+from data.filter_index import FilterIndex, as_list
+from data.cohorts import COMPARE_COLUMNS, compare_codes, membership
+from data.cube import CountCube, FILTER_DIMENSIONS
+from data.sample import SampleView, StratifiedSample, sample_timeline, stratified_total
+from data.time_index import TIME_SERIES, TimeIndex
+from data.sources import DataSource
+
+try:
+    import fcntl
+except ImportError:  # Windows: không khóa, các tiến trình có thể dựng trùng
+    fcntl = None
+
+
+def _codes(series):
+    """(codes, labels) of a column; categorical columns without a copy"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, labels = pd.factorize(series)
+    return codes, pd.Index(labels)
+
+
+def _chunks(df, positions, chunk_rows):
+    """Slices of `df` (or of its rows at `positions`); an empty frame still yields its columns"""
+    n = len(df) if positions is None else len(positions)
+    if n == 0:
+        yield df.iloc[:0]
+    for start in range(0, n, chunk_rows):
+        if positions is None:
+            yield df.iloc[start:start + chunk_rows]
+        else:
+            yield df.take(positions[start:start + chunk_rows])
+
+
+@contextmanager
+def _build_lock(path):
+    """Exclusive lock so only one worker process builds the sidecars"""
+    try:
+        f = open(path, 'a')
+    except OSError:
+        f = None
+    if fcntl is None or f is None:
+        yield
+        return
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class ProfileDataset(DataSource):
+    """Cleaned profiles (CSV / pandas) together with the structures built from them at load time.
+
+    `version` increases on every (re)load or append and listeners registered
+    with on_change() are called, e.g. to invalidate result caches.
+    """
+
+    def __init__(self, df, index=None, cube=None, time_index=None):
+        self.version = 0
+        self._listeners = []
+        self._lock = threading.RLock()
+        self.load(df, index, cube, time_index)
+
+    @classmethod
+    def open(cls, file_name, chunksize=None):
+        """Dataset of a CSV export with table, filter index, count cube and time index memory-mapped.
+
+        All four are built once into sidecars next to the CSV (under a file
+        lock) and mapped read-only, so every worker process serving the file
+        shares the same pages instead of holding its own copy.
+        """
+        path = data_path(file_name)
+        with _build_lock(_sidecar_path(path, 'lock')):
+            df = load_and_clean_data(file_name, chunksize=chunksize)
+            source = source_stamp(path)
+            index = _open_sidecar(FilterIndex, _sidecar_path(path, 'index'), source,
+                                  lambda: FilterIndex(df), FilterIndex.read_info)
+            cube = _open_sidecar(CountCube, _sidecar_path(path, 'cube'), source,
+                                 lambda: CountCube.from_frame(df), CountCube.read_meta)
+            time_index = _open_sidecar(TimeIndex, _sidecar_path(path, 'time'), source,
+                                       lambda: TimeIndex(df), TimeIndex.read_info)
+            manifest = read_manifest(_sidecar_path(path))
+            if manifest is not None and manifest.get('source') == source:
+                # Lần làm sạch đầu tiên trả bảng trong RAM: dùng bản ánh xạ để chia sẻ trang
+                df = load_columnar(_sidecar_path(path))
+        return cls(df, index, cube, time_index)
+
+    def _changed(self):
+        self.version += 1
+        for listener in self._listeners:
+            listener(self)
+
+    def load(self, df, index=None, cube=None, time_index=None):
+        with self._lock:
+            if isinstance(df, CountCube):
+                # Chỉ có dữ liệu tổng hợp, không có bảng từng hồ sơ
+                self.df, self.index, self.cube, self.time_index = None, None, df, None
+                self.sample = None
+            else:
+                # Các index và khối đếm dựng một lần khi nạp dữ liệu (hoặc nạp sẵn từ đĩa)
+                self.df = df
+                self.index = index if index is not None else FilterIndex(df)
+                self.cube = cube if cube is not None else CountCube.from_frame(df)
+                self.time_index = time_index if time_index is not None else TimeIndex(df)
+                # Mẫu phân tầng cho kết quả gần đúng (chế độ hiển thị dần), dựng lại mỗi lần nạp
+                self.sample = StratifiedSample(df)
+            self._table = None
+            self._sample_data = None
+            self._changed()
+
+    def append(self, chunk):
+        """Add cleaned rows in place: table buffers, filter index and count cube.
+
+        The existing rows are neither reloaded nor copied (buffers grow
+        geometrically); frames handed out before stay valid.
+        """
+        if len(chunk) == 0:
+            return
+        with self._lock:
+            if self.df is not None:
+                if self._table is None:
+                    self._table = AppendableFrame(self.df)
+                self._table.append(chunk)
+                self.index.extend(chunk)
+                self.time_index.extend(chunk)
+                self.sample.extend(chunk)
+            self.cube.add(chunk)
+            if self._table is not None:
+                self.df = self._table.frame()
+            self._changed()
+
+    def on_change(self, listener):
+        self._listeners.append(listener)
+
+    def _days(self, created_range):
+        """created_range as inclusive day numbers, None when it covers every registration"""
+        bounds = self.created_range
+        if not created_range or bounds is None:
+            return None
+        lo, hi = int(created_range[0]), int(created_range[1])
+        if lo <= bounds[0] and hi >= bounds[1]:
+            return None
+        return lo, hi
+
+    def select(self, created_range=None, **filters):
+        """Row positions from the filter index, narrowed to a registration-day range by the time index"""
+        if self.index is None:
+            return None
+        with self._lock:
+            positions = self.index.select(**filters)
+            days = self._days(created_range)
+            if days is None:
+                return positions
+            if positions is None:
+                # Chỉ lọc theo ngày: tìm nhị phân trên các ngày đã sắp xếp
+                return self.time_index.positions(*days)
+            return positions[self.time_index.contains(positions, *days)]
+
+    def query(self, selection, created_range=None, **filters):
+        with self._lock:
+            df = self.df
+            # Biểu đồ đếm đọc từ khối đếm, biểu đồ từng điểm đọc từ dòng
+            view = self.cube.slice(**filters)
+            by_day = self._days(created_range) is not None
+        if df is None:
+            return view, view
+        dff = df if selection is None else df.take(selection)
+        # Khoảng BMI lệch bước ô hoặc lọc theo ngày (khối đếm không có chiều ngày): đếm trên dòng
+        return dff, (view if view.exact and not by_day else dff)
+
+    def timeline(self, created_range=None, **filters):
+        """Registrations and last logins per day / week / month over the created_range window,
+        under the other filters: precomputed totals when none is active, else the filtered rows"""
+        with self._lock:
+            if self.time_index is None:
+                return None
+            # Thanh trượt ở hết khoảng: toàn bộ thời gian có dữ liệu (cả lần đăng nhập sau lần đăng ký cuối)
+            window = self._days(created_range) or self.time_index.day_range
+            if window is None:
+                return None
+            positions = self.index.select(**filters)
+            return self.time_index.timeline(int(window[0]), int(window[1]), positions)
+
+    def _sample(self):
+        """(sampled rows as a dataset, weights, stratum, stratum sizes) for the current version"""
+        with self._lock:
+            data = self._sample_data
+            if data is None or data[0] != self.version:
+                sample = self.sample
+                data = self._sample_data = (self.version, ProfileDataset(self.df.take(sample.positions)),
+                                            sample.weights(), sample.stratum, sample.sizes)
+            return data[1:]
+
+    def estimate(self, created_range=None, **filters):
+        """Approximate counts of a filter state (SampleView) from the stratified sample:
+        the same filters run on the sampled rows, each weighted by its stratum"""
+        if self.sample is None:
+            return None
+        sample, weights, stratum, sizes = self._sample()
+        selected = sample.select(created_range=created_range, **filters)
+        if selected is None:
+            selected = np.arange(len(weights))
+        total, error = stratified_total(stratum, sizes, selected)
+        return SampleView(sample.df.take(selected), weights[selected], total, error, self.cube.bmi_step)
+
+    def estimate_timeline(self, created_range=None, **filters):
+        """Approximate timeline() from the stratified sample"""
+        if self.sample is None:
+            return None
+        with self._lock:
+            window = self._days(created_range) or self.time_index.day_range
+        if window is None:
+            return None
+        sample, weights, _, _ = self._sample()
+        selected = sample.select(**filters)
+        if selected is None:
+            selected = np.arange(len(weights))
+        # Số ngày của các dòng mẫu đã có trong time index của mẫu
+        days = {col: sample.time_index.days(col)[selected] for col in TIME_SERIES
+                if sample.time_index.days(col) is not None}
+        return sample_timeline(days, weights[selected], int(window[0]), int(window[1]))
+
+    def iter_rows(self, chunk_rows, **filters):
+        """Filtered rows in order, `chunk_rows` at a time, from the table as it is now.
+
+        Only the selected positions are kept; each chunk is gathered when it
+        is asked for, and appended rows do not affect a running iteration.
+        """
+        with self._lock:
+            df = self.df
+            positions = self.select(**filters) if df is not None else None
+        if df is None:
+            return None
+        return _chunks(df, positions, chunk_rows)
+
+    def compare(self, cohorts, columns=COMPARE_COLUMNS):
+        """Cohorts side by side in one pass over their rows.
+
+        Each cohort is selected through the indexes, then every row is
+        labelled with a cohort bitmask and the rows in any cohort are
+        aggregated once (data/cohorts.compare_codes): the work on rows does
+        not grow with the number of cohorts a row belongs to.
+        """
+        with self._lock:
+            df = self.df
+            if df is None:
+                return super().compare(cohorts, columns)
+            member = membership([self.select(**filters) for filters in cohorts], len(df))
+        rows = np.flatnonzero(member)
+        labels = {}
+        for col in columns:
+            if col in df.columns:
+                codes, values = _codes(df[col])
+                labels[col] = (codes[rows], values)
+        bmi = df['BMI'].to_numpy()[rows] if 'BMI' in df.columns else np.full(len(rows), np.nan)
+        return compare_codes(member[rows], labels, bmi, len(cohorts))
+
+    @property
+    def created_range(self):
+        return None if self.time_index is None else self.time_index.created_range
+
+    def facet_counts(self, loc=None, dis=None, gen=None, age=None, bmi_range=None, created_range=None):
+        """Counts per dropdown option under the other active filters, from the count cube.
+
+        The cube is exact for whole BMI buckets; when the BMI range cuts into
+        a bucket, the rows in the cut edge buckets are found through the
+        sorted BMI array and counted directly, so the cost follows the number
+        of cells and edge rows, not the table size. The cube has no date
+        dimension: with a registration-date range the rows in it are counted.
+        """
+        filters = dict(loc=loc, dis=dis, gen=gen, age=age, bmi_range=bmi_range)
+        result = {}
+        with self._lock:
+            by_day = self.df is not None and self._days(created_range) is not None
+            # Rollup theo mọi chiều lọc: các rollup của từng facet gộp từ nó (nhỏ hơn khối đầy đủ)
+            self.cube.rollup(set(FILTER_DIMENSIONS.values()) | {'bmi_bucket'})
+            for name, column in FILTER_DIMENSIONS.items():
+                others = dict(filters, **{name: None})
+                if by_day:
+                    counts = self._row_counts(column, self.select(created_range=created_range, **others), {})
+                    result[name] = counts[counts > 0].sort_values(ascending=False, kind='stable')
+                    continue
+                view = self.cube.slice(**others, whole_buckets=self.df is not None)
+                counts = view.count_by(column)
+                if self.df is not None and 'bmi_bucket' in view.selection:
+                    edge = np.concatenate([self.index.bmi_positions(*part)
+                                           for part in self.cube.bmi_remainder(bmi_range)])
+                    counts = counts.add(self._row_counts(column, edge, others), fill_value=0)
+                result[name] = counts[counts > 0].astype(np.int64).sort_values(ascending=False, kind='stable')
+        return result
+
+    def _row_counts(self, column, positions, filters):
+        """Counts per label of `column` over the given rows that pass the category filters"""
+        keep = np.ones(len(positions), dtype=bool)
+        for name, other in FILTER_DIMENSIONS.items():
+            values = as_list(filters.get(name))
+            if values and other in self.df.columns:
+                codes, labels = _codes(self.df[other])
+                allowed = np.zeros(len(labels) + 1, dtype=bool)
+                allowed[labels.get_indexer([v for v in values if v in labels])] = True
+                keep &= allowed[codes[positions]]
+        codes, labels = _codes(self.df[column])
+        selected = codes[positions[keep]]
+        counts = np.bincount(selected[selected >= 0], minlength=len(labels))
+        return pd.Series(counts, index=labels)
+
+    def labels(self, dim):
+        if self.df is None:
+            return self.cube.labels(dim)
+        return list(self.df[dim].dropna().unique())
+
+    def bmi_summary(self):
+        return self.cube.bmi_summary()
+
+    @property
+    def bmi_range(self):
+        return self.cube.bmi_range
+
+    @property
+    def columns(self):
+        return list(self.df.columns) if self.df is not None else self.cube.columns
+
+    def __len__(self):
+        return len(self.cube)
+
+
+def _open_sidecar(kind, directory, source, build, read_meta):
+    """Memory-map a saved FilterIndex / CountCube, (re)building it when the CSV changed"""
+    meta = read_meta(directory)
+    if meta is None or meta.get('source') != source:
+        built = build()
+        try:
+            built.save(directory, {'source': source})
+        except OSError:
+            # Thư mục dữ liệu chỉ đọc: dùng bản trong bộ nhớ
+            return built
+    return kind.load(directory)
@@ -0,0 +1,232 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from data.compact import widen_array
+
+# Các cột lọc theo giá trị (dropdown) - mỗi giá trị có một bitmap riêng
+INDEXED_COLUMNS = ('location', 'commonDiseases', 'gender', 'age_group')
+
+
+def as_list(value):
+    """Dropdown values come back as a list (multi) or a single string"""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set, np.ndarray)):
+        return list(value)
+    return [value]
+
+
+def _json_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _set_bits(bitmap, positions):
+    """Set bit `positions` of a packed (big-endian, like np.packbits) bitmap"""
+    np.bitwise_or.at(bitmap, positions >> 3, (0x80 >> (positions & 7)).astype(np.uint8))
+
+
+class FilterIndex:
+    """Prebuilt filter index: one packed bitmap per categorical value plus a
+    sorted BMI array, so a filter change is a few bitmask ORs/ANDs and one take.
+
+    Appended rows are indexed in place by extend(): bitmaps keep spare
+    capacity and new BMI values form an unsorted tail that is merged into the
+    sorted array once it grows past a fraction of it.
+
+    save() / load() keep the arrays on disk; a loaded index memory-maps them
+    read-only, so processes serving the same file share one copy.
+    """
+
+    def __init__(self, df):
+        self.shared = False
+        self.n = len(df)
+        self.nbytes = (self.n + 7) // 8
+        self.bitmaps = {}
+        for col in INDEXED_COLUMNS:
+            if col not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[col])
+            self.bitmaps[col] = {
+                value: np.packbits(codes == i) for i, value in enumerate(uniques)
+            }
+
+        if 'BMI' in df.columns:
+            # BMI giữ kiểu lưu của bảng (float32 ở bảng gọn); cận lọc được so ở cùng độ chính xác
+            values = df['BMI'].to_numpy()
+            self._bmi = values.astype(values.dtype if values.dtype == np.float32 else float)
+            self._sort_bmi()
+        else:
+            self._bmi = None
+
+    @property
+    def bmi(self):
+        return None if self._bmi is None else self._bmi[:self.n]
+
+    def _sort_bmi(self):
+        self.n_sorted = self.n
+        self.bmi_order = np.argsort(self.bmi, kind='stable')
+        self.bmi_sorted = self.bmi[self.bmi_order]
+
+    def _empty_bitmap(self):
+        return np.zeros(self.nbytes, dtype=np.uint8)
+
+    def extend(self, chunk):
+        """Index rows appended after the current last row"""
+        start, k = self.n, len(chunk)
+        needed = (start + k + 7) // 8
+        if needed > self.nbytes or self.shared:
+            # Nới bitmap theo cấp số nhân để các lần nối sau không phải cấp phát lại
+            self.nbytes = max(needed, int(self.nbytes * 1.5))
+            for bitmaps in self.bitmaps.values():
+                for value, bitmap in bitmaps.items():
+                    grown = self._empty_bitmap()
+                    grown[:len(bitmap)] = bitmap
+                    bitmaps[value] = grown
+
+        for col, bitmaps in self.bitmaps.items():
+            if col not in chunk.columns:
+                continue
+            codes, uniques = pd.factorize(chunk[col])
+            for i, value in enumerate(uniques):
+                if value not in bitmaps:
+                    bitmaps[value] = self._empty_bitmap()
+                _set_bits(bitmaps[value], start + np.flatnonzero(codes == i))
+
+        if self._bmi is not None:
+            values = chunk['BMI'].to_numpy() if 'BMI' in chunk.columns else np.full(k, np.nan, dtype=self._bmi.dtype)
+            if values.dtype != np.float32:
+                values = values.astype(float)
+            dtype = np.result_type(self._bmi.dtype, values.dtype)
+            if start + k > len(self._bmi) or self.shared or dtype != self._bmi.dtype:
+                grown = np.empty(max(len(self._bmi), int((start + k) * 1.5)), dtype=dtype)
+                grown[:start] = widen_array(self._bmi[:start], dtype)
+                self._bmi = grown
+                # Khối float64 sau các dòng float32: cả mảng đã sắp cũng nới (thứ tự không đổi)
+                self.bmi_sorted = widen_array(self.bmi_sorted, dtype)
+            self._bmi[start:start + k] = widen_array(values, dtype)
+
+        self.n += k
+        self.shared = False
+        if self._bmi is not None and self.n - self.n_sorted > max(4096, self.n_sorted // 16):
+            self._sort_bmi()
+
+    def save(self, directory, meta=None):
+        """Write the index as .npy arrays plus index.json (written aside, then renamed)"""
+        tmp = directory + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        columns = {}
+        for i, (col, bitmaps) in enumerate(self.bitmaps.items()):
+            stacked = np.stack([b[:self.nbytes] for b in bitmaps.values()]) if bitmaps else \
+                np.zeros((0, self.nbytes), dtype=np.uint8)
+            np.save(os.path.join(tmp, f'bitmaps_{i}.npy'), stacked)
+            columns[col] = {'file': f'bitmaps_{i}.npy', 'values': [_json_value(v) for v in bitmaps]}
+        if self._bmi is not None:
+            np.save(os.path.join(tmp, 'bmi.npy'), self.bmi)
+            np.save(os.path.join(tmp, 'bmi_order.npy'), self.bmi_order)
+            np.save(os.path.join(tmp, 'bmi_sorted.npy'), self.bmi_sorted)
+        info = dict(meta or {}, n=self.n, n_sorted=getattr(self, 'n_sorted', self.n), nbytes=self.nbytes,
+                    columns=columns, bmi=self._bmi is not None)
+        with open(os.path.join(tmp, 'index.json'), 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp, directory)
+
+    @staticmethod
+    def read_info(directory):
+        try:
+            with open(os.path.join(directory, 'index.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Index from save(); with mmap the arrays stay on disk, shared between processes"""
+        info = cls.read_info(directory)
+        mode = 'r' if mmap else None
+        index = cls.__new__(cls)
+        index.shared = mmap
+        index.n, index.n_sorted, index.nbytes = info['n'], info['n_sorted'], info['nbytes']
+        index.bitmaps = {}
+        for col, spec in info['columns'].items():
+            stacked = np.load(os.path.join(directory, spec['file']), mmap_mode=mode)
+            index.bitmaps[col] = {value: stacked[i] for i, value in enumerate(spec['values'])}
+        if info['bmi']:
+            index._bmi = np.load(os.path.join(directory, 'bmi.npy'), mmap_mode=mode)
+            index.bmi_order = np.load(os.path.join(directory, 'bmi_order.npy'), mmap_mode=mode)
+            index.bmi_sorted = np.load(os.path.join(directory, 'bmi_sorted.npy'), mmap_mode=mode)
+        else:
+            index._bmi = None
+        return index
+
+    def column_mask(self, col, values):
+        """OR of the bitmaps of the selected values (packed)"""
+        bitmaps = self.bitmaps.get(col, {})
+        mask = self._empty_bitmap()
+        for value in values:
+            bitmap = bitmaps.get(value)
+            if bitmap is not None:
+                np.bitwise_or(mask, bitmap, out=mask)
+        return mask
+
+    def _bmi_value(self, value):
+        """A BMI bound in the precision of the stored values (26.3 matches float32(26.3))"""
+        return self.bmi_sorted.dtype.type(value)
+
+    def bmi_bounds(self, bmi_range):
+        """Binary search on the sorted BMI array -> [lo, hi) in sorted order"""
+        lo = np.searchsorted(self.bmi_sorted, self._bmi_value(bmi_range[0]), side='left')
+        hi = np.searchsorted(self.bmi_sorted, self._bmi_value(bmi_range[1]), side='right')
+        return int(lo), int(hi)
+
+    def bmi_positions(self, lo, hi, closed=True):
+        """Positions of the rows with lo <= BMI < hi (<= hi when closed), unordered"""
+        lo, hi = self._bmi_value(lo), self._bmi_value(hi)
+        start = np.searchsorted(self.bmi_sorted, lo, side='left')
+        stop = np.searchsorted(self.bmi_sorted, hi, side='right' if closed else 'left')
+        tail = self.bmi[self.n_sorted:]
+        upper = tail <= hi if closed else tail < hi
+        return np.concatenate([self.bmi_order[start:stop], self.n_sorted + np.flatnonzero((tail >= lo) & upper)])
+
+    def select(self, loc=None, dis=None, gen=None, age=None, bmi_range=None):
+        """Row positions matching the filters, or None when nothing is filtered"""
+        mask = None
+        for col, values in (('location', loc), ('commonDiseases', dis),
+                            ('gender', gen), ('age_group', age)):
+            values = as_list(values)
+            if not values or col not in self.bitmaps:
+                continue
+            col_mask = self.column_mask(col, values)
+            mask = col_mask if mask is None else np.bitwise_and(mask, col_mask, out=mask)
+
+        bounds = tail = None
+        if bmi_range and self._bmi is not None:
+            bmi_range = [self._bmi_value(bmi_range[0]), self._bmi_value(bmi_range[1])]
+            bounds = self.bmi_bounds(bmi_range)
+            # Các dòng mới nối chưa vào mảng sắp xếp thì so trực tiếp
+            tail_bmi = self.bmi[self.n_sorted:]
+            tail = self.n_sorted + np.flatnonzero((tail_bmi >= bmi_range[0]) & (tail_bmi <= bmi_range[1]))
+            if bounds == (0, self.n_sorted) and len(tail) == len(tail_bmi):
+                bounds = None
+
+        if mask is None:
+            if bounds is None:
+                return None
+            # Chỉ lọc BMI: lấy thẳng đoạn đã sắp xếp, giữ thứ tự dòng ban đầu
+            return np.concatenate([np.sort(self.bmi_order[bounds[0]:bounds[1]]), tail])
+
+        positions = np.flatnonzero(np.unpackbits(mask, count=self.n))
+        if bounds is not None:
+            bmi = self.bmi[positions]
+            positions = positions[(bmi >= bmi_range[0]) & (bmi <= bmi_range[1])]
+        return positions
+
+    def apply(self, df, **filters):
+        """Filtered frame via a single take (the frame itself when unfiltered)"""
+        positions = self.select(**filters)
+        if positions is None:
+            return df
+        return df.take(positions)
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+import numpy as np
+from data.data_loader import data_path
+
+# File ranh giới tỉnh/thành mặc định (GeoJSON), tìm trong thư mục data/ như file CSV
+PROVINCES_FILE = 'provinces.geojson'
+# Đường dẫn (tương đối, như liên kết xuất) trình duyệt tải hình dạng các tỉnh
+PROVINCES_URL = 'provinces.geojson'
+# Sai số đơn giản hóa (độ, ~0,5 km) và số chữ số thập phân giữ lại của tọa độ
+SIMPLIFY_TOLERANCE = 0.005
+COORD_DECIMALS = 3
+
+# 34 tỉnh/thành của dữ liệu -> tâm gần đúng (kinh độ, vĩ độ): bản đồ dạng bong bóng khi không có GeoJSON
+PROVINCE_CENTROIDS = {
+    'Lai Châu': (103.5, 22.4), 'Điện Biên': (103.0, 21.4), 'Lào Cai': (104.9, 21.7),
+    'Sơn La': (103.9, 21.3), 'Cao Bằng': (106.3, 22.7), 'Lạng Sơn': (106.76, 21.85),
+    'Tuyên Quang': (105.2, 21.8), 'Thái Nguyên': (105.8, 21.6), 'Phú Thọ': (105.4, 21.3),
+    'Quảng Ninh': (107.1, 21.0), 'Bắc Ninh': (106.2, 21.27), 'TP. Hà Nội': (105.85, 21.03),
+    'TP. Hải Phòng': (106.68, 20.86), 'Hưng Yên': (106.05, 20.65), 'Ninh Bình': (105.97, 20.25),
+    'Thanh Hóa': (105.78, 19.8), 'Nghệ An': (105.68, 18.67), 'Hà Tĩnh': (105.9, 18.34),
+    'Quảng Trị': (106.6, 17.47), 'TP. Huế': (107.6, 16.46), 'TP. Đà Nẵng': (108.2, 16.05),
+    'Quảng Ngãi': (108.8, 15.12), 'Gia Lai': (109.22, 13.78), 'Đắk Lắk': (108.04, 12.67),
+    'Khánh Hoà': (109.19, 12.24), 'Lâm Đồng': (108.44, 11.94), 'Đồng Nai': (106.82, 10.95),
+    'Tây Ninh': (106.41, 10.54), 'TP. Hồ Chí Minh': (106.7, 10.78), 'Đồng Tháp': (106.36, 10.36),
+    'Vĩnh Long': (105.97, 10.25), 'An Giang': (105.08, 10.01), 'TP. Cần Thơ': (105.78, 10.03),
+    'Cà Mau': (105.15, 9.18),
+}
+
+# Tiền tố bỏ đi khi so tên tỉnh (dài trước)
+_NAME_PREFIXES = ('thành phố ', 'tỉnh ', 'tp. ', 'tp.', 'tp ')
+# Thuộc tính GeoJSON có thể chứa tên tỉnh
+_NAME_PROPERTIES = ('name', 'NAME_1', 'ten_tinh', 'province', 'Name')
+
+
+def province_key(name):
+    """Comparable province name: NFC, lower case, without 'TP.' / 'Thành phố' / 'Tỉnh'
+    and with the old 'oà' / 'uỳ' tone placement ('Khánh Hoà' = 'Khánh Hòa')"""
+    key = unicodedata.normalize('NFC', str(name)).strip().lower()
+    for prefix in _NAME_PREFIXES:
+        if key.startswith(prefix):
+            key = key[len(prefix):].strip()
+            break
+    for old, new in (('oà', 'òa'), ('oá', 'óa'), ('oả', 'ỏa'), ('oã', 'õa'), ('oạ', 'ọa'), ('uỳ', 'ùy'), ('uý', 'úy')):
+        key = key.replace(old, new)
+    return key
+
+
+def match_provinces(labels, locations):
+    """{label: index in `locations`} for the labels naming one of the map's provinces"""
+    slots = {province_key(loc): i for i, loc in enumerate(locations)}
+    return {label: slots[province_key(label)] for label in labels if province_key(label) in slots}
+
+
+def simplify_ring(points, tolerance):
+    """Douglas-Peucker: the vertices of a ring (or line) to keep so that no dropped
+    vertex is farther than `tolerance` from the simplified outline"""
+    points = np.asarray(points, dtype=float)[:, :2]
+    if len(points) <= 4:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = points[start], points[end]
+        inner = points[start + 1:end]
+        dx, dy = b - a
+        length = np.hypot(dx, dy)
+        if length == 0:
+            # Vòng kín: đoạn đầu tiên nối điểm đầu với chính nó
+            dist = np.hypot(inner[:, 0] - a[0], inner[:, 1] - a[1])
+        else:
+            dist = np.abs(dx * (inner[:, 1] - a[1]) - dy * (inner[:, 0] - a[0])) / length
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            mid = start + 1 + i
+            keep[mid] = True
+            stack.extend([(start, mid), (mid, end)])
+    return points[keep]
+
+
+def _polygons(geometry):
+    if geometry is None:
+        return []
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+
+def simplify_polygons(geometry, tolerance=SIMPLIFY_TOLERANCE, decimals=COORD_DECIMALS):
+    """(Multi)Polygon simplified ring by ring and rounded; rings left with fewer than
+    4 vertices are dropped (islets, holes), a polygon whose outer ring is dropped too.
+    A border shared by two provinces is simplified on each side separately, so
+    gaps or overlaps along it stay within twice `tolerance`."""
+    polygons = []
+    for polygon in _polygons(geometry):
+        rings = []
+        for ring in polygon:
+            simplified = np.round(simplify_ring(ring, tolerance), decimals)
+            if len(simplified) >= 4:
+                rings.append(simplified.tolist())
+            elif not rings:
+                break
+        if rings:
+            polygons.append(rings)
+    if not polygons:
+        # Tỉnh nhỏ hơn sai số: giữ vòng ngoài gốc (làm tròn) để vẫn hiện trên bản đồ
+        polygons = [[np.round(np.asarray(p[0], dtype=float)[:, :2], decimals).tolist()]
+                    for p in _polygons(geometry)[:1]]
+    if len(polygons) == 1:
+        return {'type': 'Polygon', 'coordinates': polygons[0]}
+    return {'type': 'MultiPolygon', 'coordinates': polygons}
+
+
+def _feature_name(feature):
+    properties = feature.get('properties') or {}
+    for key in _NAME_PROPERTIES:
+        if properties.get(key):
+            return str(properties[key])
+    return str(feature.get('id', ''))
+
+
+class ProvinceGeometry:
+    """Simplified province outlines, ready to serve.
+
+    Each feature's id is the province label of the data (PROVINCE_CENTROIDS
+    when its name matches one, else its own name) and its properties are
+    dropped; `locations` lists the ids in file order, `body` is the compact
+    JSON sent to browsers and `etag` its hash.
+    """
+
+    def __init__(self, geojson, source_bytes):
+        labels = {province_key(name): name for name in PROVINCE_CENTROIDS}
+        features = []
+        for feature in geojson.get('features', []):
+            name = _feature_name(feature)
+            label = labels.get(province_key(name), name)
+            features.append({'type': 'Feature', 'id': label, 'properties': {},
+                             'geometry': simplify_polygons(feature.get('geometry'))})
+        self.locations = [f['id'] for f in features]
+        self.body = json.dumps({'type': 'FeatureCollection', 'features': features},
+                               ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self.source_bytes = source_bytes
+
+    @property
+    def nbytes(self):
+        return len(self.body)
+
+
+_lock = threading.Lock()
+_loaded = {}
+_current = None
+
+
+def load_provinces(path=PROVINCES_FILE):
+    """Province outlines from a GeoJSON file (relative paths are looked up in data/),
+    simplified once per file and version, and made the geometry of the province
+    map of this process (see current_provinces). None, and the map falls back
+    to centroid bubbles, when the file does not exist."""
+    global _current
+    path = path if os.path.isabs(path) else data_path(path)
+    if not os.path.exists(path):
+        _current = None
+        return None
+    key = (path, os.path.getmtime(path))
+    with _lock:
+        if key not in _loaded:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            _loaded[key] = ProvinceGeometry(json.loads(raw), len(raw))
+        _current = _loaded[key]
+    return _current
+
+
+def current_provinces():
+    """ProvinceGeometry last loaded by load_provinces (None: no outlines)"""
+    return _current
+
+
+def map_locations():
+    """Provinces of the province map, in drawing order: the loaded outlines, else PROVINCE_CENTROIDS"""
+    return _current.locations if _current is not None else list(PROVINCE_CENTROIDS)
@@ -0,0 +1,306 @@
+import threading
+import numpy as np
+import pandas as pd
+from data.compact import float_values
+from data.cube import BMI_STEP, WEEKDAYS
+from data.data_loader import AGE_BINS, AGE_LABELS, DERIVED_COLUMNS
+from data.filter_index import as_list
+from data.sources import DataSource
+from data.time_index import TIME_SERIES, timeline_frame, totals_by_day
+
+try:
+    from pymongo import MongoClient
+except ImportError:  # pymongo chỉ cần khi dùng nguồn MongoDB
+    MongoClient = None
+
+# Các nhóm đếm mà dashboard cần; lấy về trong một lần $facet cho mỗi trạng thái lọc
+DASHBOARD_GROUPINGS = [
+    ('location',), ('commonDiseases',), ('gender',), ('age_group',), ('allergies',),
+    ('bmi_bucket',), ('age_group', 'commonDiseases'), ('location', 'commonDiseases'),
+    ('weekday', 'hour'),
+]
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(uri, **options):
+    """One pooled MongoClient per URI, shared by every source and request thread"""
+    if MongoClient is None:
+        raise ImportError("pymongo is required for the MongoDB data source")
+    with _clients_lock:
+        if uri not in _clients:
+            _clients[uri] = MongoClient(uri, **options)
+        return _clients[uri]
+
+
+def _age_group_expr():
+    branches = [{'case': {'$lt': ['$age', hi]}, 'then': label}
+                for hi, label in zip(AGE_BINS[1:], AGE_LABELS)]
+    return {'$switch': {'branches': branches, 'default': None}}
+
+
+def field_expr(dim, bmi_step=BMI_STEP):
+    """Aggregation expression of a dashboard dimension over a raw profile document"""
+    if dim == 'age_group':
+        return _age_group_expr()
+    if dim == 'bmi_bucket':
+        return {'$multiply': [{'$floor': {'$divide': ['$BMI', bmi_step]}}, bmi_step]}
+    if dim == 'weekday':
+        return {'$dayOfWeek': '$createdAt'}
+    if dim == 'hour':
+        return {'$hour': '$createdAt'}
+    if dim in TIME_SERIES:
+        # Ngày (UTC) của một cột thời gian, cho timeline
+        return {'$dateToString': {'format': '%Y-%m-%d', 'date': f'${dim}'}}
+    return f'${dim}'
+
+
+def _day_start(day):
+    return pd.Timestamp(np.datetime64(int(day), 'D')).to_pydatetime()
+
+
+def build_match(loc=None, dis=None, gen=None, age=None, bmi_range=None, bmi_bounds=None,
+                created_range=None, created_bounds=None):
+    """Filter state of update_dashboard as a $match document"""
+    match = {}
+    for field, values in (('location', loc), ('commonDiseases', dis), ('gender', gen)):
+        values = as_list(values)
+        if values:
+            match[field] = {'$in': values}
+
+    ages = as_list(age)
+    if ages:
+        # Nhóm tuổi -> khoảng tuổi, để $match dùng được index trên 'age'
+        bounds = dict(zip(AGE_LABELS, zip(AGE_BINS[:-1], AGE_BINS[1:])))
+        ranges = [{'age': {'$gte': bounds[a][0], '$lt': bounds[a][1]}} for a in ages if a in bounds]
+        # Chỉ có nhãn lạ: không hồ sơ nào khớp, như ProfileDataset ($or rỗng bị MongoDB từ chối)
+        match['$or'] = ranges or [{'_id': {'$exists': False}}]
+
+    if bmi_range:
+        lo, hi = bmi_range
+        if bmi_bounds is None or lo > bmi_bounds[0] or hi < bmi_bounds[1]:
+            match['BMI'] = {'$gte': lo, '$lte': hi}
+
+    if created_range:
+        lo, hi = int(created_range[0]), int(created_range[1])
+        if created_bounds is None or lo > created_bounds[0] or hi < created_bounds[1]:
+            # Ngày đăng ký lo..hi (gồm cả ngày hi)
+            match['createdAt'] = {'$gte': _day_start(lo), '$lt': _day_start(hi + 1)}
+    return match
+
+
+def _document_chunks(cursor, chunk_rows):
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) == chunk_rows:
+            yield pd.DataFrame(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch)
+
+
+def _facet_name(columns):
+    return '__'.join(columns)
+
+
+class MongoSource(DataSource):
+    """Profiles stored in a MongoDB collection (one document per profile).
+
+    Filters become a $match and every chart count a $group inside a single
+    $facet, so only aggregates come back over the wire. Per-record charts
+    (scatter, box plot) are not available from this source.
+    """
+
+    def __init__(self, collection=None, uri='mongodb://localhost:27017', database='health',
+                 collection_name='profiles', client=None, bmi_step=BMI_STEP):
+        if collection is None:
+            client = client or get_client(uri)
+            collection = client[database][collection_name]
+        self.collection = collection
+        self.bmi_step = bmi_step
+        self.version = 1
+        self._bmi_range = None
+        self._created_range = None
+        self._day_range = None
+
+    def refresh(self):
+        """Forget cached ranges and bump the version (collection changed)"""
+        self._bmi_range = None
+        self._created_range = None
+        self._day_range = None
+        self.version += 1
+
+    def query(self, selection, **filters):
+        view = MongoView(self, build_match(bmi_bounds=self.bmi_range, created_bounds=self.created_range, **filters))
+        return view, view
+
+    def timeline(self, created_range=None, **filters):
+        """Registrations / last logins per period, from one $group by day per time column.
+
+        Like ProfileDataset.timeline, a created_range covering every registration
+        (or none) means the whole span of the collection (day_range), whatever the
+        span of the filtered profiles.
+        """
+        window = self.day_range
+        if window is None:
+            return None
+        bounds = self.created_range
+        if created_range and bounds is not None:
+            lo, hi = int(created_range[0]), int(created_range[1])
+            if lo > bounds[0] or hi < bounds[1]:
+                window = (lo, hi)
+        view = MongoView(self, build_match(bmi_bounds=self.bmi_range, **filters))
+        day0, totals = totals_by_day({name: view.count_by(col) for col, name in TIME_SERIES.items()})
+        if day0 is None:
+            # Không hồ sơ nào khớp: các chuỗi bằng 0 trên cả khoảng
+            day0, totals = int(window[0]), {name: np.zeros(0, dtype=np.int64) for name in TIME_SERIES.values()}
+        return timeline_frame(totals, day0, int(window[0]), int(window[1]))
+
+    def iter_rows(self, chunk_rows, **filters):
+        """Matching documents as frames of `chunk_rows`, read from the cursor batch by batch"""
+        match = build_match(bmi_bounds=self.bmi_range, created_bounds=self.created_range, **filters)
+        return _document_chunks(self.collection.find(match, {'_id': 0}, batch_size=chunk_rows), chunk_rows)
+
+    def _day_span(self, column):
+        """(first, last) day number of a date column over the collection, None without dates"""
+        stats = list(self.collection.aggregate([
+            {'$match': {column: {'$type': 'date'}}},
+            {'$group': {'_id': None, 'min': {'$min': f'${column}'}, 'max': {'$max': f'${column}'}}}]))
+        if not stats:
+            return None
+        return tuple(int(pd.Timestamp(stats[0][k]).to_datetime64().astype('datetime64[D]').astype(np.int64))
+                     for k in ('min', 'max'))
+
+    @property
+    def created_range(self):
+        if self._created_range is None:
+            self._created_range = self._day_span('createdAt')
+        return self._created_range
+
+    @property
+    def day_range(self):
+        """(first, last) day of any time column over the collection (registrations and
+        last logins, as TimeIndex.day_range), None without dates"""
+        if self._day_range is None:
+            spans = [span for span in (self._day_span(col) for col in TIME_SERIES) if span is not None]
+            if not spans:
+                return None
+            self._day_range = (min(lo for lo, _ in spans), max(hi for _, hi in spans))
+        return self._day_range
+
+    def labels(self, dim):
+        if dim == 'age_group':
+            return list(AGE_LABELS)
+        return [v for v in self.collection.distinct(dim) if v is not None]
+
+    def bmi_summary(self):
+        return MongoView(self, {}).bmi_summary()
+
+    @property
+    def bmi_range(self):
+        if self._bmi_range is None:
+            summary = self.bmi_summary()
+            if summary is None:
+                return None
+            self._bmi_range = (float(summary[1]), float(summary[2]))
+        return self._bmi_range
+
+    @property
+    def columns(self):
+        doc = self.collection.find_one({}, {'_id': 0}) or {}
+        return list(doc) + ['age_group']
+
+    def __len__(self):
+        return self.collection.count_documents({})
+
+    def insert_frame(self, df, batch_size=10000):
+        """Load a cleaned profile frame into the collection (in batches)"""
+        columns = [c for c in df.columns if c not in DERIVED_COLUMNS]
+        for start in range(0, len(df), batch_size):
+            chunk = df.iloc[start:start + batch_size][columns]
+            # float32 của bảng gọn -> số thập phân ban đầu (26.3, không phải 26.299999237060547)
+            chunk = chunk.assign(**{col: float_values(chunk[col]) for col in columns
+                                    if chunk[col].dtype == np.float32}).astype(object)
+            records = chunk.where(chunk.notna(), None).to_dict('records')
+            for record in records:
+                for key, value in record.items():
+                    if isinstance(value, pd.Timestamp):
+                        record[key] = value.to_pydatetime()
+                    elif isinstance(value, np.generic):
+                        record[key] = value.item()
+            self.collection.insert_many(records)
+        self.refresh()
+
+
+class MongoView:
+    """Aggregates of one filter state, fetched lazily with one $facet round trip"""
+
+    def __init__(self, source, match):
+        self.source = source
+        self.match = match
+        self.bmi_step = source.bmi_step
+        self._result = None
+
+    def _prefix(self):
+        return [{'$match': self.match}] if self.match else []
+
+    def _group_stage(self, columns):
+        return [{'$group': {'_id': {c: field_expr(c, self.bmi_step) for c in columns},
+                            'count': {'$sum': 1}}}]
+
+    def _fetch(self):
+        if self._result is None:
+            facet = {_facet_name(cols): self._group_stage(cols) for cols in DASHBOARD_GROUPINGS}
+            facet['_total'] = [{'$count': 'n'}]
+            facet['_bmi'] = [
+                {'$match': {'BMI': {'$type': 'number'}}},
+                {'$group': {'_id': None, 'n': {'$sum': 1}, 'sum': {'$sum': '$BMI'},
+                            'min': {'$min': '$BMI'}, 'max': {'$max': '$BMI'}}},
+            ]
+            self._result = next(self.source.collection.aggregate(self._prefix() + [{'$facet': facet}]))
+        return self._result
+
+    @property
+    def columns(self):
+        return ['location', 'commonDiseases', 'gender', 'age_group', 'allergies', 'BMI', 'createdAt']
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def __len__(self):
+        total = self._fetch()['_total']
+        return int(total[0]['n']) if total else 0
+
+    def count_by(self, *columns):
+        """Non-zero counts per label (combination), largest first like value_counts"""
+        name = _facet_name(columns)
+        if name in self._fetch():
+            groups = self._result[name]
+        else:
+            groups = list(self.source.collection.aggregate(self._prefix() + self._group_stage(columns)))
+
+        frame = pd.DataFrame([dict(g['_id'], count=g['count']) for g in groups],
+                             columns=list(columns) + ['count'])
+        frame = frame.dropna(subset=list(columns))
+        if 'weekday' in columns:
+            # $dayOfWeek: 1 = Chủ nhật ... 7 = Thứ bảy
+            frame['weekday'] = [WEEKDAYS[(int(d) + 5) % 7] for d in frame['weekday']]
+        if 'age_group' in columns:
+            frame['age_group'] = pd.Categorical(frame['age_group'], categories=AGE_LABELS, ordered=True)
+
+        frame = frame.sort_values(list(columns))
+        if len(columns) == 1:
+            frame = frame.sort_values('count', ascending=False, kind='stable')
+            return pd.Series(frame['count'].to_numpy(), index=pd.Index(frame[columns[0]], name=columns[0]),
+                             name='count')
+        index = pd.MultiIndex.from_frame(frame[list(columns)])
+        return pd.Series(frame['count'].to_numpy(), index=index, name='count')
+
+    def bmi_summary(self):
+        stats = self._fetch()['_bmi']
+        if not stats or not stats[0]['n']:
+            return None
+        return stats[0]['sum'] / stats[0]['n'], stats[0]['min'], stats[0]['max']
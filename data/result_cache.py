@@ -0,0 +1,86 @@
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+_MISSING = object()
+
+
+class ResultCache:
+    """LRU cache evicted by a byte budget instead of an entry count.
+
+    Values are stored together with their size in bytes (given by the caller);
+    an entry larger than the whole budget is simply not cached.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        """Whether `key` is cached (neither counted as a lookup nor marked as used)"""
+        with self._lock:
+            return key in self._entries
+
+    def peek(self, key, default=None):
+        """Cached value or `default`, neither counted as a lookup nor marked as used"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            return default if entry is _MISSING else entry[0]
+
+    def get(self, key, default=_MISSING):
+        """Cached value (marked most recently used) or `default`"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, size) = self._entries.popitem(last=False)
+                self.nbytes -= size
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute, sizeof):
+        value = self.get(key)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value, sizeof(value))
+        return value
+
+    def invalidate(self):
+        """Drop every entry (dataset reloaded); counters are kept"""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+from data.compact import float_values
+from data.cube import BMI_STEP, cube_labels
+from data.time_index import TIME_SERIES, timeline_frame
+
+# Cỡ mẫu mục tiêu (số dòng) của chế độ hiển thị dần
+SAMPLE_ROWS = 50_000
+# Mỗi tầng giữ ít nhất chừng này dòng (cả tầng nếu nhỏ hơn), để tầng nhỏ không có sai số lớn
+MIN_STRATUM_ROWS = 10
+# Các cột chia tầng: lọc theo địa điểm / bệnh lý chọn nguyên tầng, nên số đếm của chúng là chính xác
+STRATA = ('location', 'commonDiseases')
+# z của khoảng tin cậy 95%
+Z_95 = 1.96
+
+
+def _label(value):
+    return None if pd.isna(value) else value
+
+
+class StratifiedSample:
+    """Row sample stratified by location x disease, kept up to date as rows are appended.
+
+    Each row draws a uniform key when added and is sampled while the key is
+    below the rate of its stratum: target / rows overall, raised so every
+    stratum keeps at least `min_rows` rows. Rates only decrease as data grows,
+    so extend() draws keys for the new rows and thins the sampled ones,
+    without revisiting the table. Rows are weighted by N_h / n_h of their
+    stratum (stratum rows / sampled rows).
+
+    positions, stratum and sizes are replaced, never modified in place, so a
+    reader holding them keeps a consistent snapshot.
+    """
+
+    def __init__(self, df, target=SAMPLE_ROWS, min_rows=MIN_STRATUM_ROWS, seed=0):
+        self.target = target
+        self.min_rows = min_rows
+        self.columns = [col for col in STRATA if col in df.columns]
+        self._rng = np.random.default_rng(seed)
+        self._ids = {}
+        self.n = 0
+        self.sizes = np.zeros(0, dtype=np.int64)
+        self.positions = np.zeros(0, dtype=np.int64)
+        self.stratum = np.zeros(0, dtype=np.int64)
+        self._keys = np.zeros(0)
+        self.extend(df)
+
+    def _stratum_ids(self, chunk):
+        """Stratum of every row of `chunk` (new label combinations get new ids)"""
+        if not self.columns:
+            return np.zeros(len(chunk), dtype=np.int64)
+        key = np.zeros(len(chunk), dtype=np.int64)
+        uniques = []
+        for col in self.columns:
+            codes, labels = pd.factorize(chunk[col], use_na_sentinel=False)
+            key = key * len(labels) + codes
+            uniques.append(labels)
+        combos, inverse = np.unique(key, return_inverse=True)
+        ids = np.empty(len(combos), dtype=np.int64)
+        for i, combo in enumerate(combos):
+            labels = []
+            for values in reversed(uniques):
+                combo, code = divmod(int(combo), len(values))
+                labels.append(_label(values[code]))
+            ids[i] = self._ids.setdefault(tuple(reversed(labels)), len(self._ids))
+        return ids[inverse.ravel()]
+
+    def rates(self):
+        """Sampling rate of every stratum"""
+        base = min(1.0, self.target / max(self.n, 1))
+        return np.minimum(1.0, np.maximum(base, self.min_rows / np.maximum(self.sizes, 1)))
+
+    def extend(self, chunk):
+        """Count appended rows into their strata, sample them and thin the sample to the new rates"""
+        if len(chunk) == 0:
+            return
+        start = self.n
+        ids = self._stratum_ids(chunk)
+        sizes = np.zeros(len(self._ids), dtype=np.int64)
+        sizes[:len(self.sizes)] = self.sizes
+        self.sizes = sizes + np.bincount(ids, minlength=len(sizes))
+        self.n += len(chunk)
+
+        rates = self.rates()
+        keys = self._rng.random(len(chunk))
+        new = keys < rates[ids]
+        kept = self._keys < rates[self.stratum]
+        self.positions = np.concatenate([self.positions[kept], start + np.flatnonzero(new)])
+        self.stratum = np.concatenate([self.stratum[kept], ids[new]])
+        self._keys = np.concatenate([self._keys[kept], keys[new]])
+
+    def weights(self):
+        """Weight of every sampled row: rows of its stratum per sampled row"""
+        sampled = np.bincount(self.stratum, minlength=len(self.sizes))
+        return (self.sizes / np.maximum(sampled, 1))[self.stratum]
+
+
+def stratified_total(stratum, sizes, selected):
+    """(estimate, 95% half-width) of the rows matching a filter, from the sampled rows
+    that match (`selected`: indices into the sample).
+
+    Per stratum the matching share is estimated from its sampled rows, with
+    the variance of a simple random sample without replacement; strata kept
+    whole, or all in / all out of the filter, add no error.
+    """
+    sampled = np.bincount(stratum, minlength=len(sizes))
+    hits = np.bincount(stratum[selected], minlength=len(sizes))
+    present = sampled > 0
+    n, big_n = sampled[present].astype(float), sizes[present].astype(float)
+    share = hits[present] / n
+    variance = big_n ** 2 * (1 - n / big_n) * share * (1 - share) / np.maximum(n - 1, 1)
+    return float((big_n * share).sum()), float(Z_95 * np.sqrt(variance.sum()))
+
+
+class SampleView:
+    """Estimated counts of a filtered cohort from its sampled rows.
+
+    Same interface as CubeView (count_by, bmi_summary, len), with each row
+    counted by its weight and sums rounded. `rows` are the sampled rows
+    (e.g. for BMI quartiles) and `error` is the 95% half-width of len().
+    """
+
+    exact = False
+
+    def __init__(self, rows, weights, total, error, bmi_step=BMI_STEP):
+        self.rows = rows
+        self.weights = weights
+        self.total = total
+        self.error = error
+        self.bmi_step = bmi_step
+        self._labels = None
+
+    def _label(self, column):
+        if self._labels is None:
+            self._labels = cube_labels(self.rows, self.bmi_step)
+        return self._labels[column]
+
+    @property
+    def columns(self):
+        return list(self.rows.columns)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def __len__(self):
+        return int(round(self.total))
+
+    def count_by(self, *columns):
+        """Estimated non-zero counts per label (combination), largest first for a single column"""
+        frame = pd.DataFrame({col: np.asarray(self._label(col), dtype=object) for col in columns})
+        frame['count'] = self.weights
+        counts = frame.groupby(list(columns), sort=True)['count'].sum()
+        counts = np.rint(counts).astype(np.int64)
+        counts = counts[counts > 0]
+        if len(columns) == 1:
+            counts = counts.sort_values(ascending=False, kind='stable')
+        return counts.rename('count')
+
+    def bmi_summary(self):
+        """(weighted mean, min, max) of BMI over the sampled rows"""
+        if 'BMI' not in self.rows.columns:
+            return None
+        bmi = float_values(self.rows['BMI'])
+        valid = np.isfinite(bmi)
+        if not valid.any():
+            return None
+        return (np.average(bmi[valid], weights=self.weights[valid]), bmi[valid].min(), bmi[valid].max())
+
+
+def sample_timeline(days, weights, lo, hi):
+    """Estimated registrations / last logins per period over days [lo, hi]
+    from the day numbers ({time column: days}) of weighted sampled rows"""
+    totals = {}
+    for col, name in TIME_SERIES.items():
+        if col in days:
+            offset = days[col].astype(np.int64) - lo
+            valid = (days[col] >= 0) & (offset >= 0) & (offset <= hi - lo)
+            daily = np.bincount(offset[valid], weights=weights[valid], minlength=hi - lo + 1)
+            totals[name] = np.cumsum(daily)
+    if not totals:
+        return None
+    frame = timeline_frame(totals, lo, lo, hi)
+    estimate = np.rint(frame).astype(np.int64)
+    estimate.attrs['freq'] = frame.attrs['freq']
+    return estimate
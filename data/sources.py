@@ -0,0 +1,78 @@
+from data.cohorts import COMPARE_COLUMNS, compare_views
+from data.cube import FILTER_DIMENSIONS
+
+
+class DataSource:
+    """Where the dashboard reads profiles from.
+
+    Callbacks only go through select()/query(); charts only see what query()
+    returns: a row frame and/or an aggregate view exposing count_by(),
+    bmi_summary() and len(), plus the timeline() frame. The layout uses
+    labels(), bmi_summary(), len(), `columns` and the ranges of the sliders.
+
+    created_range is an inclusive range of registration days (days since
+    1970-01-01, see data/time_index.py).
+    """
+
+    version = 0
+
+    def select(self, loc=None, dis=None, gen=None, age=None, bmi_range=None, created_range=None):
+        """Cacheable row selection for a filter state (None = nothing to cache)"""
+        return None
+
+    def query(self, selection, loc=None, dis=None, gen=None, age=None, bmi_range=None, created_range=None):
+        """(rows, counts) for a filter state: source of per-record charts and of count charts"""
+        raise NotImplementedError
+
+    def facet_counts(self, loc=None, dis=None, gen=None, age=None, bmi_range=None, created_range=None):
+        """{filter: counts per option} where each filter's options are counted
+        under all the *other* active filters (what picking that option would give)"""
+        filters = dict(loc=loc, dis=dis, gen=gen, age=age, bmi_range=bmi_range, created_range=created_range)
+        return {name: self.query(None, **dict(filters, **{name: None}))[1].count_by(column)
+                for name, column in FILTER_DIMENSIONS.items()}
+
+    def timeline(self, loc=None, dis=None, gen=None, age=None, bmi_range=None, created_range=None):
+        """Registrations / last logins per period over the created_range window
+        (data/time_index.timeline_frame), None when not available"""
+        return None
+
+    def compare(self, cohorts, columns=COMPARE_COLUMNS):
+        """data/cohorts.CohortComparison of several filter states (dicts of the filter
+        arguments); here one query per cohort"""
+        return compare_views([self.query(None, **filters)[1] for filters in cohorts], columns)
+
+    def estimate(self, loc=None, dis=None, gen=None, age=None, bmi_range=None, created_range=None):
+        """Quick approximate counts view for a filter state (e.g. data/sample.SampleView,
+        with `error` on len()), None when the source has no estimates"""
+        return None
+
+    def estimate_timeline(self, loc=None, dis=None, gen=None, age=None, bmi_range=None, created_range=None):
+        """Approximate timeline() to go with estimate(), None when not available"""
+        return None
+
+    def iter_rows(self, chunk_rows, loc=None, dis=None, gen=None, age=None, bmi_range=None, created_range=None):
+        """Frames of at most `chunk_rows` matching profiles, for exports; None when the
+        source keeps no rows (e.g. a count cube)"""
+        return None
+
+    def labels(self, dim):
+        raise NotImplementedError
+
+    def bmi_summary(self):
+        raise NotImplementedError
+
+    @property
+    def bmi_range(self):
+        raise NotImplementedError
+
+    @property
+    def created_range(self):
+        """(first, last) registration day, None without registration times"""
+        return None
+
+    @property
+    def columns(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
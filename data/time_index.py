@@ -0,0 +1,260 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+DAY_NS = 86_400 * 10 ** 9
+# Độ chi tiết của timeline theo độ dài cửa sổ (ngày): theo ngày, theo tuần, còn lại theo tháng
+DAILY_MAX_DAYS = 120
+WEEKLY_MAX_DAYS = 731
+# Cột thời gian -> tên chuỗi trên timeline
+TIME_SERIES = {'createdAt': 'registrations', 'lastLoginAt': 'logins'}
+
+
+def day_numbers(stamps):
+    """Days since 1970-01-01 of a datetime column, int32 (-1 where missing)"""
+    values = pd.to_datetime(pd.Series(stamps)).to_numpy(dtype='datetime64[ns]')
+    days = values.view(np.int64) // DAY_NS
+    return np.where(np.isnat(values), -1, days).astype(np.int32)
+
+
+def day_label(day):
+    """'YYYY-MM-DD' of a day number"""
+    return str(np.datetime64(int(day), 'D'))
+
+
+def timeline_freq(lo, hi):
+    """'D', 'W' or 'M' for a window of days [lo, hi], so the timeline keeps a few hundred points at most"""
+    span = hi - lo + 1
+    if span <= DAILY_MAX_DAYS:
+        return 'D'
+    return 'W' if span <= WEEKLY_MAX_DAYS else 'M'
+
+
+def period_starts(lo, hi, freq):
+    """First day of every day / week (Monday) / calendar month overlapping [lo, hi]"""
+    if freq == 'D':
+        return np.arange(lo, hi + 1, dtype=np.int64)
+    if freq == 'W':
+        # 1970-01-01 là thứ Năm: thứ Hai gần nhất trước đó
+        return np.arange(lo - (lo + 3) % 7, hi + 1, 7, dtype=np.int64)
+    months = np.arange(np.datetime64(int(lo), 'D').astype('datetime64[M]'),
+                       np.datetime64(int(hi), 'D').astype('datetime64[M]') + 1)
+    return months.astype('datetime64[D]').astype(np.int64)
+
+
+def window_counts(totals, day0, starts, lo, hi):
+    """Counts per period from running daily totals (totals[i] = days day0..day0+i),
+    each period clipped to [lo, hi]: two lookups per period"""
+    padded = np.concatenate([[0], totals])
+    ends = np.append(starts[1:], hi + 1)
+    first = np.clip(np.maximum(starts, lo) - day0, 0, len(totals))
+    last = np.clip(np.minimum(ends, hi + 1) - day0, 0, len(totals))
+    return padded[last] - padded[np.minimum(first, last)]
+
+
+def timeline_frame(totals, day0, lo, hi, freq=None):
+    """Timeline over [lo, hi] as a frame: one row per period (index = period start),
+    one column per series of `totals` ({name: running daily totals from day0})"""
+    freq = freq or timeline_freq(lo, hi)
+    starts = period_starts(lo, hi, freq)
+    frame = pd.DataFrame({name: window_counts(t, day0, starts, lo, hi) for name, t in totals.items()},
+                         index=pd.DatetimeIndex(starts.astype('datetime64[D]'), name='period'))
+    frame.attrs['freq'] = freq
+    return frame
+
+
+def daily_counts(days, day0, n_days):
+    """Rows per day of a day-number array (missing / out-of-range days skipped)"""
+    offset = days.astype(np.int64) - day0
+    offset = offset[(days >= 0) & (offset >= 0) & (offset < n_days)]
+    return np.bincount(offset, minlength=n_days)
+
+
+def totals_by_day(day_counts):
+    """(first day, {name: running daily totals}) from {name: counts per day label}
+    (e.g. grouped by day in a database)"""
+    days = {name: np.asarray(pd.to_datetime(pd.Index(counts.index)).to_numpy(dtype='datetime64[D]'),
+                             dtype=np.int64) for name, counts in day_counts.items()}
+    known = [d for d in days.values() if len(d)]
+    if not known:
+        return None, {}
+    day0 = int(min(d.min() for d in known))
+    n_days = int(max(d.max() for d in known)) - day0 + 1
+    totals = {}
+    for name, counts in day_counts.items():
+        daily = np.zeros(n_days, dtype=np.int64)
+        np.add.at(daily, days[name] - day0, counts.to_numpy(dtype=np.int64))
+        totals[name] = np.cumsum(daily)
+    return day0, totals
+
+
+class TimeIndex:
+    """Registration-time index: rows sorted by createdAt day, plus running daily totals
+    of registrations and last logins.
+
+    A date range is selected by two binary searches in the sorted days. The
+    totals make the count of any period two lookups, so a timeline over
+    years costs the number of points drawn at any granularity (day, week,
+    month), not the number of rows.
+
+    Appended rows (extend()) form an unsorted tail, merged once it grows past
+    a fraction of the sorted part, like the BMI array of FilterIndex.
+    save() / load() keep the arrays on disk, memory-mapped read-only.
+    """
+
+    def __init__(self, df):
+        self.shared = False
+        self.n = len(df)
+        self._days = {col: day_numbers(df[col]) for col in TIME_SERIES if col in df.columns}
+        self._sort()
+        self._rollup()
+
+    def days(self, col):
+        days = self._days.get(col)
+        return None if days is None else days[:self.n]
+
+    @property
+    def created(self):
+        return self.days('createdAt')
+
+    def _sort(self):
+        self.n_sorted = self.n
+        if self.created is None:
+            self.order = self.sorted_days = None
+            return
+        self.order = np.argsort(self.created, kind='stable').astype(np.int64)
+        self.sorted_days = self.created[self.order]
+
+    @staticmethod
+    def _span(arrays):
+        known = [d[d >= 0] for d in arrays if d is not None]
+        known = [d for d in known if len(d)]
+        if not known:
+            return None
+        return int(min(d.min() for d in known)), int(max(d.max() for d in known))
+
+    def _rollup(self):
+        """Rows per day of every time column over the day span of the data, and running totals"""
+        self.day_range = self._span([self.days(col) for col in TIME_SERIES])
+        self.daily = {}
+        if self.day_range is not None:
+            n_days = self.day_range[1] - self.day_range[0] + 1
+            self.daily = {name: daily_counts(self.days(col), self.day_range[0], n_days)
+                          for col, name in TIME_SERIES.items() if self.days(col) is not None}
+        self.totals = {name: np.cumsum(counts) for name, counts in self.daily.items()}
+
+    @property
+    def created_range(self):
+        """(first, last) registration day, None without registration times"""
+        if self.created is None:
+            return None
+        known = self.sorted_days[np.searchsorted(self.sorted_days, 0):]
+        tail = self.created[self.n_sorted:]
+        tail = tail[tail >= 0]
+        if not len(known) and not len(tail):
+            return None
+        values = np.concatenate([known[:1], known[-1:], tail])
+        return int(values.min()), int(values.max())
+
+    def positions(self, lo, hi):
+        """Rows registered on days lo..hi (inclusive), in row order"""
+        start = np.searchsorted(self.sorted_days, max(lo, 0), side='left')
+        stop = np.searchsorted(self.sorted_days, hi, side='right')
+        tail = self.created[self.n_sorted:]
+        tail = self.n_sorted + np.flatnonzero((tail >= max(lo, 0)) & (tail <= hi))
+        return np.concatenate([np.sort(self.order[start:stop]), tail])
+
+    def contains(self, positions, lo, hi):
+        """Mask of the given rows registered on days lo..hi"""
+        days = self.created[positions]
+        return (days >= max(lo, 0)) & (days <= hi)
+
+    def timeline(self, lo=None, hi=None, positions=None, freq=None):
+        """Registrations and last logins per period over [lo, hi] (default: whole span),
+        from the precomputed totals, or counted over `positions` when given"""
+        if self.day_range is None:
+            return None
+        lo = self.day_range[0] if lo is None else lo
+        hi = self.day_range[1] if hi is None else hi
+        totals = self.totals
+        if positions is not None:
+            n_days = self.day_range[1] - self.day_range[0] + 1
+            totals = {name: np.cumsum(daily_counts(self.days(col)[positions], self.day_range[0], n_days))
+                      for col, name in TIME_SERIES.items() if self.days(col) is not None}
+        return timeline_frame(totals, self.day_range[0], lo, hi, freq)
+
+    def extend(self, chunk):
+        """Index rows appended after the current last row"""
+        start, k = self.n, len(chunk)
+        added = {}
+        for col in list(self._days):
+            values = day_numbers(chunk[col]) if col in chunk.columns else np.full(k, -1, dtype=np.int32)
+            added[col] = values
+            days = self._days[col]
+            if start + k > len(days) or self.shared:
+                grown = np.full(int((start + k) * 1.5), -1, dtype=np.int32)
+                grown[:start] = days[:start]
+                self._days[col] = days = grown
+            days[start:start + k] = values
+        self.n += k
+        self.shared = False
+        if self.created is not None and self.n - self.n_sorted > max(4096, self.n_sorted // 16):
+            self._sort()
+
+        span = self._span(added.values())
+        if span is None:
+            return
+        if self.day_range is None or span[0] < self.day_range[0] or span[1] > self.day_range[1]:
+            # Ngày mới ngoài khoảng đã có: dựng lại tổng theo ngày
+            self._rollup()
+            return
+        n_days = self.day_range[1] - self.day_range[0] + 1
+        for col, values in added.items():
+            name = TIME_SERIES[col]
+            self.daily[name] = self.daily[name] + daily_counts(values, self.day_range[0], n_days)
+            self.totals[name] = np.cumsum(self.daily[name])
+
+    def save(self, directory, meta=None):
+        """Write the index as .npy arrays plus time.json (written aside, then renamed)"""
+        tmp = directory + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for i, col in enumerate(self._days):
+            np.save(os.path.join(tmp, f'days_{i}.npy'), self.days(col))
+        if self.order is not None:
+            np.save(os.path.join(tmp, 'order.npy'), self.order)
+            np.save(os.path.join(tmp, 'sorted_days.npy'), self.sorted_days)
+        info = dict(meta or {}, n=self.n, n_sorted=self.n_sorted, columns=list(self._days))
+        with open(os.path.join(tmp, 'time.json'), 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp, directory)
+
+    @staticmethod
+    def read_info(directory):
+        try:
+            with open(os.path.join(directory, 'time.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Index from save(); with mmap the arrays stay on disk, shared between processes"""
+        info = cls.read_info(directory)
+        mode = 'r' if mmap else None
+        index = cls.__new__(cls)
+        index.shared = mmap
+        index.n, index.n_sorted = info['n'], info['n_sorted']
+        index._days = {col: np.load(os.path.join(directory, f'days_{i}.npy'), mmap_mode=mode)
+                       for i, col in enumerate(info['columns'])}
+        if 'createdAt' in index._days:
+            index.order = np.load(os.path.join(directory, 'order.npy'), mmap_mode=mode)
+            index.sorted_days = np.load(os.path.join(directory, 'sorted_days.npy'), mmap_mode=mode)
+        else:
+            index.order = index.sorted_days = None
+        # Tổng theo ngày chỉ vài nghìn phần tử: tính lại khi nạp
+        index._rollup()
+        return index
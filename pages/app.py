@@ -1,13 +1,81 @@
+import gzip
+import os
+import sys
 import dash
 import dash_bootstrap_components as dbc
+from flask import request
 
-app = dash.Dash(
-    __name__,
-    external_stylesheets=[
-        dbc.themes.BOOTSTRAP,
-        "https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css"
-    ],
-    suppress_callback_exceptions=True
-)
-app.title = "Healthcare User Insights"
-server = app.server
\ No newline at end of file
+# Thư mục assets/ ở gốc dự án (CSS, JS của callback clientside)
+ASSETS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets')
+# Nén gzip các phản hồi lớn hơn ngưỡng này (JSON hình vẽ, JS của component)
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_MIME_TYPES = ('application/json', 'application/geo+json', 'application/javascript', 'text/')
+
+
+def compress_response(response):
+    """gzip responses when the client accepts it (no flask-compress dependency);
+    streamed responses (exports) are sent as they are produced.
+
+    The gzip body is another representation of the resource: its ETag gets a
+    '-gz' suffix, and a revalidation with that ETag is answered 304 here
+    (the view compared it against the plain ETag and sent the full body).
+    """
+    if (response.direct_passthrough or response.is_streamed or response.status_code not in (200, 304)
+            or 'Content-Encoding' in response.headers
+            or not response.mimetype.startswith(COMPRESS_MIME_TYPES)):
+        return response
+    # Cache / proxy giữ riêng bản gzip và bản gốc (cả với 304)
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200 or 'gzip' not in request.headers.get('Accept-Encoding', ''):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(etag + '-gz', weak)
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def enable_compression(server):
+    server.after_request(compress_response)
+
+
+def create_dash_app():
+    """Empty Dash app with the dashboard's stylesheets, title and gzip responses"""
+    app = dash.Dash(
+        __name__,
+        assets_folder=ASSETS_FOLDER,
+        external_stylesheets=[
+            dbc.themes.BOOTSTRAP,
+            "https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css"
+        ],
+        suppress_callback_exceptions=True
+    )
+    app.title = "Healthcare User Insights"
+    enable_compression(app.server)
+    return app
+
+
+def __getattr__(name):
+    """`app` / `server`: the full dashboard (pages.factory.create_app), built on first
+    access so that `gunicorn pages.app:server` and `from pages.app import app` keep
+    working without building it for every import of create_dash_app"""
+    if name not in ('app', 'server'):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from pages.factory import create_app
+    built = create_app()
+    globals().update(app=built, server=built.server)
+    return globals()[name]
+
+
+if __name__ == '__main__':
+    # python pages/app.py: thêm gốc dự án vào sys.path để import các gói pages/, data/, callbacks/
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from pages.factory import create_app
+    create_app().run(debug=True, port=8050)
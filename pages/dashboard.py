@@ -1,9 +1,10 @@
+import uuid
 from dash import dcc, html
 import dash_bootstrap_components as dbc
 from components.filters import filter_section
 from components.shadcn_ui import Card
 
-def get_layout(df):
+def get_layout(df, refresh_ms=5000, slider_update='mouseup', export_formats=(), live=False):
     return html.Div([
         # Header Section - Nền màu #33FFFF, Chữ Navy sẫm đậm nét
         html.Div([
@@ -19,7 +20,8 @@ def get_layout(df):
                         html.Div([
                             html.Span("● Live", className="text-[#16a34a] font-black mr-2"),
                             # Dòng này tự động cập nhật tổng số hồ sơ khi load trang
-                            html.Span(f"| {len(df):,} Hồ sơ hệ thống", className="text-[#0f172a] font-bold")
+                            html.Span(f"| {len(df):,} Hồ sơ hệ thống", id='live-record-count',
+                                      className="text-[#0f172a] font-bold")
                         ],
                             className="inline-flex items-center px-6 py-2 rounded-full bg-white/60 border border-black/10 shadow-sm text-sm")
                     ], className="flex justify-center")
@@ -31,7 +33,7 @@ def get_layout(df):
         dbc.Container([
             dbc.Row([
                 # Sidebar bộ lọc
-                dbc.Col(filter_section(df), lg=3, md=4),
+                dbc.Col(filter_section(df, slider_update, export_formats), lg=3, md=4),
 
                 # Content Area
                 dbc.Col([
@@ -77,9 +79,61 @@ def get_layout(df):
                                 dbc.Col(Card(dcc.Graph(id='allergy-bar-chart'), title="Top 10 Dị ứng phổ biến"), md=6),
                                 dbc.Col(Card(dcc.Graph(id='province-graph'), title="Phân loại theo Tỉnh/Thành"), md=6),
                             ], className="mt-4"),
+                            dbc.Row([
+                                dbc.Col(Card(dcc.Graph(id='province-map'), title="Bản đồ Tỉnh/Thành"), md=12),
+                            ], className="mt-4"),
                         ], className="p-3 bg-white border border-t-0 rounded-b-xl"),
-                    ], id="tabs-network", active_tab="tab-1")
+
+                        # TAB 4: SO SÁNH NHÓM
+                        dbc.Tab(label="⚖️ So sánh nhóm", tab_id="tab-4", children=[
+                            html.Div([
+                                html.Button("➕ Thêm nhóm theo bộ lọc hiện tại", id="add-cohort-btn",
+                                            className="btn-primary text-center mr-2", n_clicks=0),
+                                html.Button("🗑️ Xóa các nhóm", id="clear-cohorts-btn",
+                                            className="btn-primary text-center", n_clicks=0),
+                            ], className="mt-4 flex justify-center"),
+                            dbc.Row([
+                                dbc.Col(Card(html.Div(id='cohort-table'), title="Các nhóm so sánh"), md=12),
+                            ], className="mt-4"),
+                            dbc.Row([
+                                dbc.Col(Card(dcc.Graph(id='cohort-bmi-chart'), title="BMI theo Nhóm"), md=12),
+                            ], className="mt-4"),
+                            dbc.Row([
+                                dbc.Col(Card(dcc.Graph(id='cohort-disease-chart'), title="Bệnh lý phổ biến theo Nhóm"), md=6),
+                                dbc.Col(Card(dcc.Graph(id='cohort-allergy-chart'), title="Dị ứng phổ biến theo Nhóm"), md=6),
+                            ], className="mt-4"),
+                        ], className="p-3 bg-white border border-t-0 rounded-b-xl"),
+                    ], id="tabs-network", active_tab="tab-1"),
+
+                    # Bộ lọc đã dùng để vẽ mỗi tab (tab ẩn chỉ vẽ lại khi mở và bộ lọc đã đổi)
+                    dcc.Store(id='tab-1-rendered'),
+                    dcc.Store(id='tab-2-rendered'),
+                    dcc.Store(id='tab-3-rendered'),
+                    dcc.Store(id='tab-4-rendered'),
+                    # Các trạng thái lọc đã lưu thành nhóm để so sánh (tab 4)
+                    dcc.Store(id='cohorts', data=[]),
+                    # Chế độ hiển thị dần: trạng thái lọc vừa vẽ bằng ước tính, chờ kết quả chính xác
+                    dcc.Store(id='tab-1-estimated'),
+                    dcc.Store(id='tab-2-estimated'),
+                    dcc.Store(id='tab-3-estimated'),
+                    dcc.Store(id='summary-estimated'),
+
+                    # Phiên bản dữ liệu phía server: đổi khi có hồ sơ mới nối vào
+                    # (chỉ hỏi định kỳ khi bật nạp trực tiếp, không thì trang không gửi yêu cầu nào)
+                    dcc.Store(id='data-version'),
+                    dcc.Interval(id='live-refresh', interval=refresh_ms, disabled=not live),
+
+                    # Chế độ lọc phía trình duyệt: các cột mã hóa gọn, server gửi một lần
+                    dcc.Store(id='client-data'),
                 ], lg=9, md=8)
             ])
         ], fluid=True)
-    ], id='main-container', className="bg-slate-50 min-h-screen pb-12")
\ No newline at end of file
+    ], id='main-container', className="bg-slate-50 min-h-screen pb-12")
+
+
+def page_layout(layout):
+    """Dash layout function: `layout` (built once) plus a 'page-id' Store holding a new
+    id on every page load, so callbacks tell apart two tabs of the same browser"""
+    def serve():
+        return html.Div([dcc.Store(id='page-id', data=uuid.uuid4().hex), layout])
+    return serve
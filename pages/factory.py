@@ -0,0 +1,165 @@
+import os
+import logging
+from pages.app import create_dash_app
+from data.compact import bytes_per_row, compact_dtypes
+from data.data_loader import load_count_cube, memory_report
+from data.mongo_source import MongoSource
+from data.dataset import ProfileDataset
+from data.geometry import PROVINCES_FILE, load_provinces
+from data.sources import DataSource
+from data.ingest import CsvTailer, LiveIngestor
+from pages.dashboard import get_layout, page_layout
+from callbacks.dashboard_callbacks import register_callbacks
+from callbacks.export import export_formats
+from callbacks.figure_builder import FigureBuilder
+from callbacks.jobs import background_manager
+from callbacks.metrics import Metrics
+
+# File CSV mặc định, tìm trong thư mục data/ (đường dẫn tuyệt đối cũng được)
+DATA_FILE = 'user_profiles_368_vn34_genderfix - profile.csv'
+
+
+def config_from_env(environ=os.environ):
+    """App settings from DASHBOARD_* environment variables"""
+    return {
+        'data_file': environ.get('DASHBOARD_DATA_FILE', DATA_FILE),
+        # DASHBOARD_CHUNK_ROWS=N: nạp CSV theo từng khối N dòng (file lớn hơn RAM)
+        'chunk_rows': int(environ.get('DASHBOARD_CHUNK_ROWS', 0)) or None,
+        'mongo_uri': environ.get('DASHBOARD_MONGO_URI'),
+        'mongo_db': environ.get('DASHBOARD_MONGO_DB', 'health'),
+        'mongo_collection': environ.get('DASHBOARD_MONGO_COLLECTION', 'profiles'),
+        'cube': environ.get('DASHBOARD_CUBE'),
+        # Đo đạc tại /metrics (tắt bằng DASHBOARD_METRICS=0); DASHBOARD_TIMING_LOG=1 ghi thời gian từng request
+        'metrics': environ.get('DASHBOARD_METRICS', '1') != '0',
+        'timing_log': bool(environ.get('DASHBOARD_TIMING_LOG')),
+        # DASHBOARD_FIGURE_WORKERS=N: dựng các biểu đồ của một tab song song trên N luồng
+        'figure_workers': int(environ.get('DASHBOARD_FIGURE_WORKERS', 0)),
+        # Hình chỉ đổi dữ liệu được cập nhật bằng Patch (tắt bằng DASHBOARD_PATCH_UPDATES=0)
+        'patch_updates': environ.get('DASHBOARD_PATCH_UPDATES', '1') != '0',
+        # DASHBOARD_CLIENT_MAX_ROWS=N: bộ dữ liệu tới N hồ sơ được lọc trong trình duyệt (0 = tắt)
+        'client_max_rows': int(environ.get('DASHBOARD_CLIENT_MAX_ROWS', 0)),
+        # Thanh trượt BMI: DASHBOARD_SLIDER_UPDATE=drag lọc liên tục khi kéo (mặc định: khi thả),
+        # DASHBOARD_SLIDER_DEBOUNCE_MS=N lọc khi dừng kéo N ms
+        'slider_update': environ.get('DASHBOARD_SLIDER_UPDATE', 'mouseup'),
+        'slider_debounce_ms': int(environ.get('DASHBOARD_SLIDER_DEBOUNCE_MS', 0)),
+        # DASHBOARD_PROGRESSIVE=1: vẽ trước từ mẫu phân tầng (số ước tính ± sai số), rồi thay bằng kết quả chính xác
+        'progressive': bool(environ.get('DASHBOARD_PROGRESSIVE')),
+        # DASHBOARD_BACKGROUND_DIR=path: các tab chạy thành job nền (DiskcacheManager, cần dash[diskcache])
+        'background_dir': environ.get('DASHBOARD_BACKGROUND_DIR'),
+        # Ranh giới tỉnh (GeoJSON) của bản đồ; không có file thì bản đồ vẽ bong bóng tại tâm tỉnh
+        'provinces_geojson': environ.get('DASHBOARD_PROVINCES_GEOJSON', PROVINCES_FILE),
+        'live': bool(environ.get('DASHBOARD_LIVE')),
+        'live_interval': float(environ.get('DASHBOARD_LIVE_INTERVAL', 2)),
+    }
+
+
+def sample_data():
+    """Small random dataset shown when no data source can be loaded"""
+    import pandas as pd
+    import numpy as np
+
+    np.random.seed(42)
+    n = 100
+
+    locations = ['Hà Nội', 'TP.HCM', 'Đà Nẵng', 'Cần Thơ', 'Hải Phòng',
+                 'Nghệ An', 'Thanh Hóa', 'Bình Dương', 'Đồng Nai', 'Quảng Ninh']
+    diseases = ['Tiểu đường', 'Cao huyết áp', 'Hen suyễn', 'Không có',
+                'Tim mạch', 'Đau dạ dày', 'Viêm gan', 'Suy thận']
+    age_groups = ['Dưới 18', '18-30', '31-45', '46-60', 'Trên 60']
+    genders = ['Nam', 'Nữ']
+
+    return pd.DataFrame({
+        'location': np.random.choice(locations, n),
+        'commonDiseases': np.random.choice(diseases, n),
+        'age_group': np.random.choice(age_groups, n),
+        'gender': np.random.choice(genders, n),
+        'BMI': np.random.normal(24, 4, n).clip(15, 40)
+    })
+
+
+def load_source(config):
+    """DataSource for the configured backend, falling back to sample data on errors"""
+    try:
+        if config['mongo_uri']:
+            # Đọc trực tiếp từ MongoDB: lọc và đếm chạy trong aggregation pipeline
+            source = MongoSource(uri=config['mongo_uri'], database=config['mongo_db'],
+                                 collection_name=config['mongo_collection'])
+            print(f"✅ MongoDB source connected: {len(source)} records")
+        elif config['cube']:
+            # Triển khai chỉ cần biểu đồ tổng hợp: nạp khối đếm, không giữ bảng dòng
+            cube = load_count_cube(config['cube'], chunksize=config['chunk_rows'])
+            source = ProfileDataset(cube)
+            print(f"✅ Count cube loaded: {len(cube)} records in {cube.n_cells} cells")
+        else:
+            # Bảng, index và khối đếm ánh xạ từ file cạnh CSV: các worker dùng chung một bản
+            source = ProfileDataset.open(config['data_file'], chunksize=config['chunk_rows'])
+            print(f"✅ Data loaded successfully: {len(source)} records")
+            print(f"   Columns: {', '.join(source.columns)}")
+            print(f"   Table: {bytes_per_row(source.df):.1f} bytes/row ({compact_dtypes(source.df)})")
+    except Exception as e:
+        print(f"❌ Error loading data: {e}")
+        print("   Creating sample data for demonstration...")
+        source = ProfileDataset(sample_data())
+        print(f"✅ Sample data created: {len(source)} records")
+    return source
+
+
+def report_memory():
+    """Print this worker's resident memory, split into private and shared (mapped) pages"""
+    mem = memory_report()
+    if not mem:
+        return mem
+    line = f"🧠 Worker {os.getpid()}: RSS {mem['rss']:.1f} MB (private {mem.get('anon', 0):.1f} MB, " \
+           f"file-backed/shared {mem.get('file', 0):.1f} MB)"
+    if 'pss' in mem:
+        line += f", PSS {mem['pss']:.1f} MB"
+    print(line)
+    return mem
+
+
+def create_app(config=None, source=None):
+    """Dash app wired to a data source (built from `config`, default: environment).
+
+    Every call builds an independent app, so each gunicorn worker can call it
+    after forking; CSV data is memory-mapped and shared between them.
+    """
+    config = dict(config_from_env(), **(config or {}))
+    if source is None:
+        source = load_source(config)
+    elif not isinstance(source, DataSource):
+        source = ProfileDataset(source)
+
+    provinces = load_provinces(config['provinces_geojson'])
+    if provinces is not None:
+        print(f"🗺️ Province map: {len(provinces.locations)} outlines, {provinces.nbytes / 1024:,.0f} KB "
+              f"(simplified from {provinces.source_bytes / 1024:,.0f} KB)")
+    else:
+        print("🗺️ Province map: no GeoJSON outlines found, drawing province centroids")
+
+    live = config['live'] and isinstance(source, ProfileDataset) and source.df is not None
+    app = create_dash_app()
+    # Bố cục dựng một lần; mỗi lần tải trang chỉ thêm mã trang mới
+    app.layout = page_layout(get_layout(source, slider_update=config['slider_update'],
+                                        export_formats=export_formats(source), live=live))
+
+    metrics = Metrics(enabled=config['metrics'], log_requests=config['timing_log'])
+    if metrics.log_requests:
+        logging.basicConfig(level=logging.INFO)
+
+    figure_builder = FigureBuilder(workers=config['figure_workers'], metrics=metrics)
+    manager = background_manager(config['background_dir']) if config['background_dir'] else None
+    register_callbacks(app, source, figure_builder=figure_builder, metrics=metrics,
+                       patch_updates=config['patch_updates'], client_max_rows=config['client_max_rows'],
+                       background_manager=manager, slider_debounce_ms=config['slider_debounce_ms'],
+                       progressive=config['progressive'])
+    if config['progressive'] and getattr(source, 'sample', None) is not None:
+        print(f"⏩ Progressive rendering: estimates from {len(source.sample.positions):,} sampled rows first")
+
+    if live:
+        # Theo dõi các dòng mới ghi thêm vào file CSV và nối vào bộ dữ liệu đang chạy
+        LiveIngestor(source, CsvTailer(config['data_file']), interval=config['live_interval']).start()
+        print("📡 Live ingestion enabled")
+
+    app.dataset = source
+    report_memory()
+    return app
@@ -0,0 +1,76 @@
+"""Histogram and box plot of BMI against the figures Plotly draws from the raw values
+(go.Histogram(nbinsx=20) auto bins, go.Box quartilemethod 'linear')."""
+import numpy as np
+import pandas as pd
+import pytest
+from components.charts import bmi_histogram, box_stats, histogram_bins
+from data.dataset import ProfileDataset
+from benchmarks.synthetic import make_profiles
+
+# BMI: (cạnh các cột, số đếm) Plotly vẽ cho go.Histogram(x=BMI, nbinsx=20)
+HISTOGRAMS = [
+    # Khoảng 25.8: bề rộng 2, cạnh trên số chẵn, 14 cột
+    ([14.3, 15.2, 22.0, 30.0, 18.7, 25.5, 40.1, 33.3],
+     np.arange(14, 43, 2), [2, 0, 1, 0, 1, 1, 0, 0, 1, 1, 0, 0, 0, 1]),
+    # Toàn số nguyên: cột rộng 1 có tâm trên mỗi số
+    (list(range(18, 38)), np.arange(17.5, 38, 1), [1] * 20),
+    # Nhiều giá trị đúng trên cạnh, không giá trị nào giữa cột: lùi nửa cột
+    ([20, 22, 24, 26, 28, 30, 20.7, 23.3],
+     np.arange(19.5, 31, 1), [1, 1, 1, 1, 1, 0, 1, 0, 1, 0, 1]),
+    # Khoảng hẹp: bề rộng 0.5
+    ([21.1, 21.4, 22.9, 25.8, 27.3, 29.6],
+     np.arange(21.0, 30.5, 0.5), [2, 0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 0, 1, 0, 0, 0, 0, 1]),
+]
+
+
+@pytest.mark.parametrize('values, edges, counts', HISTOGRAMS)
+def test_histogram_bins_match_plotly(values, edges, counts):
+    got_counts, got_edges = bmi_histogram(pd.DataFrame({'BMI': np.array(values, dtype=float)}))
+    assert np.allclose(got_edges, edges)
+    assert got_counts.tolist() == counts
+
+
+def test_histogram_float32_storage():
+    # BMI lưu float32 (data.compact) vẫn rơi vào đúng cột của giá trị thập phân
+    values, edges, counts = HISTOGRAMS[0]
+    got_counts, got_edges = bmi_histogram(pd.DataFrame({'BMI': np.array(values, dtype=np.float32)}))
+    assert np.allclose(got_edges, edges)
+    assert got_counts.tolist() == counts
+
+
+def test_histogram_bin_size_rounding():
+    assert histogram_bins(14.3, 40.1) == (14.0, 2.0, 14)
+    assert histogram_bins(15.0, 45.0) == (14.0, 2.0, 16)
+    assert histogram_bins(10.0, 60.0)[1] == 5.0
+    assert histogram_bins(22.0, 22.0)[1] == 1.0
+
+
+def test_histogram_empty():
+    counts, edges = bmi_histogram(pd.DataFrame({'BMI': np.array([np.nan])}))
+    assert len(counts) == 0 and len(edges) == 1
+
+
+@pytest.mark.parametrize('filters', [{}, {'gen': ['Nam']}, {'age': ['31-45'], 'gen': ['Nữ']}])
+def test_histogram_cube_uses_same_bins(filters):
+    dataset = ProfileDataset(make_profiles(5000))
+    dff, view = dataset.query(dataset.select(**filters), **filters)
+    assert not isinstance(view, pd.DataFrame)
+    counts, edges = bmi_histogram(dff)
+    cube_counts, cube_edges = bmi_histogram(view)
+    assert np.array_equal(cube_edges, edges)
+    assert np.array_equal(cube_counts, counts)
+
+
+def test_box_stats_match_plotly():
+    df = pd.DataFrame({
+        'gender': ['Nam'] * 8 + ['Nữ'] * 5,
+        'BMI': [18.0, 19.5, 21.0, 22.4, 23.1, 25.0, 26.7, 41.0, 16.2, 17.8, 19.9, 20.4, 21.6],
+    }).sample(frac=1, random_state=0)
+    stats = box_stats(df)
+    nam, nu = stats.loc['Nam'], stats.loc['Nữ']
+    assert np.allclose([nam['q1'], nam['median'], nam['q3']], [20.25, 22.75, 25.85])
+    assert np.allclose([nam['lowerfence'], nam['upperfence']], [18.0, 26.7])
+    assert nam['outliers'].tolist() == [41.0]
+    assert np.allclose([nu['q1'], nu['median'], nu['q3'], nu['mean']], [17.4, 19.9, 20.7, 19.18])
+    assert np.allclose([nu['lowerfence'], nu['upperfence']], [16.2, 21.6])
+    assert len(nu['outliers']) == 0
@@ -0,0 +1,89 @@
+"""Compact dtypes of the cleaned profile table (data/compact.py)."""
+import numpy as np
+import pandas as pd
+from data.columnar import AppendableFrame
+from data.compact import compact_column, compact_dtypes, compact_frame, float_values
+from data.data_loader import clean_profiles, load_and_clean_data
+from data.dataset import ProfileDataset
+from data.filter_index import FilterIndex
+from benchmarks.synthetic import make_raw_profiles, to_csv_rows
+
+# BMI không qua được float32: khối chứa nó giữ float64
+PRECISE_BMI = 24.691358024691358
+
+
+def test_float32_only_when_lossless():
+    decimals = pd.Series([26.3, 18.5, 31.7, np.nan])
+    assert compact_column(decimals, np.float32).dtype == np.float32
+    assert np.array_equal(float_values(compact_column(decimals, np.float32)), decimals, equal_nan=True)
+    precise = pd.Series([26.3, 24.691358024691358])
+    assert compact_column(precise, np.float32).dtype == np.float64
+
+
+def test_integer_columns():
+    assert compact_column(pd.Series([0, 120, 255]), np.uint8).dtype == np.uint8
+    assert compact_column(pd.Series([0, 256]), np.uint8).dtype == np.int64
+    assert compact_column(pd.Series([1.0, np.nan]), np.uint8).dtype == np.float64
+    assert compact_column(pd.Series([-1, 3]), np.uint16).dtype == np.int64
+
+
+def test_reported_dtypes():
+    df = compact_frame(pd.DataFrame({'age': [30, 41], 'height': [170, 158], 'weight': [65, 80],
+                                     'BMI': [22.491349480968857, 32.0]}))
+    assert compact_dtypes(df) == 'age uint8, height uint16, weight uint16, BMI float64'
+
+
+def test_filter_on_float64_bmi():
+    # BMI giữ float64: cận lọc so ở float64, không làm tròn về float32
+    df = pd.DataFrame({'BMI': [24.99999999, 25.0, 25.00000001, 26.3]})
+    df['BMI'] = compact_column(df['BMI'], np.float32)
+    assert df['BMI'].dtype == np.float64
+    assert len(FilterIndex(df).apply(df, bmi_range=[25.0, 26.3])) == 3
+
+
+def raw_profiles(n, seed=42):
+    raw = to_csv_rows(make_raw_profiles(n, seed=seed))
+    raw.loc[:3, 'BMI'] = 26.3
+    return raw
+
+
+def exact_matches(dataset, value):
+    return len(dataset.query(dataset.select(bmi_range=[value, value]), bmi_range=[value, value])[0])
+
+
+def test_chunked_load_widens_earlier_chunks(tmp_path):
+    # Khối cuối float64: các khối float32 đã ghi được nới giữ nguyên số thập phân
+    raw = raw_profiles(400)
+    raw.loc[350, 'BMI'] = PRECISE_BMI
+    path = tmp_path / 'profiles.csv'
+    raw.to_csv(path, index=False)
+    df = load_and_clean_data(str(path), use_cache=False, chunksize=100)
+    assert df['BMI'].dtype == np.float64
+    written = pd.read_csv(path)['BMI'].to_numpy()
+    assert np.array_equal(df['BMI'].to_numpy(), written, equal_nan=True)
+    assert exact_matches(ProfileDataset(df), 26.3) == int((written == 26.3).sum())
+    assert exact_matches(ProfileDataset(df), written[350]) == 1
+
+
+def test_appendable_frame_widens_float32():
+    frame = AppendableFrame(clean_profiles(raw_profiles(50)))
+    late = raw_profiles(10, seed=3)
+    late.loc[5, 'BMI'] = PRECISE_BMI
+    frame.append(clean_profiles(late))
+    frame.append(clean_profiles(raw_profiles(10, seed=4)))
+    bmi = frame.frame()['BMI']
+    assert bmi.dtype == np.float64
+    assert bmi.iloc[0] == 26.3 and bmi.iloc[50] == 26.3 and bmi.iloc[55] == PRECISE_BMI and bmi.iloc[60] == 26.3
+
+
+def test_live_append_keeps_filters_exact():
+    dataset = ProfileDataset(clean_profiles(raw_profiles(300)))
+    assert dataset.df['BMI'].dtype == np.float32
+    late = raw_profiles(20, seed=5)
+    late.loc[10, 'BMI'] = PRECISE_BMI
+    dataset.append(clean_profiles(late))
+    assert dataset.df['BMI'].dtype == np.float64 and dataset.index.bmi.dtype == np.float64
+    expected = int((float_values(dataset.df['BMI']) == 26.3).sum())
+    assert expected >= 8
+    assert exact_matches(dataset, 26.3) == expected
+    assert exact_matches(dataset, PRECISE_BMI) == 1
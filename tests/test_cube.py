@@ -0,0 +1,65 @@
+"""Count charts from the cube and from the row table against the baseline
+value_counts of the raw text columns (same counts, same order of equal counts)."""
+import pandas as pd
+import pytest
+from benchmarks.synthetic import make_raw_profiles
+from components.charts import count_by
+from data.cube import CountCube
+from data.data_loader import clean_profiles
+
+COLUMNS = ['location', 'commonDiseases', 'allergies', 'gender', 'age_group']
+# (cột lọc, nhãn giữ lại): lát cắt nhỏ để có nhiều nhãn hòa số đếm
+SLICES = [None, ('gender', 'Nam'), ('age_group', '31-45')]
+
+
+def baseline(raw, column):
+    # Cột chữ như trong bản CSV gốc (age_group: nhãn của pd.cut)
+    values = raw[column] if column == 'age_group' else raw[column].astype(object)
+    counts = values.value_counts()
+    return counts[counts > 0]
+
+
+def sliced(frame, where):
+    if where is None:
+        return frame
+    column, label = where
+    return frame[frame[column].astype(object) == label]
+
+
+def cube_view(cube, where):
+    if where is None:
+        return cube.slice()
+    column, label = where
+    arg = {'gender': 'gen', 'age_group': 'age'}[column]
+    return cube.slice(**{arg: [label]})
+
+
+def as_pairs(counts):
+    return list(zip(counts.index.astype(object), counts.astype(int)))
+
+
+@pytest.fixture(scope='module')
+def frames():
+    raw = make_raw_profiles(400, seed=7)
+    raw['age_group'] = clean_profiles(raw.copy())['age_group']
+    return raw, clean_profiles(raw.copy())
+
+
+@pytest.mark.parametrize('where', SLICES)
+@pytest.mark.parametrize('column', COLUMNS)
+def test_count_by_keeps_value_counts_order(frames, column, where):
+    raw, df = frames
+    expected = as_pairs(baseline(sliced(raw, where), column))
+    assert as_pairs(count_by(sliced(df, where), column)) == expected
+    assert as_pairs(cube_view(CountCube.from_frame(df), where).count_by(column)) == expected
+
+
+@pytest.mark.parametrize('column', COLUMNS)
+def test_appended_and_saved_cube_keep_order(frames, column, tmp_path):
+    raw, df = frames
+    cube = CountCube.from_frame(df.iloc[:150])
+    cube.add(df.iloc[150:])
+    expected = as_pairs(baseline(raw, column))
+    assert as_pairs(cube.slice().count_by(column)) == expected
+    cube.save(str(tmp_path / 'cube'))
+    assert as_pairs(CountCube.load(str(tmp_path / 'cube')).slice().count_by(column)) == expected
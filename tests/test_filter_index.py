@@ -0,0 +1,116 @@
+"""FilterIndex.select() against the baseline pandas masks of update_dashboard
+(benchmarks.bench_filter.baseline_filter), also after extend() and save()/load()."""
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.bench_filter import baseline_filter, scenarios
+from benchmarks.synthetic import make_profiles
+from data.filter_index import FilterIndex
+
+FILTER_ARGS = ('loc', 'dis', 'gen', 'age', 'bmi_range')
+
+
+@pytest.fixture(scope='module')
+def profiles():
+    df = make_profiles(9000, seed=3)
+    # Một số hồ sơ không có BMI
+    bmi = df['BMI'].to_numpy().copy()
+    bmi[::97] = np.nan
+    df['BMI'] = bmi
+    return df
+
+
+def filter_states(df):
+    """Combined filters, open-edge and out-of-range BMI bounds"""
+    locations = list(df['location'].value_counts().index)
+    diseases = list(df['commonDiseases'].value_counts().index)
+    bmi = df['BMI'].dropna()
+    lo, hi, mid = float(bmi.min()), float(bmi.max()), float(bmi.iloc[10])
+    states = list(scenarios(df.dropna(subset=['BMI'])).values())
+    states += [
+        {},
+        dict(loc=locations[0]),
+        dict(loc=locations[:2], dis=diseases[:3]),
+        dict(loc=locations[:4], gen=['Nữ'], age=['Dưới 18', 'Trên 60']),
+        dict(dis=diseases[1], gen='Nam', bmi_range=[18.5, 25]),
+        # Nhãn không có trong dữ liệu
+        dict(loc=['Không rõ']),
+        dict(loc=['Không rõ', locations[1]], age='18-30'),
+        # Cận BMI: đúng cạnh dữ liệu, trùng một giá trị, ngoài khoảng, khoảng rỗng
+        dict(bmi_range=[lo, hi]),
+        dict(bmi_range=[lo, mid]),
+        dict(bmi_range=[mid, hi]),
+        dict(bmi_range=[mid, mid]),
+        dict(bmi_range=[lo - 5, hi + 5]),
+        dict(bmi_range=[hi + 1, hi + 2]),
+        dict(bmi_range=[mid, lo]),
+        dict(gen=['Nam'], bmi_range=[lo, hi]),
+        dict(age=['31-45'], bmi_range=[mid, mid + 3]),
+    ]
+    return states
+
+
+def baseline_args(filters):
+    """Filter state as baseline_filter arguments (a single dropdown value as a list)"""
+    args = {name: filters.get(name) for name in FILTER_ARGS}
+    for name in ('loc', 'dis', 'gen', 'age'):
+        if isinstance(args[name], str):
+            args[name] = [args[name]]
+    return args
+
+
+def expected_positions(df, filters):
+    return baseline_filter(df.reset_index(drop=True), **baseline_args(filters)).index.to_numpy()
+
+
+def selected_positions(index, n, filters):
+    positions = index.select(**filters)
+    return np.arange(n) if positions is None else positions
+
+
+def assert_matches(index, df):
+    for filters in filter_states(df):
+        got = selected_positions(index, len(df), filters)
+        np.testing.assert_array_equal(got, expected_positions(df, filters), err_msg=str(filters))
+
+
+def test_select_matches_baseline(profiles):
+    assert_matches(FilterIndex(profiles), profiles)
+
+
+def test_apply_matches_baseline(profiles):
+    index = FilterIndex(profiles)
+    for filters in filter_states(profiles):
+        pd.testing.assert_frame_equal(index.apply(profiles, **filters),
+                                      baseline_filter(profiles, **baseline_args(filters)))
+
+
+def test_extend_then_resort(profiles):
+    index = FilterIndex(profiles.iloc[:3000])
+    # Phần nối ngắn nằm ở đuôi chưa sắp, phần dài hơn 4096 dòng làm sắp xếp lại
+    for stop, sorted_after in ((3100, 3000), (8200, 8200), (9000, 8200)):
+        index.extend(profiles.iloc[index.n:stop])
+        assert index.n_sorted == sorted_after
+        assert_matches(index, profiles.iloc[:stop])
+
+
+def test_extend_new_labels(profiles):
+    index = FilterIndex(profiles.iloc[:3000])
+    extra = profiles.iloc[3000:3050].copy()
+    extra['location'] = extra['location'].astype(object)
+    extra.loc[extra.index[::5], 'location'] = 'Tỉnh mới'
+    index.extend(extra)
+    positions = index.select(loc=['Tỉnh mới'])
+    np.testing.assert_array_equal(positions, 3000 + np.arange(0, 50, 5))
+
+
+def test_save_load(profiles, tmp_path):
+    index = FilterIndex(profiles.iloc[:3000])
+    index.extend(profiles.iloc[3000:3100])
+    index.save(str(tmp_path / 'index'))
+    loaded = FilterIndex.load(str(tmp_path / 'index'))
+    assert loaded.shared
+    assert_matches(loaded, profiles.iloc[:3100])
+    # Chỉ mục ánh xạ chỉ đọc: extend() chép ra bộ nhớ trước khi ghi
+    loaded.extend(profiles.iloc[3100:])
+    assert_matches(loaded, profiles)
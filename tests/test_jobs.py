@@ -0,0 +1,36 @@
+"""Latest-wins bookkeeping of callbacks/jobs.JobTracker."""
+import pytest
+from callbacks.jobs import JobTracker, Superseded
+
+
+def test_newer_run_supersedes_same_page_only():
+    jobs = JobTracker()
+    with jobs.start('tab-1', 'page-a') as old:
+        with jobs.start('tab-1', 'page-b') as other:
+            with jobs.start('tab-1', 'page-a'):
+                with pytest.raises(Superseded):
+                    old.check()
+                other.check()
+    assert jobs.stats() == {'started': 3, 'cancelled': 1, 'running': 0, 'tracked': 0}
+
+
+def test_supersede_leaves_nothing_behind():
+    jobs = JobTracker()
+    with jobs.start('summary', 'page-a') as job:
+        jobs.supersede('summary', 'page-a')
+        assert jobs.stats()['running'] == 1
+        with pytest.raises(Superseded):
+            job.check()
+    # Trang không chạy gì: không giữ vé nào
+    jobs.supersede('summary', 'page-b')
+    jobs.supersede('summary', None)
+    assert jobs.stats() == {'started': 1, 'cancelled': 1, 'running': 0, 'tracked': 0}
+
+
+def test_runs_without_page_are_never_cancelled():
+    jobs = JobTracker()
+    with jobs.start('tab-1', None) as first:
+        with jobs.start('tab-1', None):
+            first.check()
+            assert jobs.stats()['running'] == 2
+    assert jobs.stats()['running'] == 0
@@ -0,0 +1,24 @@
+"""Prometheus text of callbacks/metrics.Metrics."""
+from callbacks.metrics import Metrics
+
+
+def test_counter_and_gauge_types():
+    metrics = Metrics()
+    metrics.add_gauges(lambda: {('dashboard_cache_bytes', ()): 268435456})
+    metrics.add_counters(lambda: {('dashboard_cache_hits_total', ()): 3})
+    metrics.observe('dashboard_filtered_rows', 120, buckets=(100, 1000))
+    lines = metrics.render().splitlines()
+    assert '# TYPE dashboard_cache_bytes gauge' in lines
+    assert 'dashboard_cache_bytes 268435456' in lines
+    assert '# TYPE dashboard_cache_hits_total counter' in lines
+    assert 'dashboard_cache_hits_total 3' in lines
+    assert '# TYPE dashboard_filtered_rows histogram' in lines
+    assert 'dashboard_filtered_rows_bucket{le="1000"} 1' in lines
+
+
+def test_disabled_records_nothing():
+    metrics = Metrics(enabled=False)
+    metrics.observe('dashboard_filtered_rows', 120)
+    with metrics.timer('dashboard_callback_seconds', callback='tab-1'):
+        pass
+    assert metrics.render() == '\n'
@@ -0,0 +1,101 @@
+"""MongoSource (on mongomock) against ProfileDataset over the same profiles."""
+import pandas as pd
+import pytest
+from components.charts import bmi_summary, count_by
+from data.cube import FILTER_DIMENSIONS
+from data.dataset import ProfileDataset
+from data.mongo_source import MongoSource
+from benchmarks.check_client_filter import cases
+from benchmarks.synthetic import make_profiles
+
+mongomock = pytest.importorskip('mongomock')
+
+
+@pytest.fixture(scope='module')
+def sources():
+    df = make_profiles(1500)
+    mongo = MongoSource(collection=mongomock.MongoClient().db.profiles)
+    mongo.insert_frame(df)
+    return ProfileDataset(df), mongo
+
+
+# Chiều đếm của các biểu đồ so giữa hai nguồn
+COUNT_COLUMNS = [('location',), ('commonDiseases',), ('gender',), ('age_group',),
+                 ('location', 'commonDiseases'), ('age_group', 'commonDiseases')]
+# Số trạng thái lọc của benchmarks.check_client_filter.cases
+N_CASES = 6
+
+
+def case(dataset, i):
+    rows, _ = dataset.query(None)
+    return cases(rows, dataset.bmi_range, dataset.created_range)[i]
+
+
+def as_dict(counts):
+    return {key: int(n) for key, n in counts.items() if n > 0}
+
+
+@pytest.mark.parametrize('i', range(N_CASES))
+def test_counts(sources, i):
+    dataset, mongo = sources
+    filters = case(dataset, i)
+    _, expected = dataset.query(dataset.select(**filters), **filters)
+    _, got = mongo.query(mongo.select(**filters), **filters)
+    assert len(got) == len(expected)
+    for columns in COUNT_COLUMNS:
+        assert as_dict(count_by(got, *columns)) == as_dict(count_by(expected, *columns)), columns
+    if len(expected):
+        assert pytest.approx(bmi_summary(got)) == bmi_summary(expected)
+
+
+@pytest.mark.parametrize('i', range(N_CASES))
+def test_facets(sources, i):
+    dataset, mongo = sources
+    filters = case(dataset, i)
+    expected, got = dataset.facet_counts(**filters), mongo.facet_counts(**filters)
+    for name in FILTER_DIMENSIONS:
+        assert as_dict(got[name]) == as_dict(expected[name]), name
+
+
+@pytest.mark.parametrize('i', range(N_CASES))
+def test_timeline(sources, i):
+    dataset, mongo = sources
+    filters = case(dataset, i)
+    expected, got = dataset.timeline(**filters), mongo.timeline(**filters)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+    assert got.attrs['freq'] == expected.attrs['freq']
+
+
+@pytest.mark.parametrize('age', [['?'], ['?', '31-45']])
+def test_unknown_age_label(sources, age):
+    dataset, mongo = sources
+    _, expected = dataset.query(dataset.select(age=age), age=age)
+    _, got = mongo.query(mongo.select(age=age), age=age)
+    assert len(got) == len(expected)
+    assert as_dict(count_by(got, 'age_group')) == as_dict(count_by(expected, 'age_group'))
+    assert as_dict(mongo.facet_counts(age=age)['gen']) == as_dict(dataset.facet_counts(age=age)['gen'])
+
+
+def created_windows(dataset):
+    lo, hi = dataset.created_range
+    return [None, [lo, hi], [lo - 30, hi + 30], [lo + 100, hi - 100]]
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'gen': ['Nữ'], 'age': ['Dưới 18']},
+    {'loc': ['Sơn La']},
+    {'dis': ['bệnh mạch vành'], 'gen': ['Nam']},
+    {'bmi_range': [10.0, 10.1]},
+    # Nhãn tuổi không có: không hồ sơ nào, nhãn lạ lẫn nhãn thật thì bỏ qua nhãn lạ
+    {'age': ['?']},
+    {'age': ['?', '31-45']},
+])
+def test_timeline_window(sources, filters):
+    # Không lọc theo ngày: cả khoảng của dữ liệu, không phải khoảng của nhóm đang lọc
+    dataset, mongo = sources
+    for created_range in created_windows(dataset):
+        expected = dataset.timeline(created_range=created_range, **filters)
+        got = mongo.timeline(created_range=created_range, **filters)
+        pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+        assert got.attrs['freq'] == expected.attrs['freq']
@@ -0,0 +1,15 @@
+"""WSGI entry point for multi-process deployment.
+
+    gunicorn -w 4 -b 0.0.0.0:8050 wsgi:server
+
+(`pages.app:server` is the same server, built on first access.)
+
+Each worker builds its own app with create_app(); the cleaned table, filter
+index and count cube are memory-mapped from sidecar files next to the CSV
+(built once by whichever worker starts first), so adding workers does not
+add copies of the dataset. Data source settings: see pages/factory.py.
+"""
+from pages.factory import create_app
+
+app = create_app()
+server = app.server